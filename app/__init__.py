@@ -10,8 +10,10 @@ from flask_migrate import Migrate
 from flask_babel import Babel
 import os
 
+from app.replica import RoutingSession
+
 # 初始化扩展
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 csrf = CSRFProtect()
 admin = Admin(name="Farmer's Delight Wiki")
@@ -19,8 +21,11 @@ migrate = Migrate()
 babel = Babel()
 
 
-def create_app(config_name=None):
-    """应用工厂函数"""
+def create_app(config_name=None, test_config=None):
+    """应用工厂函数
+
+    :param test_config: 覆盖配置项的字典（测试用）
+    """
     app = Flask(__name__)
 
     # 配置
@@ -38,9 +43,19 @@ def create_app(config_name=None):
     instance_config_path = os.path.join(app.instance_path, 'config.py')
     if os.path.exists(instance_config_path):
         app.config.from_pyfile('config.py')
+    if test_config:
+        app.config.update(test_config)
 
     # 初始化扩展
+    from app.engine import engine_options, init_engine
+    from app.instrumentation import init_instrumentation
+    from app.replica import init_replica, replica_binds
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config)
     db.init_app(app)
+    init_engine(app)
+    init_instrumentation(app)
+    init_replica(app)
     login_manager.init_app(app)
     csrf.init_app(app)
     babel.init_app(app)
@@ -74,6 +89,52 @@ def create_app(config_name=None):
     from app.admin import init_admin
     init_admin()
 
+    # 点赞写后缓冲（按配置启用）
+    from app.like_buffer import init_like_buffer
+    init_like_buffer(app)
+
+    # 趋势排行榜
+    from app.trending import init_trending
+    init_trending(app)
+
+    # 结果缓存与排行榜失效订阅
+    from app.cache import init_cache
+    from app.rankings import init_rankings
+    init_cache(app)
+    init_rankings(app)
+
+    # 搜索结果缓存
+    from app.search import init_search
+    init_search(app)
+
+    # 搜索输入提示索引
+    from app.suggest import init_suggest
+    init_suggest(app)
+
+    # 模糊搜索索引
+    from app.fuzzy import init_fuzzy
+    init_fuzzy(app)
+
+    # 菜谱索引
+    from app.recipes import init_recipes
+    init_recipes(app)
+
+    # 列表页总数缓存
+    from app.listing import init_listing
+    init_listing(app)
+
+    # 目录快照（CATALOG_SNAPSHOT 开启时使用）
+    from app.snapshot import init_snapshot
+    init_snapshot(app)
+
+    # 采样慢查询日志
+    from app.slowlog import init_slowlog
+    init_slowlog(app)
+
+    # 注册命令行命令
+    from app.commands import register_commands
+    register_commands(app)
+
     # 初始化日志
     from app.utils import init_logging
     init_logging(app)
@@ -1,13 +1,16 @@
 """
 Flask-Admin 配置
 """
-from flask_admin import AdminIndexView
+from flask_admin import AdminIndexView, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask_login import current_user
-from flask import redirect, url_for, request
+from flask import redirect, url_for, request, current_app, flash
 from wtforms import PasswordField
 from app import db, admin
 from app.models import User, Crop, Meal
+from app.signals import catalog_changed, like_counts_reset
+from app.slowlog import get_slow_query_log
+from app.snapshot import bump_catalog_version
 
 
 class SecureAdminIndexView(AdminIndexView):
@@ -29,6 +32,79 @@ class SecureModelView(ModelView):
         return redirect(url_for('auth.login', next=request.url))
 
 
+class SecureBaseView(BaseView):
+    """安全的自定义后台页面"""
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.username == 'admin'
+
+    def inaccessible_callback(self, name, **kwargs):
+        return redirect(url_for('auth.login', next=request.url))
+
+
+class CacheAdminView(SecureBaseView):
+    """进程内缓存统计与手动清空"""
+    CACHES = {
+        'result_cache': '首页与排行榜',
+        'search_cache': '搜索结果',
+    }
+
+    @expose('/')
+    def index(self):
+        caches = [
+            (label, current_app.extensions[key].stats())
+            for key, label in self.CACHES.items()
+        ]
+        return self.render('admin/cache.html', caches=caches)
+
+    @expose('/clear', methods=['POST'])
+    def clear(self):
+        for key in self.CACHES:
+            current_app.extensions[key].clear()
+        flash('缓存已清空（仅当前进程）')
+        return redirect(url_for('.index'))
+
+
+class SlowQueryAdminView(SecureBaseView):
+    """按指纹汇总的采样查询耗时（当前进程），按总耗时排序"""
+    MAX_ROWS = 100
+
+    def is_visible(self):
+        return get_slow_query_log() is not None
+
+    @expose('/')
+    def index(self):
+        log = get_slow_query_log()
+        if log is None:
+            flash('慢查询日志未启用（SLOW_QUERY_LOG=0）')
+            return redirect(url_for('admin.index'))
+        order_by = request.args.get('order_by', 'total')
+        if order_by not in ('total', 'count', 'max', 'slow'):
+            order_by = 'total'
+        log.explain_pending()
+        return self.render('admin/slow_queries.html', log=log,
+                           stats=log.entries(order_by, self.MAX_ROWS),
+                           order_by=order_by)
+
+    @expose('/reset', methods=['POST'])
+    def reset(self):
+        log = get_slow_query_log()
+        if log is not None:
+            log.reset()
+            flash('查询统计已清空（仅当前进程）')
+        return redirect(url_for('.index'))
+
+    @expose('/sampling', methods=['POST'])
+    def sampling(self):
+        log = get_slow_query_log()
+        if log is not None:
+            try:
+                log.set_sample_rate(request.form.get('sample_rate', ''))
+                flash(f'采样率已设置为 {log.sample_rate:g}（仅当前进程）')
+            except ValueError:
+                flash('采样率必须是 0 到 1 之间的数字', 'error')
+        return redirect(url_for('.index'))
+
+
 class UserModelView(SecureModelView):
     """用户模型视图"""
     column_list = ['id', 'username', 'email', 'created_at']
@@ -49,10 +125,38 @@ class UserModelView(SecureModelView):
         if form.password.data:
             model.set_password(form.password.data)
 
+    def on_model_delete(self, model):
+        """删除用户时同步扣减其点赞计数（与删除在同一事务中提交）"""
+        from app.likes import release_user_likes
+        release_user_likes(model.id)
+
+    def after_model_delete(self, model):
+        like_counts_reset.send(current_app._get_current_object())
+
+
+class CatalogModelView(SecureModelView):
+    """作物/菜品模型视图基类：目录版本号随修改一起提交，提交后广播目录变化"""
+    catalog_kind = None
+
+    def on_model_change(self, form, model, is_created):
+        bump_catalog_version()
+
+    def on_model_delete(self, model):
+        bump_catalog_version()
+
+    def after_model_change(self, form, model, is_created):
+        catalog_changed.send(current_app._get_current_object(),
+                             kind=self.catalog_kind, item_id=model.id)
+
+    def after_model_delete(self, model):
+        catalog_changed.send(current_app._get_current_object(),
+                             kind=self.catalog_kind, item_id=model.id)
+
 
-class CropModelView(SecureModelView):
+class CropModelView(CatalogModelView):
     """作物模型视图"""
-    column_list = ['id', 'name', 'hunger_points', 'created_at']
+    catalog_kind = 'crop'
+    column_list = ['id', 'name', 'hunger_points', 'likes_count', 'created_at']
     column_searchable_list = ['name', 'description']
     column_filters = ['hunger_points', 'created_at']
     form_columns = ['name', 'description', 'image_url', 'hunger_points']
@@ -61,9 +165,11 @@ class CropModelView(SecureModelView):
     can_export = True
 
 
-class MealModelView(SecureModelView):
+class MealModelView(CatalogModelView):
     """菜品模型视图"""
-    column_list = ['id', 'name', 'hunger_restored', 'saturation', 'created_at']
+    catalog_kind = 'meal'
+    column_list = ['id', 'name', 'hunger_restored', 'saturation',
+                   'likes_count', 'created_at']
     column_searchable_list = ['name', 'description']
     column_filters = ['hunger_restored', 'saturation', 'created_at']
     form_columns = ['name',
@@ -85,3 +191,5 @@ def init_admin():
     admin.add_view(UserModelView(User, db.session, name='用户', endpoint='admin_users'))
     admin.add_view(CropModelView(Crop, db.session, name='作物', endpoint='admin_crops'))
     admin.add_view(MealModelView(Meal, db.session, name='菜品', endpoint='admin_meals'))
+    admin.add_view(CacheAdminView(name='缓存', endpoint='admin_cache'))
+    admin.add_view(SlowQueryAdminView(name='慢查询', endpoint='admin_slow_queries'))
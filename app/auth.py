@@ -6,6 +6,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
 from app.forms import RegistrationForm, LoginForm, ProfileEditForm
+from app.recommend import for_user
 from app.utils import log_action
 
 auth_bp = Blueprint('auth', __name__)
@@ -76,7 +77,8 @@ def logout():
 @login_required
 def profile():
     """用户资料页面"""
-    return render_template('profile.html', user=current_user)
+    return render_template('profile.html', user=current_user,
+                           for_you=for_user(current_user.id))
 
 
 @auth_bp.route('/profile/edit', methods=['GET', 'POST'])
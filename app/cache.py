@@ -0,0 +1,159 @@
+"""
+进程内结果缓存
+
+ResultCache: 带 TTL 的键值缓存。未命中时同一个 key 只会被一个线程计算
+（single-flight），其他并发请求等待结果，避免缓存击穿时压垮数据库。
+
+LRUCache: 按条目数和总权重（例如缓存的 id 数量）限制内存的 LRU 缓存，
+用于键空间很大的搜索结果。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_MISSING = object()
+
+
+class ResultCache:
+    """带 TTL 与 single-flight 的结果缓存"""
+
+    def __init__(self, default_ttl=60):
+        self.default_ttl = default_ttl
+        self._entries = {}       # key -> (过期时间, 值)
+        self._generations = {}   # key -> 失效次数，用于丢弃计算期间被失效的结果
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, key):
+        """读取未过期的缓存值，不存在时返回 None（不触发计算）"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """读取缓存，未命中时调用 compute() 计算并写入"""
+        value = self.peek(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # 等待期间其他线程可能已经算好
+            value = self.peek(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            generation = self._generations.get(key, 0)
+            value = compute()
+            with self._lock:
+                if self._generations.get(key, 0) == generation:
+                    expires = time.monotonic() + (ttl or self.default_ttl)
+                    self._entries[key] = (expires, value)
+            return value
+
+    def invalidate(self, key):
+        """使单个 key 失效"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_prefix(self, prefix):
+        """使所有以 prefix 开头的 key 失效"""
+        with self._lock:
+            keys = [key for key in list(self._entries) + list(self._key_locks)
+                    if key.startswith(prefix)]
+            for key in set(keys):
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        """清空缓存"""
+        self.invalidate_prefix('')
+
+    def stats(self):
+        """缓存统计"""
+        return {'entries': len(self._entries), 'hits': self.hits,
+                'misses': self.misses}
+
+
+class LRUCache:
+    """有界 LRU 缓存，超过条目数或总权重时淘汰最久未使用的条目"""
+
+    def __init__(self, max_entries=1024, max_weight=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (过期时间或 None, 权重, 值)
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """读取缓存值，不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and \
+                    (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._pop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, weight=1):
+        """写入缓存；单个条目超过总权重上限时不缓存"""
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (expires, weight, value)
+            self._weight += weight
+            while len(self._entries) > self.max_entries or \
+                    (self.max_weight is not None and
+                     self._weight > self.max_weight):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _pop(self, key):
+        _, weight, _ = self._entries.pop(key)
+        self._weight -= weight
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def stats(self):
+        """缓存统计"""
+        return {'entries': len(self._entries), 'weight': self._weight,
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+
+def get_cache():
+    """返回当前应用的结果缓存"""
+    return current_app.extensions['result_cache']
+
+
+def init_cache(app):
+    """创建结果缓存"""
+    app.extensions['result_cache'] = ResultCache(app.config['RESULT_CACHE_TTL'])
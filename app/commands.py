@@ -0,0 +1,82 @@
+"""
+Flask 命令行命令
+"""
+import click
+from flask.cli import AppGroup
+
+likes_cli = AppGroup('likes', help='点赞数据维护命令')
+search_cli = AppGroup('search', help='搜索索引维护命令')
+recommend_cli = AppGroup('recommend', help='推荐数据维护命令')
+replica_cli = AppGroup('replica', help='只读副本命令')
+
+
+@likes_cli.command('reconcile')
+@click.option('--kind', type=click.Choice(['crop', 'meal']), default=None,
+              help='只修复指定类型')
+def reconcile_command(kind):
+    """按关联表重新计算 likes_count，修复计数偏差"""
+    from app.likes import reconcile_like_counts
+    repaired = reconcile_like_counts(kind)
+    for name, count in repaired.items():
+        click.echo(f'{name}: repaired {count} row(s)')
+
+
+@likes_cli.command('rollup')
+def rollup_command():
+    """把尚未汇总的完整自然日写入每日点赞汇总表"""
+    from app.rollups import rollup_likes
+    written = rollup_likes()
+    for name, count in written.items():
+        click.echo(f'{name}: wrote {count} daily row(s)')
+
+
+@search_cli.command('rebuild')
+def rebuild_search_command():
+    """按作物和菜品表重建全文索引"""
+    from app.search import rebuild_index
+    if rebuild_index():
+        click.echo('full-text index rebuilt')
+    else:
+        click.echo('full-text search is not available, using LIKE fallback')
+
+
+@recommend_cli.command('build')
+def build_recommend_command():
+    """离线计算物品相似度（"也喜欢" 与 "为你推荐"）"""
+    import time
+    from app.recommend import build_neighbors
+    start = time.perf_counter()
+    count = build_neighbors()
+    click.echo(f'recomputed neighbours for {count} item(s) '
+               f'in {time.perf_counter() - start:.1f}s')
+
+
+@replica_cli.command('sync')
+@click.option('--interval', type=float, default=None,
+              help='每隔多少秒复制一次（默认只复制一次）')
+def sync_replica_command(interval):
+    """把 SQLite 主库复制到 REPLICA_DATABASE_URL 指定的副本文件"""
+    import time
+    from flask import current_app
+    from app.replica import sync_sqlite_replica
+    app = current_app._get_current_object()
+    if not app.config.get('REPLICA_DATABASE_URL'):
+        raise click.UsageError('REPLICA_DATABASE_URL is not set')
+    while True:
+        start = time.perf_counter()
+        try:
+            sync_sqlite_replica(app)
+        except ValueError as error:
+            raise click.UsageError(str(error))
+        click.echo(f'replica synced in {time.perf_counter() - start:.2f}s')
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+def register_commands(app):
+    """注册命令行命令"""
+    app.cli.add_command(likes_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(recommend_cli)
+    app.cli.add_command(replica_cli)
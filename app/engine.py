@@ -0,0 +1,113 @@
+"""
+数据库引擎配置
+
+SQLite：在每个新连接上通过 connect 事件执行 config.py 中的 SQLITE_PRAGMAS。
+WAL 模式下读不阻塞写、写不阻塞读；busy_timeout 让写入在锁被占用时等待
+而不是立即报 "database is locked"。
+MySQL：设置连接池大小、溢出、回收时间和取连接前的存活检测。
+
+写入冲突（SQLite 的锁超时、MySQL 的死锁/锁等待超时）由 run_with_retries
+回滚后按带随机抖动的指数退避重试。
+"""
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+# MySQL 中表示可以重试的错误码：锁等待超时、死锁
+_MYSQL_RETRY_CODES = {1205, 1213}
+
+
+def engine_options(config):
+    """按数据库类型生成 SQLALCHEMY_ENGINE_OPTIONS（配置中已有的选项优先）"""
+    options = {}
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend == 'mysql':
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=True,
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def _pragma_value(value):
+    return value if isinstance(value, int) else str(value).upper()
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """在引擎的每个新连接上执行 PRAGMA"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {_pragma_value(value)}')
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', on_connect)
+
+
+def sqlite_pragmas(engine, names):
+    """读取连接上当前生效的 PRAGMA（用于检查配置）"""
+    with engine.connect() as conn:
+        return {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in names}
+
+
+def init_engine(app):
+    """为应用的所有 SQLite 引擎注册连接时执行的 PRAGMA"""
+    if not app.config['SQLITE_TUNING']:
+        return
+    pragmas = dict(app.config['SQLITE_PRAGMAS'])
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != 'sqlite':
+                continue
+            if engine.url.database in (None, '', ':memory:'):
+                # 内存数据库不支持 WAL 和 mmap，只设置其余的项
+                engine_pragmas = {k: v for k, v in pragmas.items()
+                                  if k not in ('journal_mode', 'mmap_size')}
+            else:
+                engine_pragmas = pragmas
+            apply_sqlite_pragmas(engine, engine_pragmas)
+
+
+def is_retryable(error):
+    """判断是否为可以重试的锁冲突"""
+    if not isinstance(error, OperationalError):
+        return False
+    orig = error.orig
+    code = orig.args[0] if getattr(orig, 'args', None) else None
+    if code in _MYSQL_RETRY_CODES:
+        return True
+    message = str(orig).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def run_with_retries(func, *args, **kwargs):
+    """执行一次写入，遇到锁冲突时回滚并重试
+
+    第 n 次重试前等待 uniform(0, min(上限, 基数 * 2^n)) 秒（full jitter），
+    避免多个写入同时醒来再次冲突。重试用尽后抛出最后一次的异常。
+    """
+    config = current_app.config
+    retries = config['DB_WRITE_RETRIES']
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as error:
+            db.session.rollback()
+            if attempt == retries or not is_retryable(error):
+                raise
+            delay = min(config['DB_RETRY_MAX_DELAY'],
+                        config['DB_RETRY_BASE_DELAY'] * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
@@ -7,7 +7,8 @@ from wtforms import (
     SelectField, RadioField, BooleanField, IntegerField, FloatField
 )
 from wtforms.validators import (
-    DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
+    DataRequired, Email, EqualTo, Length, ValidationError, NumberRange,
+    Optional
 )
 from app.models import User
 
@@ -104,12 +105,21 @@ class SearchForm(FlaskForm):
         choices=[
             ('name', 'By Name (A-Z)'),
             ('hunger', 'By Hunger Restored (Desc)'),
-            ('likes', 'By Likes (Desc)')
+            ('likes', 'By Likes (Desc)'),
+            ('relevance', 'By Relevance')
         ],
         default='name',
         validators=[DataRequired()]
     )
 
+    # 6. Checkbox
+    fuzzy = BooleanField('Typo tolerant (fuzzy match on names)')
+
+    # Result page, sent by the pagination buttons
+    page = IntegerField('Page', default=1, validators=[
+        Optional(), NumberRange(min=1)
+    ])
+
     # 3. Submit Button
     submit = SubmitField('Search')
 
@@ -0,0 +1,201 @@
+"""
+三元组（trigram）模糊搜索
+
+每个物品的名称（整体和其中的每个单词，可选加上描述中的单词）作为词条，
+按 pg_trgm 的方式拆成三元组建立倒排索引。查询时只遍历查询词三元组的
+倒排表统计重叠数，按 Jaccard 相似度排序，不需要与每一行计算编辑距离。
+索引在首次使用时构建，之后由 catalog_changed 信号增量更新。
+"""
+import re
+import threading
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Crop, Meal
+from app.resync import ResyncingIndex
+from app.signals import catalog_changed
+
+FUZZY_MODELS = {'crop': Crop, 'meal': Meal}
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# 参与索引的单词最短长度（过短的单词三元组太少，容易误匹配）
+_MIN_WORD = 3
+
+
+def trigrams(text):
+    """拆分三元组：每个单词前补两个空格、后补一个空格"""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _terms(name, description=None):
+    """物品的索引词条：完整名称、名称中的单词以及（可选）描述中的单词"""
+    terms = {name.lower()}
+    words = _WORD_RE.findall(name.lower())
+    if description:
+        words += _WORD_RE.findall(description.lower())
+    terms.update(word for word in words if len(word) >= _MIN_WORD)
+    return terms
+
+
+class TrigramIndex:
+    """三元组倒排索引"""
+
+    def __init__(self):
+        self._postings = {}   # 三元组 -> {词条, ...}
+        self._sizes = {}      # 词条 -> 三元组数量
+        self._owners = {}     # 词条 -> {(类型, id), ...}
+        self._items = {}      # (类型, id) -> (名称, 词条集合)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @classmethod
+    def build(cls, items):
+        """由 [(类型, id, 名称, 描述或 None), ...] 构建索引"""
+        index = cls()
+        for kind, item_id, name, description in items:
+            index._add((kind, item_id), name, description)
+        return index
+
+    def _add(self, ref, name, description):
+        terms = _terms(name, description)
+        self._items[ref] = (name, terms)
+        for term in terms:
+            owners = self._owners.setdefault(term, set())
+            if not owners:
+                grams = trigrams(term)
+                self._sizes[term] = len(grams)
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(term)
+            owners.add(ref)
+
+    def _discard(self, ref):
+        entry = self._items.pop(ref, None)
+        if entry is None:
+            return
+        for term in entry[1]:
+            owners = self._owners[term]
+            owners.discard(ref)
+            if owners:
+                continue
+            del self._owners[term]
+            del self._sizes[term]
+            for gram in trigrams(term):
+                postings = self._postings[gram]
+                postings.discard(term)
+                if not postings:
+                    del self._postings[gram]
+
+    def upsert(self, kind, item_id, name, description=None):
+        """新增或修改一个物品"""
+        with self._lock:
+            self._discard((kind, item_id))
+            self._add((kind, item_id), name, description)
+
+    def remove(self, kind, item_id):
+        """删除一个物品"""
+        with self._lock:
+            self._discard((kind, item_id))
+
+    def search(self, query, kind=None, threshold=0.3, limit=200):
+        """返回 [(类型, id, 名称, 相似度), ...]，相似度高的在前
+
+        查询与每个词条按 |A∩B| / |A∪B| 计算相似度，物品取其词条中的最大值。
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        with self._lock:
+            overlaps = Counter()
+            for gram in grams:
+                overlaps.update(self._postings.get(gram, ()))
+
+            scores = {}
+            for term, overlap in overlaps.items():
+                similarity = overlap / (len(grams) + self._sizes[term] - overlap)
+                if similarity < threshold:
+                    continue
+                for ref in self._owners[term]:
+                    if (kind is None or ref[0] == kind) and \
+                            similarity > scores.get(ref, 0):
+                        scores[ref] = similarity
+            ranked = sorted(
+                scores.items(),
+                key=lambda pair: (-pair[1], self._items[pair[0]][0].lower())
+            )[:limit]
+            return [(ref[0], ref[1], self._items[ref][0], similarity)
+                    for ref, similarity in ranked]
+
+    def did_you_mean(self, query, threshold=0.3):
+        """与查询最相近、但不相同的物品名称，没有时返回 None"""
+        for _, _, name, _ in self.search(query, threshold=threshold, limit=5):
+            if name.lower() != query.strip().lower():
+                return name
+        return None
+
+
+class FuzzyMatcher(ResyncingIndex):
+    """每个应用一个三元组索引，首次使用时构建，定期在后台重建"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.include_descriptions = app.config['FUZZY_INCLUDE_DESCRIPTIONS']
+        self.threshold = app.config['FUZZY_THRESHOLD']
+
+    def _columns(self, model):
+        if self.include_descriptions:
+            return select(model.id, model.name, model.description)
+        return select(model.id, model.name)
+
+    def _load(self):
+        items = []
+        for kind, model in FUZZY_MODELS.items():
+            for row in db.session.execute(self._columns(model)):
+                items.append((kind, row.id, row.name,
+                              row.description if self.include_descriptions
+                              else None))
+        return TrigramIndex.build(items)
+
+    def search(self, query, kind=None, limit=200):
+        return self.index().search(query, kind, self.threshold, limit)
+
+    def did_you_mean(self, query):
+        return self.index().did_you_mean(query, self.threshold)
+
+    def refresh(self, kind, item_id):
+        """按数据库中的当前值更新一个物品"""
+        model = FUZZY_MODELS[kind]
+        row = db.session.execute(
+            self._columns(model).where(model.id == item_id)
+        ).first()
+        if row is None:
+            self.update(lambda index: index.remove(kind, item_id))
+        else:
+            description = row.description if self.include_descriptions else None
+            self.update(
+                lambda index: index.upsert(kind, item_id, row.name, description)
+            )
+
+
+def get_fuzzy():
+    """返回当前应用的模糊搜索索引"""
+    return current_app.extensions['fuzzy']
+
+
+def _on_catalog_changed(app, kind, item_id, **extra):
+    app.extensions['fuzzy'].refresh(kind, item_id)
+
+
+def init_fuzzy(app):
+    """创建模糊搜索索引并订阅后台修改"""
+    app.extensions['fuzzy'] = FuzzyMatcher(app)
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
@@ -0,0 +1,100 @@
+"""
+按请求统计 SQL（读取 SQLALCHEMY_RECORD_QUERIES 记录的查询）
+
+每个请求结束时汇总本请求执行的语句数、数据库总耗时、最慢的几条语句，
+以及同一形状（参数位置相同、IN 列表长度不计）的语句重复执行
+SQL_REPEAT_THRESHOLD 次以上的情况（N+1 查询）。
+
+结果写入 Server-Timing 响应头（浏览器开发者工具的 Timing 面板可见）：
+    Server-Timing: db;dur=4.21;desc="6 queries", db-repeated;desc="1 shape"
+重复的语句形状记 WARNING 日志（附调用位置），数据库耗时超过
+SQL_LOG_REQUEST_MS 的请求记 INFO 日志，并发送 queries_recorded 信号
+（tests/query_budget.py 用它检查每个路由的查询预算）。
+"""
+import re
+from collections import namedtuple
+
+from flask import current_app, g, request
+from flask_sqlalchemy.record_queries import get_recorded_queries
+
+from app.signals import queries_recorded
+
+# 一个请求的统计：count 语句数，duration 总耗时（秒），
+# slowest [(耗时, 语句, 调用位置), ...]，repeated [(形状, 次数, 调用位置), ...]
+QueryStats = namedtuple('QueryStats', ['count', 'duration', 'slowest', 'repeated'])
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def statement_shape(statement):
+    """语句形状：合并空白，IN (?, ?, ...) 视为 IN (?)"""
+    return _IN_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+def summarize_queries(queries, slowest=3, repeat_threshold=3):
+    """汇总 get_recorded_queries() 返回的查询记录"""
+    shapes = {}
+    for query in queries:
+        shape = statement_shape(query.statement)
+        if shape in shapes:
+            shapes[shape][0] += 1
+        else:
+            shapes[shape] = [1, query.location]
+    ranked = sorted(queries, key=lambda query: query.duration, reverse=True)
+    return QueryStats(
+        count=len(queries),
+        duration=sum(query.duration for query in queries),
+        slowest=[(query.duration, query.statement, query.location)
+                 for query in ranked[:slowest]],
+        repeated=sorted(((shape, times, location)
+                         for shape, (times, location) in shapes.items()
+                         if times >= repeat_threshold),
+                        key=lambda item: -item[1]),
+    )
+
+
+def server_timing(stats):
+    """生成 Server-Timing 头的值"""
+    noun = 'query' if stats.count == 1 else 'queries'
+    value = f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} {noun}"'
+    if stats.repeated:
+        shapes = len(stats.repeated)
+        value += f', db-repeated;desc="{shapes} shape{"s" if shapes > 1 else ""}"'
+    return value
+
+
+def _start_request():
+    g._sql_query_start = len(get_recorded_queries())
+
+
+def _finish_request(response):
+    config = current_app.config
+    queries = get_recorded_queries()[g.pop('_sql_query_start', 0):]
+    stats = summarize_queries(queries, config['SQL_SLOW_STATEMENTS'],
+                              config['SQL_REPEAT_THRESHOLD'])
+    response.headers.add('Server-Timing', server_timing(stats))
+
+    route = f'{request.method} {request.path}'
+    for shape, times, location in stats.repeated:
+        current_app.logger.warning(
+            f'SQL: {route} ran the same statement {times} times '
+            f'(possible N+1) at {location}: {shape[:200]}')
+    if stats.duration * 1000 >= config['SQL_LOG_REQUEST_MS']:
+        slowest = '; '.join(f'{duration * 1000:.1f} ms at {location}'
+                            for duration, _, location in stats.slowest)
+        current_app.logger.info(
+            f'SQL: {route} {stats.count} queries in '
+            f'{stats.duration * 1000:.1f} ms (slowest: {slowest})')
+
+    queries_recorded.send(current_app._get_current_object(), stats=stats,
+                          endpoint=request.endpoint)
+    return response
+
+
+def init_instrumentation(app):
+    """记录查询时注册请求统计（应在其他 before_request 之前注册）"""
+    if not (app.config['SQL_INSTRUMENTATION']
+            and app.config['SQLALCHEMY_RECORD_QUERIES']):
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
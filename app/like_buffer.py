@@ -0,0 +1,240 @@
+"""
+点赞写后缓冲（write-behind）
+
+点赞/取消点赞事件先进入进程内队列，按 (类型, 用户, 物品) 合并：
+点赞后又取消会直接抵消。后台线程在达到批量大小或时间阈值时，
+把队列中的事件放在一个事务中批量写入，大幅减少 SQLite 上的写锁竞争。
+写入失败的事件放回队列重试，同一事件连续失败 max_retries 次后丢弃并记录日志。
+"""
+import atexit
+import threading
+from collections import defaultdict
+
+from app.signals import likes_flushed
+
+
+class LikeBufferFull(Exception):
+    """缓冲队列已满且在等待时间内没有腾出空间"""
+
+
+class LikeWriteBuffer:
+    """点赞写后缓冲队列"""
+
+    def __init__(self, app, max_batch=500, flush_interval=1.0,
+                 max_pending=10000, block_timeout=2.0, max_retries=5):
+        self.app = app
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+
+        # (kind, user_id, item_id) -> 期望的点赞状态
+        self._pending = {}
+        # 正在落库的一批事件，落库完成前仍参与状态判断
+        self._inflight = {}
+        # (kind, item_id) -> 尚未落库的计数变化
+        self._deltas = defaultdict(int)
+        # (kind, user_id, item_id) -> 连续写入失败次数
+        self._failures = {}
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self.flush_count = 0
+        self.flushed_events = 0
+        self.dropped_events = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _base_state(self, key, persisted):
+        return self._inflight.get(key, persisted)
+
+    def effective_state(self, kind, user_id, item_id, persisted):
+        """用户对物品的当前点赞状态（数据库状态叠加待写事件）"""
+        key = (kind, user_id, item_id)
+        with self._cond:
+            return self._pending.get(key, self._base_state(key, persisted))
+
+    def pending_delta(self, kind, item_id):
+        """物品尚未落库的点赞数变化，用于返回乐观计数"""
+        with self._cond:
+            return self._deltas.get((kind, item_id), 0)
+
+    def submit(self, kind, user_id, item_id, liked, persisted):
+        """提交一个点赞事件
+
+        :param persisted: 数据库中当前的点赞状态
+        :return: 状态是否发生了变化
+        :raises LikeBufferFull: 队列已满且等待超时
+        """
+        key = (kind, user_id, item_id)
+        with self._cond:
+            base = self._base_state(key, persisted)
+            current = self._pending.get(key, base)
+            if liked == current:
+                return False
+
+            if liked == base:
+                # 与待写事件相互抵消
+                del self._pending[key]
+                self._failures.pop(key, None)
+            else:
+                if not self._wait_for_space():
+                    raise LikeBufferFull()
+                self._pending[key] = liked
+            self._deltas[(kind, item_id)] += 1 if liked else -1
+
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+            return True
+
+    def _wait_for_space(self):
+        """队列满时阻塞等待后台刷新（背压），需持有 self._cond"""
+        if len(self._pending) < self.max_pending:
+            return True
+        self._cond.notify_all()
+        if self._thread is None:
+            return False
+        return self._cond.wait_for(
+            lambda: len(self._pending) < self.max_pending,
+            timeout=self.block_timeout
+        )
+
+    def flush(self):
+        """把当前队列中的事件在一个事务中写入数据库
+
+        :return: 写入的事件数
+        """
+        from app import db
+        from app.likes import write_likes
+
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                self._cond.notify_all()
+
+            grouped = defaultdict(lambda: ([], []))
+            for (kind, user_id, item_id), liked in batch.items():
+                grouped[kind][0 if liked else 1].append((user_id, item_id))
+
+            try:
+                with self.app.app_context():
+                    try:
+                        for kind, (to_like, to_unlike) in grouped.items():
+                            write_likes(kind, to_like, to_unlike)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+            except Exception:
+                self.app.logger.exception('Like buffer flush failed')
+                self._requeue(batch)
+                raise
+
+            with self._cond:
+                self._inflight = {}
+                for key in batch:
+                    self._failures.pop(key, None)
+                for (kind, _, item_id), liked in batch.items():
+                    delta_key = (kind, item_id)
+                    self._deltas[delta_key] -= 1 if liked else -1
+                    if not self._deltas[delta_key]:
+                        del self._deltas[delta_key]
+                self.flush_count += 1
+                self.flushed_events += len(batch)
+            # 点赞信号在入队时已经发出，缓存的计数需要在落库后再刷新一次
+            with self.app.app_context():
+                likes_flushed.send(self.app, kinds=set(grouped))
+            return len(batch)
+
+    def _requeue(self, batch):
+        """写入失败：把事件放回队列并按合并后的队列重新计算计数变化"""
+        dropped = []
+        with self._cond:
+            for key, liked in batch.items():
+                if key in self._pending:
+                    # 落库期间到达的相反事件，与失败的事件相互抵消
+                    del self._pending[key]
+                    self._failures.pop(key, None)
+                    continue
+                failures = self._failures.get(key, 0) + 1
+                if failures >= self.max_retries:
+                    self._failures.pop(key, None)
+                    dropped.append(key)
+                else:
+                    self._failures[key] = failures
+                    self._pending[key] = liked
+            self._inflight = {}
+            self._deltas = defaultdict(int)
+            for (kind, _, item_id), liked in self._pending.items():
+                self._deltas[(kind, item_id)] += 1 if liked else -1
+            for delta_key in [k for k, v in self._deltas.items() if not v]:
+                del self._deltas[delta_key]
+            self.dropped_events += len(dropped)
+        if dropped:
+            self.app.logger.error(
+                f'Like buffer dropped {len(dropped)} events after '
+                f'{self.max_retries} failed writes: {dropped[:20]}')
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping
+                    or len(self._pending) >= self.max_batch,
+                    timeout=self.flush_interval
+                )
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:
+                pass    # flush() 已记录日志，事件留在队列中等待下次重试
+            if stopping:
+                return
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='like-write-behind', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """停止后台线程并写入剩余事件"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+def init_like_buffer(app):
+    """按配置启用点赞写后缓冲"""
+    if not app.config.get('LIKE_WRITE_BEHIND'):
+        return None
+
+    buffer = LikeWriteBuffer(
+        app,
+        max_batch=app.config['LIKE_BUFFER_MAX_BATCH'],
+        flush_interval=app.config['LIKE_BUFFER_FLUSH_INTERVAL'],
+        max_pending=app.config['LIKE_BUFFER_MAX_PENDING'],
+        block_timeout=app.config['LIKE_BUFFER_BLOCK_TIMEOUT'],
+        max_retries=app.config['LIKE_BUFFER_MAX_RETRIES'],
+    )
+    app.extensions['like_buffer'] = buffer
+    buffer.start()
+    if app.config['LIKE_BUFFER_FLUSH_ON_EXIT']:
+        # 进程退出前写入剩余事件
+        atexit.register(buffer.stop)
+    return buffer
@@ -0,0 +1,338 @@
+"""
+点赞相关的数据操作
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import (
+    delete, exists, false, func, literal, select, tuple_, update
+)
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import (
+    Crop, Meal, like_events, user_likes_crops, user_likes_meals
+)
+from app.signals import like_changed, like_counts_reset
+
+# 按 (user_id, item_id) 元组 IN 查询时每条语句的元组数
+_PAIR_CHUNK = 500
+
+# 点赞目标：类型 -> (模型, 关联表, 关联表中的物品外键列)
+LIKE_TARGETS = {
+    'crop': (Crop, user_likes_crops, user_likes_crops.c.crop_id),
+    'meal': (Meal, user_likes_meals, user_likes_meals.c.meal_id),
+}
+
+
+def count_subquery(kind):
+    """按关联表实时统计点赞数的相关子查询"""
+    model, table, item_col = LIKE_TARGETS[kind]
+    return (
+        select(func.count())
+        .select_from(table)
+        .where(item_col == model.id)
+        .scalar_subquery()
+    )
+
+
+def _insert_ignore(table):
+    """构造 insert-or-ignore 语句（按数据库方言选择写法）"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect in ('mysql', 'mariadb'):
+        return mysql.insert(table).prefix_with('IGNORE')
+    return table.insert()
+
+
+def get_like_buffer():
+    """返回当前应用启用的写后缓冲，未启用时返回 None"""
+    return current_app.extensions.get('like_buffer')
+
+
+def get_likes_count(kind, item_id):
+    """读取物品的点赞数（含写后缓冲中尚未落库的变化），不存在时返回 None"""
+    model = LIKE_TARGETS[kind][0]
+    count = db.session.execute(
+        select(model.likes_count).where(model.id == item_id)
+    ).scalar()
+    buffer = get_like_buffer()
+    if count is not None and buffer is not None:
+        count += buffer.pending_delta(kind, item_id)
+    return count
+
+
+def _probe_like(user_id, kind, item_id):
+    """通过主键做存在性探测，判断关联行是否存在"""
+    model, table, item_col = LIKE_TARGETS[kind]
+    return db.session.execute(
+        select(exists().where(table.c.user_id == user_id,
+                              item_col == item_id))
+    ).scalar()
+
+
+def _liked_at(user_id, kind, item_id):
+    """通过主键读取点赞时间，未点赞时返回 None"""
+    model, table, item_col = LIKE_TARGETS[kind]
+    return db.session.execute(
+        select(table.c.liked_at).where(table.c.user_id == user_id,
+                                       item_col == item_id)
+    ).scalar()
+
+
+def is_liked(user_id, kind, item_id):
+    """判断用户是否已点赞（叠加写后缓冲中的待写状态）"""
+    persisted = _probe_like(user_id, kind, item_id)
+    buffer = get_like_buffer()
+    if buffer is not None:
+        return buffer.effective_state(kind, user_id, item_id, persisted)
+    return persisted
+
+
+def liked_column(user_id, kind):
+    """当前用户是否点赞的 EXISTS 列（匿名用户为 false），与物品放在同一条查询中"""
+    model, table, item_col = LIKE_TARGETS[kind]
+    if user_id is None:
+        return false().label('is_liked')
+    return exists().where(table.c.user_id == user_id,
+                          item_col == model.id).label('is_liked')
+
+
+def apply_pending(user_id, kind, item_id, liked, count):
+    """在查询得到的点赞状态和点赞数上叠加写后缓冲中尚未落库的变化"""
+    buffer = get_like_buffer()
+    if buffer is None:
+        return liked, count
+    if user_id is not None:
+        liked = buffer.effective_state(kind, user_id, item_id, liked)
+    return liked, count + buffer.pending_delta(kind, item_id)
+
+
+def get_like_states(user_id, kind, ids):
+    """批量读取点赞状态
+
+    每种类型只执行一条查询：物品表按主键 IN 过滤，
+    左外连接当前用户在关联表中的行。
+
+    :param user_id: 当前用户 ID，匿名用户传 None
+    :return: {item_id: {'likes_count': int, 'is_liked': bool}}
+    """
+    if not ids:
+        return {}
+    model, table, item_col = LIKE_TARGETS[kind]
+    if user_id is None:
+        stmt = select(model.id, model.likes_count, false())
+    else:
+        stmt = (
+            select(model.id, model.likes_count,
+                   table.c.user_id.isnot(None))
+            .outerjoin(table, (item_col == model.id)
+                       & (table.c.user_id == user_id))
+        )
+    rows = db.session.execute(stmt.where(model.id.in_(list(ids)))).all()
+
+    buffer = get_like_buffer()
+    states = {}
+    for item_id, likes_count, liked in rows:
+        liked = bool(liked)
+        if buffer is not None:
+            likes_count += buffer.pending_delta(kind, item_id)
+            if user_id is not None:
+                liked = buffer.effective_state(kind, user_id, item_id, liked)
+        states[item_id] = {'likes_count': likes_count, 'is_liked': liked}
+    return states
+
+
+def set_like(user_id, kind, item_id, liked):
+    """幂等地设置点赞状态
+
+    点赞使用单条 insert-or-ignore，取消点赞使用单条 delete，
+    仅当关联行确实发生变化时才更新计数，二者在同一事务中提交。
+    启用写后缓冲时只把事件放入缓冲队列，由后台批量落库。
+
+    :return: 状态是否发生了变化
+    """
+    buffer = get_like_buffer()
+    if buffer is not None:
+        liked_at = _liked_at(user_id, kind, item_id)
+        changed = buffer.submit(kind, user_id, item_id, liked,
+                                liked_at is not None)
+        if changed:
+            _notify(kind, item_id, liked, liked_at or datetime.utcnow())
+        return changed
+
+    model, table, item_col = LIKE_TARGETS[kind]
+    if liked:
+        liked_at = datetime.utcnow()
+        try:
+            result = db.session.execute(
+                _insert_ignore(table).values(
+                    {'user_id': user_id, item_col.name: item_id,
+                     'liked_at': liked_at}
+                )
+            )
+        except IntegrityError:
+            # 不支持 insert-or-ignore 的数据库：并发的重复点赞
+            db.session.rollback()
+            return False
+        changed = result.rowcount == 1
+        delta = 1
+    else:
+        stmt = delete(table).where(table.c.user_id == user_id,
+                                   item_col == item_id)
+        if db.session.get_bind().dialect.delete_returning:
+            liked_at = db.session.execute(
+                stmt.returning(table.c.liked_at)
+            ).scalar()
+        else:
+            liked_at = _liked_at(user_id, kind, item_id)
+            if liked_at is not None and db.session.execute(stmt).rowcount != 1:
+                liked_at = None
+        changed = liked_at is not None
+        delta = -1
+
+    if changed:
+        db.session.execute(
+            update(model)
+            .where(model.id == item_id)
+            .values(likes_count=model.likes_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+        _journal(kind, [(item_id, delta)])
+    db.session.commit()
+    if changed:
+        _notify(kind, item_id, liked, liked_at)
+    return changed
+
+
+def _notify(kind, item_id, liked, liked_at):
+    """广播点赞变化（在事务提交之后调用）"""
+    like_changed.send(current_app._get_current_object(), kind=kind,
+                      item_id=item_id, liked=liked, liked_at=liked_at)
+
+
+def write_likes(kind, to_like, to_unlike):
+    """批量写入一组点赞/取消点赞（不提交事务）
+
+    只为实际插入或删除的行写入事件日志：其他进程可能已经写入了相同的变化，
+    这时 insert-or-ignore / delete 不改变任何行，不应再计入每日汇总。
+
+    :param to_like: [(user_id, item_id), ...]
+    :param to_unlike: [(user_id, item_id), ...]
+    """
+    model, table, item_col = LIKE_TARGETS[kind]
+    liked = _insert_likes(table, item_col, to_like) if to_like else []
+    unliked = _delete_likes(table, item_col, to_unlike) if to_unlike else []
+    touched = {i for _, i in to_like} | {i for _, i in to_unlike}
+    if touched:
+        _recount(kind, touched)
+    if liked or unliked:
+        _journal(kind, [(i, 1) for i in liked] + [(i, -1) for i in unliked])
+
+
+def _existing_likes(table, item_col, pairs):
+    """已存在的 (user_id, item_id)（不支持 RETURNING 的数据库使用）"""
+    key = tuple_(table.c.user_id, item_col)
+    existing = set()
+    for start in range(0, len(pairs), _PAIR_CHUNK):
+        existing.update(db.session.execute(
+            select(table.c.user_id, item_col)
+            .where(key.in_(pairs[start:start + _PAIR_CHUNK]))
+        ).tuples())
+    return existing
+
+
+def _insert_likes(table, item_col, pairs):
+    """插入点赞（已存在的忽略），返回实际插入的物品 id 列表"""
+    rows = [{'user_id': u, item_col.name: i} for u, i in pairs]
+    stmt = _insert_ignore(table)
+    if db.session.get_bind().dialect.insert_executemany_returning:
+        return db.session.execute(stmt.returning(item_col), rows).scalars().all()
+    existing = _existing_likes(table, item_col, pairs)
+    db.session.execute(stmt, rows)
+    return [i for u, i in pairs if (u, i) not in existing]
+
+
+def _delete_likes(table, item_col, pairs):
+    """删除点赞，返回实际删除的物品 id 列表"""
+    returning = db.session.get_bind().dialect.delete_returning
+    existing = None if returning else _existing_likes(table, item_col, pairs)
+    deleted = []
+    key = tuple_(table.c.user_id, item_col)
+    for start in range(0, len(pairs), _PAIR_CHUNK):
+        stmt = delete(table).where(key.in_(pairs[start:start + _PAIR_CHUNK]))
+        if returning:
+            deleted += db.session.execute(stmt.returning(item_col)).scalars()
+        else:
+            db.session.execute(stmt)
+    if existing is not None:
+        deleted = [i for u, i in pairs if (u, i) in existing]
+    return deleted
+
+
+def _journal(kind, changes):
+    """写入点赞事件日志（不提交事务）
+
+    :param changes: [(item_id, delta), ...]
+    """
+    now = datetime.utcnow()
+    db.session.execute(
+        like_events.insert(),
+        [{'item_type': kind, 'item_id': item_id, 'delta': delta,
+          'created_at': now} for item_id, delta in changes]
+    )
+
+
+def release_user_likes(user_id):
+    """用户被删除前，扣减其点赞过的作物/菜品的计数并记录取消点赞事件
+
+    需要在删除关联行的同一事务中调用。
+    """
+    now = datetime.utcnow()
+    for kind, (model, table, item_col) in LIKE_TARGETS.items():
+        liked_ids = select(item_col).where(table.c.user_id == user_id)
+        db.session.execute(
+            like_events.insert().from_select(
+                ['item_type', 'item_id', 'delta', 'created_at'],
+                select(literal(kind), item_col, literal(-1), literal(now))
+                .where(table.c.user_id == user_id)
+            )
+        )
+        db.session.execute(
+            update(model)
+            .where(model.id.in_(liked_ids))
+            .values(likes_count=model.likes_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def reconcile_like_counts(kind=None, ids=None):
+    """修复 likes_count 与关联表之间的偏差
+
+    :param kind: 'crop' / 'meal'，为 None 时处理全部类型
+    :param ids: 仅处理给定的物品 ID
+    :return: {类型: 被修复的行数}
+    """
+    kinds = [kind] if kind else list(LIKE_TARGETS)
+    repaired = {name: _recount(name, ids) for name in kinds}
+    db.session.commit()
+    if any(repaired.values()):
+        like_counts_reset.send(current_app._get_current_object())
+    return repaired
+
+
+def _recount(kind, ids=None):
+    """按关联表重算 likes_count（不提交事务），返回被修改的行数"""
+    model = LIKE_TARGETS[kind][0]
+    actual = count_subquery(kind)
+    stmt = (
+        update(model)
+        .where(model.likes_count != actual)
+        .values(likes_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        stmt = stmt.where(model.id.in_(list(ids)))
+    return db.session.execute(stmt).rowcount
@@ -0,0 +1,159 @@
+"""
+列表页的游标（keyset）分页
+
+按 (name, id) 排序，游标是某一页边界行的 (name, id)。
+下一页用 WHERE (name, id) > (:name, :id) 沿名称索引直接定位，
+不需要 OFFSET 扫描前面的行，深翻页与第一页代价相同。
+只读取卡片显示的列（摘要代替完整描述），结果是 Card 而不是 ORM 实例。
+总数缓存在内存中，本进程的后台修改立即清空，其他进程的修改
+最多 RESULT_CACHE_TTL 秒后重新统计。
+开启目录快照时直接在快照的有序列表上二分查找，不查询数据库。
+"""
+import base64
+import json
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, select, tuple_
+
+from app import db
+from app.models import Crop, Meal
+from app.readmodels import card_columns, to_cards
+from app.signals import catalog_changed
+from app.snapshot import get_snapshot
+
+LIST_MODELS = {'crop': Crop, 'meal': Meal}
+
+
+def encode_cursor(name, item_id):
+    """把 (name, id) 编码为 URL 安全的游标"""
+    raw = json.dumps([name, item_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        name, item_id = json.loads(raw.decode('utf-8'))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(name, str) or not isinstance(item_id, int):
+        raise ValueError('invalid cursor')
+    return name, item_id
+
+
+class KeysetPage:
+    """一页列表结果"""
+
+    def __init__(self, items, per_page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+class CatalogCounts:
+    """每个应用一份作物/菜品总数缓存，后台修改后清空，过期后重新统计"""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._counts = {}    # kind -> (过期时间, 总数)
+        self._lock = threading.Lock()
+
+    def get(self, kind):
+        entry = self._counts.get(kind)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        model = LIST_MODELS[kind]
+        count = db.session.execute(
+            select(func.count()).select_from(model)
+        ).scalar()
+        with self._lock:
+            self._counts[kind] = (time.monotonic() + self.ttl, count)
+        return count
+
+    def clear(self, kind=None):
+        with self._lock:
+            if kind is None:
+                self._counts.clear()
+            else:
+                self._counts.pop(kind, None)
+
+
+def get_catalog_counts():
+    """返回当前应用的总数缓存"""
+    return current_app.extensions['catalog_counts']
+
+
+def _query_page(kind, after, before, offset, limit):
+    """从数据库读取一段 Card（before 时按倒序）"""
+    model = LIST_MODELS[kind]
+    key = tuple_(model.name, model.id)
+    stmt = select(*card_columns(kind)).limit(limit)
+    if before is not None:
+        stmt = stmt.where(key < tuple_(*before)) \
+            .order_by(model.name.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(model.name.asc(), model.id.asc())
+        if after is not None:
+            stmt = stmt.where(key > tuple_(*after))
+        elif offset:
+            stmt = stmt.offset(offset)
+    return to_cards(db.session.execute(stmt))
+
+
+def keyset_page(kind, after=None, before=None, offset=None, per_page=None):
+    """按 (name, id) 读取一页
+
+    :param after: 游标，读取其后的一页
+    :param before: 游标，读取其前的一页
+    :param offset: 兼容旧的 ?page= 链接，从第几行开始（之后的翻页仍使用游标）
+    :return: KeysetPage
+    """
+    per_page = per_page or current_app.config['ITEMS_PER_PAGE']
+    after_key = decode_cursor(after) if after is not None else None
+    before_key = decode_cursor(before) if before is not None else None
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        items = snapshot.slice(kind, after_key, before_key, offset,
+                               per_page + 1)
+        total = snapshot.count(kind)
+    else:
+        items = _query_page(kind, after_key, before_key, offset, per_page + 1)
+        total = get_catalog_counts().get(kind)
+
+    more = len(items) > per_page
+    items = items[:per_page]
+    if before is not None:
+        items.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = after is not None or bool(offset), more
+
+    first, last = (items[0], items[-1]) if items else (None, None)
+    return KeysetPage(
+        items, per_page, total,
+        encode_cursor(last.name, last.id) if has_next and last else None,
+        encode_cursor(first.name, first.id) if has_prev and first else None,
+    )
+
+
+def _on_catalog_changed(app, kind, **extra):
+    app.extensions['catalog_counts'].clear(kind)
+
+
+def init_listing(app):
+    """创建总数缓存并订阅后台修改"""
+    app.extensions['catalog_counts'] = CatalogCounts(app.config['RESULT_CACHE_TTL'])
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
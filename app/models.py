@@ -4,14 +4,32 @@
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import validates
+from sqlalchemy.sql import ClauseElement
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# 列表卡片中描述摘要的最大长度（超出部分截断并加省略号）
+SUMMARY_LENGTH = 100
+
+
+def summarize(description):
+    """生成列表卡片使用的描述摘要"""
+    if not description:
+        return None
+    if len(description) > SUMMARY_LENGTH:
+        return description[:SUMMARY_LENGTH] + '...'
+    return description
+
+
 # 关联表：菜品-食材（多对多）
 meal_ingredients = db.Table(
     'meal_ingredients',
     db.Column('meal_id', db.Integer, db.ForeignKey('meal.id'), primary_key=True),
     db.Column('crop_id', db.Integer, db.ForeignKey('crop.id'), primary_key=True),
-    db.Column('quantity', db.Integer, default=1, nullable=False)
+    db.Column('quantity', db.Integer, default=1, nullable=False),
+    # 主键以 meal_id 开头；按作物查菜品（crop.meals、详情页相关菜品）使用该覆盖索引
+    db.Index('ix_meal_ingredients_crop_id', 'crop_id', 'meal_id', 'quantity')
 )
 
 # 关联表：用户-作物点赞（多对多）
@@ -19,7 +37,10 @@ user_likes_crops = db.Table(
     'user_likes_crops',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
     db.Column('crop_id', db.Integer, db.ForeignKey('crop.id'), primary_key=True),
-    db.Column('liked_at', db.DateTime, default=datetime.utcnow, nullable=False)
+    db.Column('liked_at', db.DateTime, default=datetime.utcnow, nullable=False),
+    # 主键以 user_id 开头；按物品统计/查找点赞用户、按时间窗口加载点赞使用这两个覆盖索引
+    db.Index('ix_user_likes_crops_crop_id', 'crop_id', 'user_id'),
+    db.Index('ix_user_likes_crops_liked_at', 'liked_at', 'crop_id')
 )
 
 # 关联表：用户-菜品点赞（多对多）
@@ -27,7 +48,57 @@ user_likes_meals = db.Table(
     'user_likes_meals',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
     db.Column('meal_id', db.Integer, db.ForeignKey('meal.id'), primary_key=True),
-    db.Column('liked_at', db.DateTime, default=datetime.utcnow, nullable=False)
+    db.Column('liked_at', db.DateTime, default=datetime.utcnow, nullable=False),
+    # 主键以 user_id 开头；按物品统计/查找点赞用户、按时间窗口加载点赞使用这两个覆盖索引
+    db.Index('ix_user_likes_meals_meal_id', 'meal_id', 'user_id'),
+    db.Index('ix_user_likes_meals_liked_at', 'liked_at', 'meal_id')
+)
+
+# 点赞事件日志（只追加）：每次点赞状态变化写入一行，delta 为 +1/-1
+like_events = db.Table(
+    'like_events',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('item_type', db.String(10), nullable=False),
+    db.Column('item_id', db.Integer, nullable=False),
+    db.Column('delta', db.SmallInteger, nullable=False),
+    db.Column('created_at', db.DateTime, default=datetime.utcnow,
+              nullable=False, index=True)
+)
+
+# 每日点赞汇总：作物（不设外键，删除作物后保留历史数据）
+crop_like_daily = db.Table(
+    'crop_like_daily',
+    db.Column('crop_id', db.Integer, primary_key=True),
+    db.Column('day', db.Date, primary_key=True),
+    db.Column('likes_gained', db.Integer, default=0, nullable=False),
+    db.Column('likes_lost', db.Integer, default=0, nullable=False)
+)
+
+# 每日点赞汇总：菜品
+meal_like_daily = db.Table(
+    'meal_like_daily',
+    db.Column('meal_id', db.Integer, primary_key=True),
+    db.Column('day', db.Date, primary_key=True),
+    db.Column('likes_gained', db.Integer, default=0, nullable=False),
+    db.Column('likes_lost', db.Integer, default=0, nullable=False)
+)
+
+# 物品相似度（协同过滤离线任务写入）：每个作物/菜品保存前 k 个相似物品
+item_neighbors = db.Table(
+    'item_neighbors',
+    db.Column('item_type', db.String(10), primary_key=True),
+    db.Column('item_id', db.Integer, primary_key=True),
+    db.Column('neighbor_type', db.String(10), primary_key=True),
+    db.Column('neighbor_id', db.Integer, primary_key=True),
+    db.Column('score', db.Float, nullable=False),
+    db.Column('computed_at', db.DateTime, nullable=False, index=True)
+)
+
+# 目录版本号（单行）：后台每次修改作物/菜品时加一，各进程据此重新加载目录快照
+catalog_version = db.Table(
+    'catalog_version',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('version', db.Integer, default=0, nullable=False)
 )
 
 
@@ -74,8 +145,13 @@ class Crop(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
+    # 描述摘要，写入 description 时同步维护，列表页只读取这一列
+    summary = db.Column(db.String(SUMMARY_LENGTH + 3), nullable=True)
     image_url = db.Column(db.String(255), nullable=True)
     hunger_points = db.Column(db.Integer, default=0, nullable=False)
+    # 冗余点赞计数，与 user_likes_crops 在同一事务中维护
+    likes_count = db.Column(db.Integer, default=0, server_default='0',
+                            nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # 多对多关系：使用此作物的菜品（通过 meal_ingredients）
@@ -87,7 +163,12 @@ class Crop(db.Model):
 
     def get_likes_count(self):
         """获取点赞数"""
-        return self.liked_by_users.count()
+        return self.likes_count or 0
+
+    @validates('description')
+    def _update_summary(self, key, description):
+        self.summary = summarize(description)
+        return description
 
     def __repr__(self):
         return f'<Crop {self.name}>'
@@ -100,14 +181,54 @@ class Meal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
+    # 描述摘要，写入 description 时同步维护，列表页只读取这一列
+    summary = db.Column(db.String(SUMMARY_LENGTH + 3), nullable=True)
     image_url = db.Column(db.String(255), nullable=True)
     hunger_restored = db.Column(db.Integer, default=0, nullable=False)
     saturation = db.Column(db.Float, default=0.0, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # 冗余点赞计数，与 user_likes_meals 在同一事务中维护
+    likes_count = db.Column(db.Integer, default=0, server_default='0',
+                            nullable=False, index=True)
+    # 排行榜 "最新菜品" 按创建时间倒序
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False,
+                           index=True)
 
     def get_likes_count(self):
         """获取点赞数"""
-        return self.liked_by_users.count()
+        return self.likes_count or 0
+
+    @validates('description')
+    def _update_summary(self, key, description):
+        self.summary = summarize(description)
+        return description
 
     def __repr__(self):
         return f'<Meal {self.name}>'
+
+
+def _adjust_likes_count(item, delta):
+    """调整点赞计数
+
+    已持久化的对象使用 SQL 表达式（likes_count = likes_count + delta），
+    在 flush 时随关联表的写入一起执行，避免并发下的读-改-写丢失。
+    """
+    current = item.__dict__.get('likes_count')
+    if not inspect(item).has_identity:
+        item.likes_count = (current or 0) + delta
+    elif isinstance(current, ClauseElement):
+        item.likes_count = current + delta
+    else:
+        item.likes_count = type(item).likes_count + delta
+
+
+# 通过关系集合点赞/取消点赞时同步计数（反向 backref 的修改也会触发这里）
+@event.listens_for(User.liked_crops, 'append')
+@event.listens_for(User.liked_meals, 'append')
+def _on_like_append(user, item, initiator):
+    _adjust_likes_count(item, 1)
+
+
+@event.listens_for(User.liked_crops, 'remove')
+@event.listens_for(User.liked_meals, 'remove')
+def _on_like_remove(user, item, initiator):
+    _adjust_likes_count(item, -1)
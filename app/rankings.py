@@ -0,0 +1,141 @@
+"""
+首页与排行榜的数据查询
+
+查询结果是只读的 Card（不含 ORM 实例），放在进程内结果缓存中。
+缓存只在点赞或后台修改可能改变排序时失效：
+取消点赞一个不在榜单中的物品、或点赞后仍达不到榜单门槛时，缓存保持不变。
+"""
+from sqlalchemy import select
+
+from app import db
+from app.cache import get_cache
+from app.likes import get_likes_count
+from app.models import Crop, Meal
+from app.readmodels import card_columns, to_card, to_cards
+from app.signals import (
+    catalog_changed, like_changed, like_counts_reset, likes_flushed
+)
+from app.trending import HOT, get_trending
+
+TOP_MEALS_LIMIT = 3
+RANKING_LIMIT = 10
+
+MODELS = {'crop': Crop, 'meal': Meal}
+
+
+def _load_top_meals():
+    rows = db.session.execute(
+        select(*card_columns('meal'))
+        .where(Meal.likes_count > 0)
+        .order_by(Meal.likes_count.desc(), Meal.name.asc())
+        .limit(TOP_MEALS_LIMIT)
+    ).all()
+    # 如果没有点赞数据，则按创建时间降序获取3个菜品
+    if not rows:
+        rows = db.session.execute(
+            select(*card_columns('meal'))
+            .order_by(Meal.created_at.desc())
+            .limit(TOP_MEALS_LIMIT)
+        ).all()
+    return [(card, card.likes_count) for card in to_cards(rows)]
+
+
+def top_meals():
+    """首页最受欢迎的菜品 [(行, 点赞数), ...]"""
+    return get_cache().get_or_compute('index:top_meals', _load_top_meals)
+
+
+def all_time_rankings(kind):
+    """总点赞排行榜 [(行, 点赞数), ...]"""
+    model = MODELS[kind]
+
+    def load():
+        rows = db.session.execute(
+            select(*card_columns(kind))
+            .order_by(model.likes_count.desc(), model.name.asc())
+            .limit(RANKING_LIMIT)
+        ).all()
+        return [(card, card.likes_count) for card in to_cards(rows)]
+
+    return get_cache().get_or_compute(f'rankings:{kind}:all', load)
+
+
+def trending_rankings(kind, window):
+    """趋势排行榜 [(行, 分数), ...]，顺序来自内存中的趋势榜"""
+    model = MODELS[kind]
+
+    def load():
+        ranked = get_trending().top(kind, window, limit=RANKING_LIMIT)
+        rows = {
+            row.id: to_card(row) for row in db.session.execute(
+                select(*card_columns(kind))
+                .where(model.id.in_([item_id for item_id, _ in ranked]))
+            )
+        }
+        return [
+            (rows[item_id], round(score, 1) if window == HOT else score)
+            for item_id, score in ranked if item_id in rows
+        ]
+
+    return get_cache().get_or_compute(f'trending:{kind}:{window}', load)
+
+
+def _affects_ordering(ranking, limit, kind, item_id, liked):
+    """判断一次点赞变化是否可能改变缓存的榜单"""
+    ids = {row.id for row, _ in ranking}
+    if item_id in ids:
+        return True
+    if not liked:
+        # 不在榜单中的物品点赞数减少，不会影响榜单
+        return False
+    if len(ranking) < limit:
+        return True
+    count = get_likes_count(kind, item_id) or 0
+    return count >= ranking[-1][1]
+
+
+def _on_like_changed(app, kind, item_id, liked, **extra):
+    cache = app.extensions['result_cache']
+    # 趋势榜本身在内存中，重新组装的代价很小
+    cache.invalidate_prefix(f'trending:{kind}:')
+
+    keys = [(f'rankings:{kind}:all', RANKING_LIMIT)]
+    if kind == 'meal':
+        keys.append(('index:top_meals', TOP_MEALS_LIMIT))
+    for key, limit in keys:
+        ranking = cache.peek(key)
+        if ranking is not None and \
+                _affects_ordering(ranking, limit, kind, item_id, liked):
+            cache.invalidate(key)
+
+
+def _on_likes_flushed(app, kinds, **extra):
+    # 写后缓冲落库之前重新填充的榜单读到的是旧的 likes_count
+    cache = app.extensions['result_cache']
+    for kind in kinds:
+        cache.invalidate_prefix(f'rankings:{kind}:')
+        cache.invalidate_prefix(f'trending:{kind}:')
+    if 'meal' in kinds:
+        cache.invalidate('index:top_meals')
+
+
+def _on_catalog_changed(app, kind, item_id, **extra):
+    cache = app.extensions['result_cache']
+    cache.invalidate_prefix(f'rankings:{kind}:')
+    cache.invalidate_prefix(f'trending:{kind}:')
+    if kind == 'meal':
+        cache.invalidate('index:top_meals')
+
+
+def _on_like_counts_reset(app, **extra):
+    cache = app.extensions['result_cache']
+    for prefix in ('rankings:', 'trending:', 'index:'):
+        cache.invalidate_prefix(prefix)
+
+
+def init_rankings(app):
+    """订阅会影响榜单的事件"""
+    like_changed.connect(_on_like_changed, sender=app, weak=False)
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
+    like_counts_reset.connect(_on_like_counts_reset, sender=app, weak=False)
+    likes_flushed.connect(_on_likes_flushed, sender=app, weak=False)
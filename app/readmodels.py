@@ -0,0 +1,55 @@
+"""
+只读页面的轻量读模型
+
+列表页、搜索、首页和排行榜的卡片只显示少数几个字段。这里用只选这些列的
+查询生成 Card（命名元组：没有 __dict__，不进入会话的标识映射，
+也没有关系描述符），而不是加载完整的 Crop/Meal ORM 实例。
+Card 与 SQLAlchemy 的结果对象无关，可以直接放进进程内缓存。
+"""
+from collections import namedtuple
+
+from sqlalchemy import literal, null
+
+from app.models import Crop, Meal
+
+CARD_MODELS = {'crop': Crop, 'meal': Meal}
+
+# 卡片字段；作物没有饱和度，为 None
+Card = namedtuple('Card', ['kind', 'id', 'name', 'image_url', 'hunger',
+                           'saturation', 'summary', 'likes_count'])
+
+_HUNGER = {'crop': Crop.hunger_points, 'meal': Meal.hunger_restored}
+_SATURATION = {'meal': Meal.saturation}
+
+
+def _build_columns(kind):
+    model = CARD_MODELS[kind]
+    saturation = _SATURATION.get(kind)
+    return (
+        literal(kind).label('kind'),
+        model.id.label('id'),
+        model.name.label('name'),
+        model.image_url.label('image_url'),
+        _HUNGER[kind].label('hunger'),
+        (saturation if saturation is not None else null()).label('saturation'),
+        model.summary.label('summary'),
+        model.likes_count.label('likes_count'),
+    )
+
+
+# 列表达式只构建一次，每次查询不再重复创建标签
+_CARD_COLUMNS = {kind: _build_columns(kind) for kind in CARD_MODELS}
+
+
+def card_columns(kind):
+    """生成 Card 所需的列（顺序与 Card 的字段一致）"""
+    return _CARD_COLUMNS[kind]
+
+
+def to_card(row):
+    """把以 card_columns 开头的结果行转换为 Card（忽略多出的列）"""
+    return Card._make(row[:len(Card._fields)])
+
+
+def to_cards(rows):
+    return [to_card(row) for row in rows]
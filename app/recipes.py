@@ -0,0 +1,149 @@
+"""
+菜谱索引："我能做什么菜"
+
+从 meal_ingredients 构建内存中的菜谱图：每个作物对应一个位，
+每个菜品的食材集合是一个整数位图。匹配库存时先用位运算
+（菜品位图 & ~库存位图）一次算出每个菜品缺少的食材，
+只对缺少数量在范围内的菜品再检查食材数量，不需要逐个菜品查询数据库。
+构建索引时同时算出作物×作物的共现矩阵（按食材数量加权），
+作物详情页的 "常搭配的作物" 直接读取，不需要每次自连接关联表。
+索引在首次使用时构建，后台修改作物或菜品后丢弃并在下次使用时重建。
+"""
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Crop, Meal, meal_ingredients
+from app.resync import ResyncingIndex
+from app.signals import catalog_changed
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+class Recipe:
+    """一个菜品的食材位图与数量"""
+    __slots__ = ('meal_id', 'name', 'mask', 'quantities')
+
+    def __init__(self, meal_id, name, mask, quantities):
+        self.meal_id = meal_id
+        self.name = name
+        self.mask = mask
+        self.quantities = quantities   # {作物 id: 数量}
+
+
+class RecipeIndex:
+    """菜谱图的内存索引"""
+
+    def __init__(self, crops, meals, edges):
+        """
+        :param crops: {作物 id: 名称}
+        :param meals: {菜品 id: 名称}
+        :param edges: [(菜品 id, 作物 id, 数量), ...]
+        """
+        self.crop_names = dict(crops)
+        self.bits = {crop_id: 1 << i for i, crop_id in enumerate(sorted(crops))}
+        quantities = {}
+        for meal_id, crop_id, quantity in edges:
+            if meal_id in meals and crop_id in self.bits:
+                quantities.setdefault(meal_id, {})[crop_id] = quantity or 1
+        # 没有食材的菜品不参与匹配
+        self.recipes = [
+            Recipe(meal_id, meals[meal_id],
+                   sum(self.bits[crop_id] for crop_id in needs), needs)
+            for meal_id, needs in sorted(quantities.items())
+        ]
+        self.pairings = self._pairings()
+
+    def _pairings(self):
+        """共现矩阵 C = AᵀA（A 为 菜品×作物 的数量矩阵），每行按权重排序
+
+        :return: {作物 id: [(作物 id, 权重), ...]}，权重高的在前
+        """
+        weights = {}
+        for recipe in self.recipes:
+            needs = recipe.quantities
+            for crop_id, quantity in needs.items():
+                row = weights.setdefault(crop_id, Counter())
+                row.update({other: quantity * other_quantity
+                            for other, other_quantity in needs.items()
+                            if other != crop_id})
+        return {
+            crop_id: sorted(row.items(), key=lambda pair: (
+                -pair[1], self.crop_names[pair[0]].lower()))
+            for crop_id, row in weights.items() if row
+        }
+
+    def pairs_with(self, crop_id, limit=6):
+        """与该作物最常一起使用的作物 [(作物 id, 名称, 权重), ...]"""
+        return [(other, self.crop_names[other], weight)
+                for other, weight in self.pairings.get(crop_id, ())[:limit]]
+
+    def inventory_mask(self, inventory):
+        """库存中持有的作物位图（数量为 0 的忽略）"""
+        mask = 0
+        for crop_id, quantity in inventory.items():
+            if crop_id in self.bits and (quantity is None or quantity > 0):
+                mask |= self.bits[crop_id]
+        return mask
+
+    def match(self, inventory, max_missing=2):
+        """按库存匹配菜品
+
+        :param inventory: {作物 id: 数量}，数量为 None 表示不限数量
+        :param max_missing: 最多缺少几种食材的菜品也一并返回
+        :return: (可以做的菜品, 差几种食材的菜品)，
+                 每项为 (Recipe, [(作物 id, 需要数量, 持有数量), ...])
+        """
+        have = self.inventory_mask(inventory)
+        cookable, almost = [], []
+        for recipe in self.recipes:
+            missing_mask = recipe.mask & ~have
+            # 位运算先筛掉缺少太多种食材的菜品
+            if _popcount(missing_mask) > max_missing:
+                continue
+            missing = []
+            for crop_id, need in recipe.quantities.items():
+                held = inventory.get(crop_id, 0) if \
+                    self.bits[crop_id] & have else 0
+                if held is not None and held < need:
+                    missing.append((crop_id, need, held))
+            if not missing:
+                cookable.append((recipe, missing))
+            elif len(missing) <= max_missing:
+                almost.append((recipe, missing))
+        cookable.sort(key=lambda pair: pair[0].name)
+        almost.sort(key=lambda pair: (len(pair[1]), pair[0].name))
+        return cookable, almost
+
+
+class RecipeBook(ResyncingIndex):
+    """每个应用一个菜谱索引，后台修改后在下次使用时重建，定期在后台重建"""
+
+    def _load(self):
+        """整张关联表只需三条查询"""
+        crops = dict(db.session.execute(select(Crop.id, Crop.name)).all())
+        meals = dict(db.session.execute(select(Meal.id, Meal.name)).all())
+        edges = db.session.execute(
+            select(meal_ingredients.c.meal_id, meal_ingredients.c.crop_id,
+                   meal_ingredients.c.quantity)
+        ).all()
+        return RecipeIndex(crops, meals, edges)
+
+
+def get_recipe_book():
+    """返回当前应用的菜谱索引"""
+    return current_app.extensions['recipes']
+
+
+def _on_catalog_changed(app, **extra):
+    app.extensions['recipes'].invalidate()
+
+
+def init_recipes(app):
+    """创建菜谱索引并订阅后台修改"""
+    app.extensions['recipes'] = RecipeBook(app)
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
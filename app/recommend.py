@@ -0,0 +1,187 @@
+"""
+协同过滤推荐
+
+离线任务（flask recommend build）从点赞关联表构建 用户×物品 的稀疏矩阵，
+按余弦相似度 co(i, j) / sqrt(n_i * n_j) 计算物品之间的相似度，
+每个物品只保存前 k 个相似物品到 item_neighbors 表。
+页面只做一次按主键前缀的查询：详情页的 "也喜欢"，个人页的 "为你推荐"。
+
+每次运行都重新计算全部物品：一个新点赞会改变该用户已点赞的每个物品的共现次数，
+以及被点赞物品的点赞人数（影响与它共现的所有物品的相似度），
+只重新计算有点赞事件的物品会留下过期的结果。
+"""
+import heapq
+import math
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, delete, exists, func, literal, or_, select, union_all
+
+from app import db
+from app.likes import LIKE_TARGETS
+from app.models import item_neighbors
+
+# 物品在内存中的编码：id * 类型数 + 类型序号，避免使用元组作为字典键
+KINDS = tuple(LIKE_TARGETS)
+
+
+def _encode(kind, item_id):
+    return item_id * len(KINDS) + KINDS.index(kind)
+
+
+def _decode(key):
+    return KINDS[key % len(KINDS)], key // len(KINDS)
+
+
+def load_like_matrix(max_user_likes=None):
+    """读取点赞矩阵
+
+    :param max_user_likes: 每个用户最多使用最近的多少个点赞（限制重度用户的影响）
+    :return: (用户 -> [物品], 物品 -> [用户])
+    """
+    parts = [
+        select(table.c.user_id.label('user_id'),
+               literal(kind).label('kind'),
+               item_col.label('item_id'),
+               table.c.liked_at.label('liked_at'))
+        for kind, (model, table, item_col) in LIKE_TARGETS.items()
+    ]
+    likes = union_all(*parts).subquery()
+    rows = db.session.execute(
+        select(likes.c.user_id, likes.c.kind, likes.c.item_id)
+        .order_by(likes.c.liked_at.desc())
+    )
+
+    user_items = {}
+    for user_id, kind, item_id in rows:
+        items = user_items.setdefault(user_id, [])
+        if max_user_likes is None or len(items) < max_user_likes:
+            items.append(_encode(kind, item_id))
+
+    item_users = {}
+    for user_id, items in user_items.items():
+        for key in items:
+            item_users.setdefault(key, []).append(user_id)
+    return user_items, item_users
+
+
+def item_neighbors_for(key, user_items, item_users, top_k=20, min_support=2):
+    """计算一个物品的前 k 个相似物品 [(相似度, 物品), ...]
+
+    共同点赞数用 Counter.update 批量累加（在 C 中完成），
+    只遍历点赞过该物品的用户所点赞的物品，与物品总数无关。
+    """
+    users = item_users.get(key)
+    if not users:
+        return []
+    counts = Counter()
+    for user_id in users:
+        counts.update(user_items[user_id])
+    del counts[key]
+
+    size = len(users)
+    scored = [
+        (common / math.sqrt(size * len(item_users[other])), other)
+        for other, common in counts.items() if common >= min_support
+    ]
+    return heapq.nlargest(top_k, scored)
+
+
+def build_neighbors(top_k=None, min_support=None, max_user_likes=None):
+    """离线计算全部物品的相似度并替换 item_neighbors（提交事务）
+
+    :return: 计算的物品数
+    """
+    config = current_app.config
+    top_k = top_k or config['RECOMMEND_TOP_K']
+    min_support = min_support or config['RECOMMEND_MIN_SUPPORT']
+    max_user_likes = max_user_likes or config['RECOMMEND_MAX_USER_LIKES']
+
+    computed_at = datetime.utcnow()
+    user_items, item_users = load_like_matrix(max_user_likes)
+    db.session.execute(delete(item_neighbors))
+
+    batch = []
+    for key in item_users:
+        kind, item_id = _decode(key)
+        for score, other in item_neighbors_for(key, user_items, item_users,
+                                               top_k, min_support):
+            neighbor_kind, neighbor_id = _decode(other)
+            batch.append({
+                'item_type': kind, 'item_id': item_id,
+                'neighbor_type': neighbor_kind, 'neighbor_id': neighbor_id,
+                'score': score, 'computed_at': computed_at,
+            })
+        if len(batch) >= 5000:
+            db.session.execute(item_neighbors.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(item_neighbors.insert(), batch)
+    db.session.commit()
+    return len(item_users)
+
+
+def _with_cards(ranked, limit):
+    """给 (kind, id, score) 子查询加上名称和图片列，跳过已删除的物品"""
+    stmt = select(ranked.c.kind, ranked.c.id, ranked.c.score)
+    names, images, found = [], [], []
+    for kind, (model, _, _) in LIKE_TARGETS.items():
+        stmt = stmt.outerjoin(model, and_(ranked.c.kind == kind,
+                                          model.id == ranked.c.id))
+        names.append(model.name)
+        images.append(model.image_url)
+        found.append(model.id.isnot(None))
+    return db.session.execute(
+        stmt.add_columns(func.coalesce(*names).label('name'),
+                         func.coalesce(*images).label('image_url'))
+        .where(or_(*found))
+        .order_by(ranked.c.score.desc(), ranked.c.kind, ranked.c.id)
+        .limit(limit)
+    ).all()
+
+
+def also_liked(kind, item_id, limit=None):
+    """点赞了该物品的玩家也点赞的物品（一次查询）
+
+    :return: [Row(kind, id, score, name, image_url), ...]
+    """
+    n = item_neighbors
+    ranked = (
+        select(n.c.neighbor_type.label('kind'), n.c.neighbor_id.label('id'),
+               n.c.score.label('score'))
+        .where(n.c.item_type == kind, n.c.item_id == item_id)
+        .subquery('ranked')
+    )
+    return _with_cards(
+        ranked, limit or current_app.config['RECOMMEND_PANEL_SIZE'])
+
+
+def for_user(user_id, limit=None):
+    """为用户推荐：累加其点赞物品的相似物品得分，排除已点赞的物品（一次查询）
+
+    :return: [Row(kind, id, score, name, image_url), ...]
+    """
+    n = item_neighbors
+    liked = union_all(*[
+        select(literal(kind).label('item_type'), item_col.label('item_id'))
+        .where(table.c.user_id == user_id)
+        for kind, (model, table, item_col) in LIKE_TARGETS.items()
+    ]).subquery('liked')
+    already_liked = or_(*[
+        and_(n.c.neighbor_type == kind,
+             exists().where(table.c.user_id == user_id,
+                            item_col == n.c.neighbor_id))
+        for kind, (model, table, item_col) in LIKE_TARGETS.items()
+    ])
+    ranked = (
+        select(n.c.neighbor_type.label('kind'), n.c.neighbor_id.label('id'),
+               func.sum(n.c.score).label('score'))
+        .join(liked, and_(liked.c.item_type == n.c.item_type,
+                          liked.c.item_id == n.c.item_id))
+        .where(~already_liked)
+        .group_by(n.c.neighbor_type, n.c.neighbor_id)
+        .subquery('ranked')
+    )
+    return _with_cards(
+        ranked, limit or current_app.config['RECOMMEND_FOR_YOU_SIZE'])
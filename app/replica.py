@@ -0,0 +1,178 @@
+"""
+只读副本路由（设置 REPLICA_DATABASE_URL 时启用）
+
+副本作为 SQLALCHEMY_BINDS 中的 'replica' 引擎。REPLICA_ENDPOINTS 中的
+GET/HEAD 请求把 SELECT 发往副本；flush 和 INSERT/UPDATE/DELETE 始终使用主库，
+所以这些请求中偶尔的写入（缓存预热等）仍然是安全的。
+
+读己之写：非 GET 请求（点赞、登录、后台修改等）成功后，在会话中记录一个截止时间，
+此后 REPLICA_STICKY_SECONDS 秒内该浏览器的所有请求都读主库。
+该时间应大于副本的最大延迟（复制任务的间隔）。
+
+故障回退：每隔 REPLICA_CHECK_SECONDS 秒用一条查询探测副本，副本上的查询出错时
+也会立即标记为不可用，并回滚后在主库上重新执行该请求的视图函数（只读请求，
+重新执行是安全的），请求不会因此失败；
+不可用期间所有请求读主库，直到下一次探测成功。
+
+本地测试可以使用两个 SQLite 文件，用 flask replica sync [--interval N]
+通过 SQLite 在线备份接口把主库复制到副本。
+注意：进程内缓存（排行榜、搜索结果等）可能由副本上的查询填充，
+其陈旧程度最多为副本延迟加上缓存的有效期。
+"""
+import sqlite3
+import threading
+import time
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import OperationalError
+
+REPLICA_BIND = 'replica'
+
+# 只读请求方法
+SAFE_METHODS = frozenset(('GET', 'HEAD'))
+
+# 会话中 "读主库截止时间" 的键
+_STICKY_KEY = '_primary_until'
+
+
+def replica_binds(config):
+    """把 REPLICA_DATABASE_URL 加入 SQLALCHEMY_BINDS"""
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    if config.get('REPLICA_DATABASE_URL'):
+        binds.setdefault(REPLICA_BIND, config['REPLICA_DATABASE_URL'])
+    return binds
+
+
+class RoutingSession(Session):
+    """请求被路由到副本时，把 SELECT 发往副本引擎"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(REPLICA_BIND) and not self._flushing \
+                and getattr(clause, 'is_select', False):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """记录副本是否可用，定期探测"""
+
+    def __init__(self, app):
+        self.check_seconds = app.config['REPLICA_CHECK_SECONDS']
+        self.endpoints = frozenset(app.config['REPLICA_ENDPOINTS'])
+        self._available = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def available(self, engine):
+        """副本是否可用，到期时重新探测（同一时间只有一个线程探测）"""
+        if self._checked_at is not None and \
+                time.monotonic() - self._checked_at < self.check_seconds:
+            return self._available
+        if not self._lock.acquire(blocking=False):
+            return self._available
+        try:
+            self._available = self._probe(engine)
+            self._checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+        return self._available
+
+    def mark_down(self):
+        """副本出错：在下一次探测之前不再使用"""
+        self._available = False
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _probe(engine):
+        try:
+            with engine.connect() as conn:
+                # 副本缺少表（尚未复制）时同样视为不可用
+                conn.execute(text('SELECT version FROM catalog_version LIMIT 1'))
+            return True
+        except Exception:
+            current_app.logger.warning('read replica unavailable, using primary')
+            return False
+
+
+def stick_to_primary():
+    """当前浏览器在 REPLICA_STICKY_SECONDS 秒内读主库"""
+    session[_STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def _use_replica():
+    router = current_app.extensions['replica']
+    if request.method not in SAFE_METHODS or request.endpoint not in router.endpoints:
+        return False
+    if session.get(_STICKY_KEY, 0) > time.time():
+        return False
+    db = current_app.extensions['sqlalchemy']
+    return router.available(db.engines[REPLICA_BIND])
+
+
+def _route_request():
+    db = current_app.extensions['sqlalchemy']
+    db.session.info[REPLICA_BIND] = _use_replica()
+
+
+def _after_request(response):
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        stick_to_primary()
+    return response
+
+
+def _retry_on_primary(error):
+    """路由到副本的请求出现数据库错误时，改读主库重新执行视图函数"""
+    db = current_app.extensions['sqlalchemy']
+    if not db.session.info.get(REPLICA_BIND):
+        raise error
+    current_app.logger.warning('read replica query failed, retrying on primary',
+                               exc_info=error)
+    current_app.extensions['replica'].mark_down()
+    db.session.rollback()
+    db.session.info[REPLICA_BIND] = False
+    view = current_app.view_functions[request.endpoint]
+    return current_app.ensure_sync(view)(**request.view_args)
+
+
+def _end_request(exc=None):
+    db = current_app.extensions['sqlalchemy']
+    db.session.info.pop(REPLICA_BIND, None)
+
+
+def sync_sqlite_replica(app):
+    """用 SQLite 在线备份把主库整体复制到副本文件（本地测试用）"""
+    primary = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    replica = make_url(app.config['REPLICA_DATABASE_URL'])
+    for url in (primary, replica):
+        if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+            raise ValueError('replica sync only supports SQLite database files')
+
+    source = sqlite3.connect(primary.database)
+    timeout = app.config['SQLITE_PRAGMAS'].get('busy_timeout', 5000) / 1000
+    target = sqlite3.connect(replica.database, timeout=timeout)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def init_replica(app):
+    """配置了副本时注册请求路由"""
+    if not app.config.get('REPLICA_DATABASE_URL'):
+        return
+    router = ReplicaRouter(app)
+    app.extensions['replica'] = router
+    with app.app_context():
+        engine = app.extensions['sqlalchemy'].engines[REPLICA_BIND]
+
+    @event.listens_for(engine, 'handle_error')
+    def on_replica_error(context):
+        router.mark_down()
+
+    app.before_request(_route_request)
+    app.after_request(_after_request)
+    app.register_error_handler(OperationalError, _retry_on_primary)
+    app.teardown_request(_end_request)
@@ -0,0 +1,133 @@
+"""
+进程内索引的构建与定期重建
+
+输入提示、模糊搜索、菜谱和趋势排行榜都在内存中保存一份由数据库构建的索引：
+首次使用时构建，之后由本进程的信号增量更新。其他进程的修改收不到信号，
+因此超过 INDEX_RESYNC_SECONDS 秒后在后台线程中同步：默认整体重建并原子替换
+引用（子类可以改写 _resync() 做增量同步），重建期间请求继续使用旧索引。
+构建期间收到的增量修改会记下来，替换前重放到新索引上；
+构建期间调用了 invalidate() 时丢弃构建结果。
+"""
+import abc
+import threading
+import time
+
+from app import db
+
+
+class ResyncingIndex(abc.ABC):
+    """首次使用时构建、过期后在后台重建的进程内索引
+
+    子类实现 _load()（在应用上下文中调用，返回新索引），
+    信号处理函数通过 update() 增量修改索引，不直接访问 self._index。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.resync_seconds = app.config['INDEX_RESYNC_SECONDS']
+        self._index = None
+        self._loaded_at = 0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        # 保护 _index 的替换、_generation 和 _journals
+        self._swap_lock = threading.Lock()
+        # 每次 invalidate() 加一，构建完成时不一致说明结果已经过时
+        self._generation = 0
+        # 进行中的每次构建各有一个列表，记录构建期间的增量修改
+        self._journals = []
+
+    @abc.abstractmethod
+    def _load(self):
+        """从数据库构建并返回新索引"""
+
+    def index(self):
+        """返回当前索引；过期时后台重建，期间继续使用旧索引"""
+        index = self._index
+        if index is None:
+            with self._lock:
+                index = self._index
+                if index is None:
+                    index = self._build()
+        elif time.time() - self._loaded_at > self.resync_seconds:
+            with self._lock:
+                if not self._rebuilding:
+                    self._rebuilding = True
+                    threading.Thread(target=self._rebuild, daemon=True).start()
+        return index
+
+    def update(self, change):
+        """对索引做一次增量修改：change(index)
+
+        尚未构建时忽略；构建进行中时同时记下，替换前重放到新索引上。
+        """
+        with self._swap_lock:
+            for journal in self._journals:
+                journal.append(change)
+            index = self._index
+        if index is not None:
+            change(index)
+
+    def _build(self):
+        """构建新索引并重放构建期间的修改后替换，返回新索引
+
+        构建期间调用了 invalidate() 时不替换（返回的索引只用于本次调用）。
+        """
+        journal = []
+        with self._swap_lock:
+            generation = self._generation
+            self._journals.append(journal)
+        try:
+            index = self._load()
+            with self._swap_lock:
+                for change in journal:
+                    change(index)
+                if self._generation == generation:
+                    self._index, self._loaded_at = index, time.time()
+            return index
+        finally:
+            with self._swap_lock:
+                self._journals.remove(journal)
+
+    def preload(self):
+        """尚未构建时在后台线程中构建，期间 index() 等待构建完成而不是重复构建"""
+        if self._index is None and not self._rebuilding:
+            with self._lock:
+                if self._index is None and not self._rebuilding:
+                    self._rebuilding = True
+                    threading.Thread(target=self._build_first, daemon=True).start()
+
+    def _build_first(self):
+        try:
+            with self._lock:
+                if self._index is None:
+                    with self.app.app_context():
+                        self._build()
+                        db.session.remove()
+        except Exception:
+            self.app.logger.exception(f'{type(self).__name__} preload failed')
+        finally:
+            self._rebuilding = False
+
+    def _resync(self):
+        """定期同步（在后台线程的应用上下文中调用），默认整体重建"""
+        self._build()
+
+    def _rebuild(self):
+        try:
+            with self.app.app_context():
+                self._resync()
+                db.session.remove()
+        except Exception:
+            self.app.logger.exception(f'{type(self).__name__} rebuild failed')
+        finally:
+            self._rebuilding = False
+
+    def expire(self):
+        """标记为过期，下次访问时在后台重建"""
+        self._loaded_at = 0
+
+    def invalidate(self):
+        """丢弃索引，下次访问时重新构建（进行中的构建结果也不再使用）"""
+        with self._swap_lock:
+            self._generation += 1
+            self._index = None
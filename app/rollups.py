@@ -0,0 +1,102 @@
+"""
+每日点赞汇总
+
+汇总任务只读取点赞事件日志（like_events），把尚未汇总的完整自然日
+（UTC）按 (物品, 日期) 聚合写入 crop_like_daily / meal_like_daily。
+分析查询只读取汇总表，成本与天数成正比，与点赞事件数量无关。
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, select
+
+from app import db
+from app.models import crop_like_daily, meal_like_daily, like_events
+
+# 类型 -> (汇总表, 汇总表中的物品列)
+ROLLUP_TABLES = {
+    'crop': (crop_like_daily, crop_like_daily.c.crop_id),
+    'meal': (meal_like_daily, meal_like_daily.c.meal_id),
+}
+
+
+def _as_date(value):
+    """SQLite 的 DATE() 返回字符串，其他数据库返回 date"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def rollup_likes(today=None):
+    """汇总上次汇总日之后、今天之前的点赞事件
+
+    :param today: 截止日期（不含），默认为当前 UTC 日期
+    :return: {类型: 写入的汇总行数}
+    """
+    today = today or datetime.utcnow().date()
+    end = datetime.combine(today, datetime.min.time())
+    written = {}
+
+    for kind, (table, item_col) in ROLLUP_TABLES.items():
+        last_day = db.session.execute(select(func.max(table.c.day))).scalar()
+        conditions = [
+            like_events.c.item_type == kind,
+            like_events.c.created_at < end,
+        ]
+        if last_day is not None:
+            start = datetime.combine(_as_date(last_day) + timedelta(days=1),
+                                     datetime.min.time())
+            conditions.append(like_events.c.created_at >= start)
+
+        day = func.date(like_events.c.created_at)
+        rows = db.session.execute(
+            select(
+                like_events.c.item_id,
+                day,
+                func.sum(case((like_events.c.delta > 0, 1), else_=0)),
+                func.sum(case((like_events.c.delta < 0, 1), else_=0)),
+            )
+            .where(*conditions)
+            .group_by(like_events.c.item_id, day)
+        ).all()
+
+        if rows:
+            db.session.execute(table.insert(), [
+                {item_col.name: item_id, 'day': _as_date(row_day),
+                 'likes_gained': gained, 'likes_lost': lost}
+                for item_id, row_day, gained, lost in rows
+            ])
+        written[kind] = len(rows)
+
+    retention = current_app.config.get('LIKE_EVENT_RETENTION_DAYS')
+    if retention:
+        # 只清理已经汇总过的旧事件
+        cutoff = min(end, datetime.utcnow() - timedelta(days=retention))
+        db.session.execute(
+            like_events.delete().where(like_events.c.created_at < cutoff)
+        )
+
+    db.session.commit()
+    return written
+
+
+def like_history(kind, item_id, days=365, today=None):
+    """读取物品最近若干天的每日点赞变化（只读汇总表）
+
+    :return: [{'day', 'gained', 'lost', 'net'}, ...]，按日期升序
+    """
+    table, item_col = ROLLUP_TABLES[kind]
+    today = today or datetime.utcnow().date()
+    rows = db.session.execute(
+        select(table.c.day, table.c.likes_gained, table.c.likes_lost)
+        .where(item_col == item_id,
+               table.c.day >= today - timedelta(days=days))
+        .order_by(table.c.day)
+    ).all()
+    return [
+        {'day': _as_date(day).isoformat(), 'gained': gained, 'lost': lost,
+         'net': gained - lost}
+        for day, gained, lost in rows
+    ]
@@ -0,0 +1,334 @@
+"""
+搜索后端
+
+SQLite 编译了 FTS5（3.34 及以上，支持 trigram 分词器）时，为作物和菜品各建一张
+外部内容（external content）全文索引表，由触发器与主表保持同步，支持子串匹配与
+BM25 相关度排序。trigram 按字符三元组索引，中文和词中间的片段（如「番茄」之于
+「樱桃番茄」、mato 之于 Tomato）都能命中；不足三个字符的词无法用三元组查询，
+这类关键词以及其他数据库或没有 FTS5 时退回 LIKE '%关键词%' 的方式。
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import (
+    DDL, Float, Integer, and_, case, event, false, func, inspect, literal, or_,
+    select, text, union_all
+)
+
+from app import db
+from app.cache import LRUCache
+from app.models import Crop, Meal
+from app.readmodels import card_columns, to_card, to_cards
+from app.signals import catalog_changed, like_counts_reset
+from app.snapshot import get_snapshot
+
+# 类型 -> (模型, 全文索引表名)
+SEARCH_TARGETS = {
+    'crop': (Crop, 'crop_fts'),
+    'meal': (Meal, 'meal_fts'),
+}
+
+# 搜索类型参数 -> 参与搜索的类型
+SEARCH_TYPES = {
+    'all': ('crop', 'meal'),
+    'crops': ('crop',),
+    'meals': ('meal',),
+}
+
+# BM25 列权重：名称命中比描述命中更相关
+BM25_WEIGHTS = (10.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# trigram 分词器需要的 SQLite 版本，以及可以用全文索引查询的最短词长
+TRIGRAM_MIN_SQLITE = (3, 34)
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _fts_statements(table):
+    """创建全文索引表及同步触发器的语句"""
+    fts = f'{table}_fts'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"name, description, content='{table}', content_rowid='id', "
+        f"tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, name, description) "
+        f"VALUES (new.id, new.name, new.description); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name, description) "
+        f"VALUES ('delete', old.id, old.name, old.description); END",
+        # 只在名称或描述变化时更新索引，点赞计数的更新不会触发
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name, description "
+        f"ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name, description) "
+        f"VALUES ('delete', old.id, old.name, old.description); "
+        f"INSERT INTO {fts}(rowid, name, description) "
+        f"VALUES (new.id, new.name, new.description); END",
+    ]
+
+
+def sqlite_has_fts5(connection):
+    """判断当前 SQLite 是否编译了 FTS5 并支持 trigram 分词器"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    if (connection.dialect.server_version_info or ()) < TRIGRAM_MIN_SQLITE:
+        return False
+    options = connection.exec_driver_sql('PRAGMA compile_options').scalars()
+    return 'ENABLE_FTS5' in set(options)
+
+
+def _create_fts(target, connection, **kw):
+    if sqlite_has_fts5(connection):
+        for statement in _fts_statements(target.name):
+            connection.execute(DDL(statement))
+
+
+def _drop_fts(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(DDL(f'DROP TABLE IF EXISTS {target.name}_fts'))
+
+
+# db.create_all() / drop_all() 时同步创建或删除全文索引
+for _model, _ in SEARCH_TARGETS.values():
+    event.listen(_model.__table__, 'after_create', _create_fts)
+    event.listen(_model.__table__, 'before_drop', _drop_fts)
+
+
+def fts_enabled():
+    """当前数据库是否可以使用全文索引（结果按应用缓存）"""
+    enabled = current_app.extensions.get('search_fts')
+    if enabled is None:
+        if current_app.config.get('SEARCH_BACKEND') == 'like':
+            enabled = False
+        else:
+            engine = db.engine
+            with engine.connect() as connection:
+                enabled = sqlite_has_fts5(connection) and all(
+                    inspect(connection).has_table(fts)
+                    for _, fts in SEARCH_TARGETS.values()
+                )
+        current_app.extensions['search_fts'] = enabled
+    return enabled
+
+
+def match_expression(keyword):
+    """把用户输入转为 FTS5 MATCH 表达式：每个词加引号做子串匹配
+
+    有词短于三个字符时 trigram 无法查询，返回空串，由调用方退回 LIKE。
+    """
+    terms = _TOKEN_RE.findall(keyword or '')
+    if any(len(term) < TRIGRAM_MIN_LENGTH for term in terms):
+        return ''
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _fuzzy_matching(kind, keyword):
+    """模糊匹配：候选来自内存中的三元组索引，rank 为负的相似度"""
+    from app.fuzzy import get_fuzzy
+
+    model, _ = SEARCH_TARGETS[kind]
+    scores = {item_id: -similarity for _, item_id, _, similarity
+              in get_fuzzy().search(keyword, kind)}
+    if not scores:
+        return (
+            select(model.id.label('id'), literal(0.0, Float).label('rank'))
+            .where(false())
+            .subquery(f'{kind}_match')
+        )
+    return (
+        select(model.id.label('id'),
+               case(scores, value=model.id, else_=0.0).label('rank'))
+        .where(model.id.in_(list(scores)))
+        .subquery(f'{kind}_match')
+    )
+
+
+def matching(kind, keyword, fuzzy=False):
+    """返回匹配关键词的子查询，列为 (id, rank)
+
+    rank 越小越相关；LIKE 方式没有相关度，rank 恒为 0。
+    fuzzy 为真时按名称的三元组相似度匹配，可以容忍拼写错误。
+    """
+    if fuzzy:
+        return _fuzzy_matching(kind, keyword)
+
+    model, fts = SEARCH_TARGETS[kind]
+    expression = match_expression(keyword)
+    if fts_enabled() and expression:
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        return (
+            text(f'SELECT rowid AS id, bm25({fts}, {weights}) AS rank '
+                 f'FROM {fts} WHERE {fts} MATCH :expression')
+            .bindparams(expression=expression)
+            .columns(id=Integer, rank=Float)
+            .subquery(f'{kind}_match')
+        )
+
+    # 与全文索引一致：每个词都要出现在名称或描述中
+    terms = _TOKEN_RE.findall(keyword or '')
+    if not terms:
+        condition = false()
+    else:
+        condition = and_(*(
+            or_(model.name.contains(term, autoescape=True),
+                model.description.contains(term, autoescape=True))
+            for term in terms
+        ))
+    return (
+        select(model.id.label('id'), literal(0.0, Float).label('rank'))
+        .where(condition)
+        .subquery(f'{kind}_match')
+    )
+
+
+# 排序方式 -> 结果子查询上的排序列（最后按类型和 id 保证分页稳定）
+_PAGE_ORDERINGS = {
+    'name': lambda c: (c.name.asc(),),
+    'hunger': lambda c: (c.hunger.desc(), c.name.asc()),
+    'likes': lambda c: (c.likes_count.desc(), c.name.asc()),
+    'relevance': lambda c: (c.rank.asc(), c.name.asc()),
+}
+
+
+class SearchPage:
+    """一页搜索结果，属性与 Flask-SQLAlchemy 的分页对象一致"""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+
+def _result_columns(kind, match):
+    model, _ = SEARCH_TARGETS[kind]
+    return (
+        select(*card_columns(kind), match.c.rank.label('rank'))
+        .join(match, match.c.id == model.id)
+    )
+
+
+def search_page(kinds, keyword, sort_by='name', page=1, per_page=12,
+                fuzzy=False):
+    """搜索一种或多种类型，在数据库中合并、排序和分页
+
+    多种类型用一条 UNION ALL 查询完成，总数由 COUNT(*) OVER() 一并返回。
+    结果为 Card 列表（kind, id, name, image_url, hunger, saturation, summary, likes_count）。
+    """
+    parts = [_result_columns(kind, matching(kind, keyword, fuzzy))
+             for kind in kinds]
+    results = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery('results')
+    ordering = _PAGE_ORDERINGS.get(sort_by, _PAGE_ORDERINGS['name'])
+    rows = db.session.execute(
+        select(results, func.count().over().label('total'))
+        .order_by(*ordering(results.c), results.c.kind, results.c.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+
+    if rows:
+        total = rows[0].total
+    elif page > 1:
+        # 页码超出范围时窗口函数没有返回行，单独计数
+        total = db.session.execute(
+            select(func.count()).select_from(results)
+        ).scalar()
+    else:
+        total = 0
+    return SearchPage(to_cards(rows), page, per_page, total)
+
+
+def normalize_keyword(keyword):
+    """合并多余空白（用于规范 URL 和缓存键）"""
+    return ' '.join((keyword or '').split())
+
+
+def _load_rows(refs):
+    """按 [(类型, id), ...] 的顺序读取结果行，已删除的物品会被跳过
+
+    开启目录快照时直接从快照读取，不查询数据库。
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.cards(refs)
+    rows = {}
+    for kind in {kind for kind, _ in refs}:
+        model, _ = SEARCH_TARGETS[kind]
+        ids = [item_id for ref_kind, item_id in refs if ref_kind == kind]
+        for row in db.session.execute(
+                select(*card_columns(kind)).where(model.id.in_(ids))):
+            rows[(kind, row.id)] = to_card(row)
+    return [rows[ref] for ref in refs if ref in rows]
+
+
+def cached_search_page(search_type, keyword, sort_by='name', page=1,
+                       per_page=12, fuzzy=False):
+    """带结果缓存的 search_page
+
+    缓存只保存每页的 (类型, id) 列表和总数，键为规范化的查询参数；
+    展示用的行每次按 id 读取，因此点赞数等字段总是最新的。
+    """
+    cache = get_search_cache()
+    key = (normalize_keyword(keyword).lower(), search_type, sort_by, page,
+           per_page, bool(fuzzy))
+    entry = cache.get(key)
+    if entry is None:
+        result = search_page(SEARCH_TYPES[search_type], keyword, sort_by,
+                             page, per_page, fuzzy)
+        refs = [(row.kind, row.id) for row in result.items]
+        cache.put(key, (refs, result.total), weight=len(refs) + 1)
+        return result
+
+    refs, total = entry
+    return SearchPage(_load_rows(refs), page, per_page, total)
+
+
+def get_search_cache():
+    """返回当前应用的搜索结果缓存"""
+    return current_app.extensions['search_cache']
+
+
+def _clear_search_cache(app, **extra):
+    app.extensions['search_cache'].clear()
+
+
+def init_search(app):
+    """创建搜索结果缓存，后台修改目录或重算点赞数时清空"""
+    app.extensions['search_cache'] = LRUCache(
+        max_entries=app.config['SEARCH_CACHE_MAX_ENTRIES'],
+        max_weight=app.config['SEARCH_CACHE_MAX_IDS'],
+        ttl=app.config['SEARCH_CACHE_TTL'],
+    )
+    catalog_changed.connect(_clear_search_cache, sender=app, weak=False)
+    like_counts_reset.connect(_clear_search_cache, sender=app, weak=False)
+
+
+def rebuild_index():
+    """按主表重建全文索引（用于首次启用或修复）"""
+    if not fts_enabled():
+        return False
+    for _, fts in SEARCH_TARGETS.values():
+        db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
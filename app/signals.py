@@ -0,0 +1,18 @@
+"""
+应用内信号
+
+like_changed: 点赞状态发生变化（kind, item_id, liked, liked_at）
+like_counts_reset: 点赞计数被批量修改（删除用户、修复计数）
+likes_flushed: 写后缓冲把一批点赞写入了数据库（kinds: 涉及的物品类型）
+catalog_changed: 后台新增/修改/删除了作物或菜品（kind, item_id）
+queries_recorded: 一个请求的 SQL 统计已汇总（stats, endpoint）
+"""
+from blinker import Namespace
+
+_signals = Namespace()
+
+like_changed = _signals.signal('like-changed')
+like_counts_reset = _signals.signal('like-counts-reset')
+likes_flushed = _signals.signal('likes-flushed')
+catalog_changed = _signals.signal('catalog-changed')
+queries_recorded = _signals.signal('queries-recorded')
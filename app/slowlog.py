@@ -0,0 +1,265 @@
+"""
+采样慢查询日志与热点查询统计（后台 "慢查询" 页面）
+
+按 SLOW_QUERY_SAMPLE_RATE 的概率对所有引擎上执行的语句计时（未被抽中的语句
+只多一次随机数比较），把 SQL 归一化为指纹（字面量、参数和 IN 列表替换为 ?），
+按指纹汇总次数、总耗时、最大耗时，以及最近 SLOW_QUERY_SAMPLES 次耗时的 p50/p95。
+耗时超过 SLOW_QUERY_THRESHOLD_MS 的 SELECT 记为慢查询，保留最后一次的语句和参数，
+在查看后台页面或持久化时用新连接执行 EXPLAIN，得到最近一次的执行计划。
+
+指纹数量不超过 SLOW_QUERY_MAX_FINGERPRINTS，超过时淘汰总耗时最少的指纹。
+统计每 SLOW_QUERY_PERSIST_SECONDS 秒（有新语句时）在后台线程中写入
+SLOW_QUERY_FILE 指定的 JSON 文件，进程退出时再写一次，启动时读回。
+参数只用于 EXPLAIN，不写入文件也不在页面上显示。
+多进程部署时每个进程各自统计，最后写入文件的进程覆盖之前的内容。
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+from app.instrumentation import statement_shape
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+# 各数据库查看执行计划的前缀
+_EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN ', 'mysql': 'EXPLAIN ',
+            'mariadb': 'EXPLAIN ', 'postgresql': 'EXPLAIN '}
+
+
+def fingerprint(statement):
+    """SQL 指纹：字符串和数字字面量替换为 ?，合并空白和 IN 列表"""
+    return statement_shape(_NUMBER.sub('?', _STRING.sub('?', statement)))
+
+
+def _is_select(statement):
+    return statement.lstrip()[:6].upper() in ('SELECT', 'WITH')
+
+
+class QueryStat:
+    """一个指纹的统计"""
+
+    def __init__(self, fingerprint, samples):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.durations = deque(maxlen=samples)
+        self.last_seen = None
+        self.plan = None
+        self.explain_args = None    # (引擎, 语句, 参数)，等待执行 EXPLAIN
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.durations.append(duration)
+        self.last_seen = time.time()
+
+    def percentile(self, fraction):
+        """最近若干次耗时的百分位数（秒）"""
+        if not self.durations:
+            return 0.0
+        values = sorted(self.durations)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {'fingerprint': self.fingerprint, 'count': self.count,
+                'total': self.total, 'max': self.max, 'slow': self.slow,
+                'durations': list(self.durations), 'last_seen': self.last_seen,
+                'plan': self.plan}
+
+    @classmethod
+    def from_dict(cls, data, samples):
+        stat = cls(data['fingerprint'], samples)
+        stat.count, stat.total, stat.max = data['count'], data['total'], data['max']
+        stat.slow, stat.last_seen, stat.plan = \
+            data['slow'], data['last_seen'], data['plan']
+        stat.durations.extend(data['durations'])
+        return stat
+
+
+class SlowQueryLog:
+    """按指纹汇总的有界查询统计"""
+
+    def __init__(self, sample_rate=0.05, threshold=0.1, max_entries=500,
+                 samples=200, path=None, persist_seconds=300, logger=None):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.samples = samples
+        self.path = path
+        self.persist_seconds = persist_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+        self._persisting = False
+
+    def set_sample_rate(self, rate):
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError('sample rate must be between 0 and 1')
+        self.sample_rate = rate
+
+    def record(self, engine, statement, parameters, duration):
+        """记录一次抽样到的语句"""
+        key = fingerprint(statement)
+        with self._lock:
+            stat = self._entries.get(key)
+            if stat is None:
+                if len(self._entries) >= self.max_entries:
+                    coldest = min(self._entries.values(), key=lambda s: s.total)
+                    del self._entries[coldest.fingerprint]
+                stat = self._entries[key] = QueryStat(key, self.samples)
+            stat.add(duration)
+            if duration >= self.threshold:
+                stat.slow += 1
+                if _is_select(statement):
+                    stat.explain_args = (engine, statement, parameters)
+            self._dirty = True
+        self._maybe_persist()
+
+    def entries(self, order_by='total', limit=None):
+        """按总耗时（或其他 QueryStat 属性）倒序返回统计"""
+        with self._lock:
+            stats = list(self._entries.values())
+        stats.sort(key=lambda stat: getattr(stat, order_by), reverse=True)
+        return stats[:limit] if limit else stats
+
+    def explain_pending(self):
+        """为最近出现慢查询的指纹执行 EXPLAIN"""
+        with self._lock:
+            pending = [(stat, stat.explain_args) for stat in self._entries.values()
+                       if stat.explain_args is not None]
+            for stat, _ in pending:
+                stat.explain_args = None
+        for stat, (engine, statement, parameters) in pending:
+            stat.plan = _explain(engine, statement, parameters)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def load(self):
+        """从文件读回统计（文件不存在或格式错误时忽略）"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            entries = {item['fingerprint']: QueryStat.from_dict(item, self.samples)
+                       for item in data['entries']}
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        with self._lock:
+            self.sample_rate = data.get('sample_rate', self.sample_rate)
+            self._entries = entries
+
+    def persist(self):
+        """写入文件（先写临时文件再替换，避免读到一半的内容）"""
+        if not self.path:
+            return
+        self.explain_pending()
+        with self._lock:
+            data = {'sample_rate': self.sample_rate, 'saved_at': time.time(),
+                    'entries': [stat.to_dict() for stat in self._entries.values()]}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _maybe_persist(self):
+        if not self.path or not self._dirty or self._persisting or \
+                time.monotonic() - self._persisted_at < self.persist_seconds:
+            return
+        with self._lock:
+            if self._persisting:
+                return
+            self._persisting = True
+        threading.Thread(target=self._persist_safely, daemon=True).start()
+
+    def _persist_safely(self):
+        try:
+            self.persist()
+        except Exception:
+            self.logger.exception('Slow query log persist failed')
+        finally:
+            self._persisted_at = time.monotonic()
+            self._persisting = False
+
+
+def _explain(engine, statement, parameters):
+    prefix = _EXPLAIN.get(engine.dialect.name)
+    if prefix is None:
+        return None
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    try:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as error:
+        return f'EXPLAIN failed: {error}'
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def _listen(engine, log):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and random.random() < log.sample_rate:
+            context._slowlog_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_slowlog_start', None)
+        if start is None or statement.startswith('EXPLAIN'):
+            return
+        log.record(engine, statement, parameters, time.perf_counter() - start)
+
+
+def get_slow_query_log():
+    """返回当前应用的慢查询日志，未启用时返回 None"""
+    return current_app.extensions.get('slow_queries')
+
+
+def init_slowlog(app):
+    """按配置启用采样慢查询日志，监听应用的所有引擎"""
+    if not app.config['SLOW_QUERY_LOG']:
+        return None
+    log = SlowQueryLog(
+        sample_rate=app.config['SLOW_QUERY_SAMPLE_RATE'],
+        threshold=app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000,
+        max_entries=app.config['SLOW_QUERY_MAX_FINGERPRINTS'],
+        samples=app.config['SLOW_QUERY_SAMPLES'],
+        path=app.config['SLOW_QUERY_FILE'],
+        persist_seconds=app.config['SLOW_QUERY_PERSIST_SECONDS'],
+        logger=app.logger,
+    )
+    log.load()
+    app.extensions['slow_queries'] = log
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen(engine, log)
+    if log.path:
+        # 进程退出前写入最新的统计
+        atexit.register(log._persist_safely)
+    return log
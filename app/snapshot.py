@@ -0,0 +1,215 @@
+"""
+进程内只读目录快照（CATALOG_SNAPSHOT=1 开启）
+
+作物/菜品目录相对访问量很小，而且只通过后台修改。开启后每个进程在内存中
+保存一份不可变的快照：作物、菜品、食材关系图以及预先按 (name, id) 排好序的
+列表顺序。列表页、详情页和搜索结果的目录数据直接从快照读取，不查询数据库；
+点赞数和点赞状态等动态数据仍然查询数据库。
+
+后台每次修改作物/菜品时，在同一事务中把 catalog_version 表中的版本号加一。
+请求开始时检查版本号（每个进程每 CATALOG_VERSION_CHECK_SECONDS 秒最多查询一次），
+版本变化时构建新快照并整体替换引用，正在处理的请求继续使用旧快照。
+后台以外的批量写入（数据导入脚本等）需要调用 bump_catalog_version()。
+"""
+import bisect
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, request
+from sqlalchemy import select, update
+
+from app import db
+from app.models import Crop, Meal, catalog_version, meal_ingredients
+from app.readmodels import Card
+from app.signals import catalog_changed
+
+# 快照中的物品，字段名与模型一致，详情页模板可以直接使用
+CatalogCrop = namedtuple('CatalogCrop', [
+    'id', 'name', 'description', 'summary', 'image_url', 'hunger_points'])
+CatalogMeal = namedtuple('CatalogMeal', [
+    'id', 'name', 'description', 'summary', 'image_url', 'hunger_restored',
+    'saturation'])
+Ingredient = namedtuple('Ingredient', ['id', 'name', 'quantity'])
+RelatedMeal = namedtuple('RelatedMeal', ['id', 'name', 'image_url'])
+
+
+def read_catalog_version():
+    """读取当前目录版本号"""
+    return db.session.execute(
+        select(catalog_version.c.version).where(catalog_version.c.id == 1)
+    ).scalar() or 0
+
+
+def bump_catalog_version():
+    """目录版本号加一（不提交事务，与目录修改一起提交）"""
+    result = db.session.execute(
+        update(catalog_version)
+        .where(catalog_version.c.id == 1)
+        .values(version=catalog_version.c.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.execute(catalog_version.insert().values(id=1, version=1))
+
+
+def _name_order(items):
+    return tuple(sorted(items, key=lambda item: (item.name, item.id)))
+
+
+class CatalogSnapshot:
+    """某一版本的目录，构建后不再修改"""
+
+    def __init__(self, version, crops, meals, edges):
+        """
+        :param crops: [CatalogCrop, ...]
+        :param meals: [CatalogMeal, ...]
+        :param edges: [(菜品 id, 作物 id, 数量), ...]
+        """
+        self.version = version
+        self._items = {
+            'crop': MappingProxyType({crop.id: crop for crop in crops}),
+            'meal': MappingProxyType({meal.id: meal for meal in meals}),
+        }
+        cards = {
+            'crop': [Card('crop', c.id, c.name, c.image_url, c.hunger_points,
+                          None, c.summary, None) for c in crops],
+            'meal': [Card('meal', m.id, m.name, m.image_url, m.hunger_restored,
+                          m.saturation, m.summary, None) for m in meals],
+        }
+        self._cards = {kind: MappingProxyType({card.id: card for card in rows})
+                       for kind, rows in cards.items()}
+        self._order = {kind: _name_order(rows) for kind, rows in cards.items()}
+        self._keys = {kind: tuple((card.name, card.id) for card in order)
+                      for kind, order in self._order.items()}
+
+        crop_map, meal_map = self._items['crop'], self._items['meal']
+        ingredients, related = {}, {}
+        for meal_id, crop_id, quantity in edges:
+            crop, meal = crop_map.get(crop_id), meal_map.get(meal_id)
+            if crop is None or meal is None:
+                continue
+            ingredients.setdefault(meal_id, []).append(
+                Ingredient(crop.id, crop.name, quantity))
+            related.setdefault(crop_id, []).append(
+                RelatedMeal(meal.id, meal.name, meal.image_url))
+        self._ingredients = MappingProxyType(
+            {key: _name_order(rows) for key, rows in ingredients.items()})
+        self._related = MappingProxyType(
+            {key: _name_order(rows) for key, rows in related.items()})
+
+    def get(self, kind, item_id):
+        """读取一个物品，不存在时返回 None"""
+        return self._items[kind].get(item_id)
+
+    def count(self, kind):
+        return len(self._order[kind])
+
+    def cards(self, refs):
+        """按 [(类型, id), ...] 的顺序返回 Card，已删除的物品会被跳过"""
+        return [self._cards[kind][item_id] for kind, item_id in refs
+                if item_id in self._cards[kind]]
+
+    def ingredients(self, meal_id):
+        """菜品的食材 (id, name, quantity)，按名称排序"""
+        return self._ingredients.get(meal_id, ())
+
+    def related_meals(self, crop_id):
+        """使用该作物的菜品 (id, name, image_url)，按名称排序"""
+        return self._related.get(crop_id, ())
+
+    def slice(self, kind, after=None, before=None, offset=0, limit=None):
+        """按 (name, id) 顺序取一段 Card，顺序与 listing 中的数据库查询一致
+
+        :param after: (name, id)，取其后的行
+        :param before: (name, id)，取其前的行（按倒序返回）
+        """
+        keys, order = self._keys[kind], self._order[kind]
+        if before is not None:
+            end = bisect.bisect_left(keys, tuple(before))
+            return list(reversed(order[max(0, end - limit):end]))
+        if after is not None:
+            start = bisect.bisect_right(keys, tuple(after))
+        else:
+            start = offset or 0
+        return list(order[start:start + limit])
+
+
+def load_snapshot():
+    """从数据库构建快照（三条查询）"""
+    version = read_catalog_version()
+    crops = [CatalogCrop(*row) for row in db.session.execute(
+        select(Crop.id, Crop.name, Crop.description, Crop.summary,
+               Crop.image_url, Crop.hunger_points))]
+    meals = [CatalogMeal(*row) for row in db.session.execute(
+        select(Meal.id, Meal.name, Meal.description, Meal.summary,
+               Meal.image_url, Meal.hunger_restored, Meal.saturation))]
+    edges = db.session.execute(
+        select(meal_ingredients.c.meal_id, meal_ingredients.c.crop_id,
+               meal_ingredients.c.quantity)
+    ).all()
+    return CatalogSnapshot(version, crops, meals, edges)
+
+
+class CatalogStore:
+    """每个应用（进程）一份当前快照"""
+
+    def __init__(self, app):
+        self.check_seconds = app.config['CATALOG_VERSION_CHECK_SECONDS']
+        self._snapshot = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """返回当前快照，首次使用时构建"""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = load_snapshot()
+                    self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def check(self):
+        """到期时读取版本号，变化则重新加载
+
+        同一时间只有一个线程检查和加载，其他线程不等待，继续使用当前快照。
+        """
+        if self._snapshot is None or \
+                time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            if read_catalog_version() != self._snapshot.version:
+                # 先读版本号再读数据：期间的修改最多导致下次检查时多加载一次
+                self._snapshot = load_snapshot()
+        finally:
+            self._lock.release()
+
+    def expire(self):
+        """下一个请求立即检查版本号"""
+        self._checked_at = 0
+
+
+def get_snapshot():
+    """开启目录快照时返回当前快照，否则返回 None"""
+    if not current_app.config['CATALOG_SNAPSHOT']:
+        return None
+    return current_app.extensions['catalog_snapshot'].current()
+
+
+def _check_version():
+    if current_app.config['CATALOG_SNAPSHOT'] and request.endpoint != 'static':
+        current_app.extensions['catalog_snapshot'].check()
+
+
+def _on_catalog_changed(app, **extra):
+    app.extensions['catalog_snapshot'].expire()
+
+
+def init_snapshot(app):
+    """创建目录快照并在每个请求开始时检查版本号"""
+    app.extensions['catalog_snapshot'] = CatalogStore(app)
+    app.before_request(_check_version)
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
@@ -2,8 +2,8 @@
  * AJAX Like Functionality
  */
 
-function initLikeButtons() {
-    const likeButtons = document.querySelectorAll('.like-btn');
+function initLikeButtons(root = document) {
+    const likeButtons = root.querySelectorAll('.like-btn');
     
     likeButtons.forEach(button => {
         button.addEventListener('click', function() {
@@ -28,6 +28,8 @@ function likeItem(type, id, buttonElement) {
     buttonElement.setAttribute('data-processing', 'true');
     
     const url = `/api/like/${type}/${id}`;
+    // Idempotent request: PUT to like, DELETE to unlike
+    const method = buttonElement.getAttribute('data-liked') === 'true' ? 'DELETE' : 'PUT';
     
     // Get CSRF token (from global variable or form)
     let token = window.csrfToken || '';
@@ -40,7 +42,7 @@ function likeItem(type, id, buttonElement) {
     
     // Send AJAX request
     fetch(url, {
-        method: 'POST',
+        method: method,
         headers: {
             'Content-Type': 'application/json',
             'X-CSRFToken': token
@@ -56,6 +58,7 @@ function likeItem(type, id, buttonElement) {
     .then(data => {
         if (data.success) {
             // Update like count and icon
+            buttonElement.setAttribute('data-liked', data.is_liked ? 'true' : 'false');
             const likeIcon = buttonElement.querySelector('.like-icon');
             const likeCount = buttonElement.querySelector('.like-count');
             
@@ -80,10 +83,182 @@ function likeItem(type, id, buttonElement) {
     });
 }
 
+/**
+ * Fill in like state for list cards with a single batch request
+ */
+function loadLikeStates(root = document) {
+    const buttons = root.querySelectorAll('.like-btn[data-lazy-state="true"]');
+    if (buttons.length === 0) {
+        return;
+    }
+
+    const ids = { crop: new Set(), meal: new Set() };
+    buttons.forEach(button => {
+        const type = button.getAttribute('data-type');
+        if (ids[type]) {
+            ids[type].add(button.getAttribute('data-id'));
+        }
+    });
+
+    const params = new URLSearchParams();
+    if (ids.crop.size) {
+        params.set('crops', Array.from(ids.crop).join(','));
+    }
+    if (ids.meal.size) {
+        params.set('meals', Array.from(ids.meal).join(','));
+    }
+
+    fetch(`/api/likes/state?${params.toString()}`, { credentials: 'same-origin' })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Network response error');
+        }
+        return response.json();
+    })
+    .then(data => {
+        const states = { crop: data.crops || {}, meal: data.meals || {} };
+        buttons.forEach(button => {
+            const type = button.getAttribute('data-type');
+            const state = (states[type] || {})[button.getAttribute('data-id')];
+            if (!state) {
+                return;
+            }
+            button.setAttribute('data-liked', state.is_liked ? 'true' : 'false');
+            button.querySelector('.like-icon').textContent = state.is_liked ? '❤️' : '🤍';
+            button.querySelector('.like-count').textContent = state.likes_count;
+            button.removeAttribute('data-lazy-state');
+        });
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+/**
+ * Typeahead suggestions for the search keyword field
+ */
+function initSuggest() {
+    const input = document.querySelector('input[data-suggest-url]');
+    const list = document.getElementById('keyword-suggestions');
+    if (!input || !list) {
+        return;
+    }
+
+    let timer = null;
+    let lastQuery = '';
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (query === lastQuery) {
+                return;
+            }
+            lastQuery = query;
+            if (!query) {
+                list.innerHTML = '';
+                return;
+            }
+
+            const params = new URLSearchParams({ q: query });
+            fetch(`${input.getAttribute('data-suggest-url')}?${params.toString()}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Network response error');
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (query !== lastQuery) {
+                    return;
+                }
+                list.innerHTML = '';
+                data.suggestions.forEach(item => {
+                    const option = document.createElement('option');
+                    option.value = item.name;
+                    option.label = item.type === 'crop' ? 'Crop' : 'Meal';
+                    list.appendChild(option);
+                });
+            })
+            .catch(error => {
+                console.error('Error:', error);
+            });
+        }, 120);
+    });
+}
+
+/**
+ * Infinite scrolling for list pages: append the next page of cards
+ * when the pagination bar comes into view
+ */
+function initInfiniteScroll() {
+    const nav = document.querySelector('.pagination[data-more-url]');
+    if (!nav || !('IntersectionObserver' in window)) {
+        return;
+    }
+    const grid = document.querySelector(nav.getAttribute('data-grid'));
+    let next = nav.querySelector('a[rel="next"]');
+    if (!grid || !next) {
+        return;
+    }
+
+    let loading = false;
+    const observer = new IntersectionObserver(entries => {
+        if (loading || !entries.some(entry => entry.isIntersecting)) {
+            return;
+        }
+        loading = true;
+        const params = new URLSearchParams({ after: next.getAttribute('data-cursor') });
+        fetch(`${nav.getAttribute('data-more-url')}?${params.toString()}`,
+              { credentials: 'same-origin' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response error');
+            }
+            const cursor = response.headers.get('X-Next-Cursor');
+            return response.text().then(html => ({ html, cursor }));
+        })
+        .then(({ html, cursor }) => {
+            const template = document.createElement('template');
+            template.innerHTML = html;
+            initLikeButtons(template.content);
+            loadLikeStates(template.content);
+            grid.appendChild(template.content);
+
+            if (cursor) {
+                const url = new URL(next.href);
+                url.searchParams.set('after', cursor);
+                next.href = url.toString();
+                next.setAttribute('data-cursor', cursor);
+                // Re-observe so a bar that is still in view loads the next page too
+                observer.unobserve(nav);
+                observer.observe(nav);
+            } else {
+                observer.disconnect();
+                next.remove();
+                next = null;
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            observer.disconnect();
+        })
+        .finally(() => {
+            loading = false;
+        });
+    }, { rootMargin: '400px' });
+    observer.observe(nav);
+}
+
 // Initialize after page load
 if (document.readyState === 'loading') {
-    document.addEventListener('DOMContentLoaded', initLikeButtons);
+    document.addEventListener('DOMContentLoaded', () => initLikeButtons());
+    document.addEventListener('DOMContentLoaded', () => loadLikeStates());
+    document.addEventListener('DOMContentLoaded', initSuggest);
+    document.addEventListener('DOMContentLoaded', initInfiniteScroll);
 } else {
     initLikeButtons();
+    loadLikeStates();
+    initSuggest();
+    initInfiniteScroll();
 }
 
@@ -0,0 +1,209 @@
+"""
+搜索框输入提示（typeahead）
+
+作物和菜品名称中每个单词开头的后缀（"tomato sauce" 与 "sauce"）
+按小写排序存放在数组中，前缀查询用二分查找定位，再按点赞数取前 N 个。
+索引在收到第一个请求时于后台线程中构建（SUGGEST_PRELOAD），
+之后由点赞和后台修改的信号增量更新，点赞只丢弃能匹配到该物品的前缀的缓存结果；
+超过同步周期后在后台线程中重建，查询本身从不访问数据库。
+"""
+import bisect
+import heapq
+import threading
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Crop, Meal
+from app.resync import ResyncingIndex
+from app.signals import catalog_changed, like_changed, like_counts_reset
+
+SUGGEST_MODELS = {'crop': Crop, 'meal': Meal}
+
+# 同一前缀的查询结果缓存条数上限（物品变化时只丢弃能匹配到它的前缀）
+_MEMO_SIZE = 1024
+
+
+def _keys(name):
+    """名称中每个单词开头的小写后缀"""
+    lowered = ' '.join(name.lower().split())
+    keys = [lowered]
+    for i in range(1, len(lowered)):
+        if lowered[i - 1] == ' ':
+            keys.append(lowered[i:])
+    return keys
+
+
+class SuggestIndex:
+    """名称前缀索引"""
+
+    def __init__(self):
+        self._keys = []       # 已排序的后缀
+        self._refs = []       # 与 _keys 对齐的 (类型, id)
+        self._names = {}      # (类型, id) -> 名称
+        self._weights = {}    # (类型, id) -> 点赞数
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @classmethod
+    def build(cls, items):
+        """由 [(类型, id, 名称, 点赞数), ...] 构建索引"""
+        index = cls()
+        pairs = []
+        for kind, item_id, name, weight in items:
+            ref = (kind, item_id)
+            index._names[ref] = name
+            index._weights[ref] = weight or 0
+            pairs.extend((key, ref) for key in _keys(name))
+        pairs.sort()
+        index._keys = [key for key, _ in pairs]
+        index._refs = [ref for _, ref in pairs]
+        return index
+
+    def suggest(self, prefix, limit=8):
+        """返回前缀匹配的 [(类型, id, 名称, 点赞数), ...]，点赞多的在前"""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix or limit <= 0:
+            return []
+        memo_key = (prefix, limit)
+        # 修改索引时会替换 _memo，因此计算期间过期的结果只会写入旧的字典
+        memo = self._memo
+        result = memo.get(memo_key)
+        if result is not None:
+            return result
+
+        # 读取一致的快照：写入方总是整体替换这两个列表
+        keys, refs = self._keys, self._refs
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff', start)
+        weights, names = self._weights, self._names
+        matched = {refs[i] for i in range(start, end)}
+        top = heapq.nsmallest(
+            limit, matched,
+            key=lambda ref: (-weights.get(ref, 0), names[ref].lower(), ref)
+        )
+        result = [(kind, item_id, names[(kind, item_id)],
+                   weights.get((kind, item_id), 0)) for kind, item_id in top]
+
+        if len(memo) >= _MEMO_SIZE:
+            memo.clear()
+        memo[memo_key] = result
+        return result
+
+    def upsert(self, kind, item_id, name, weight):
+        """新增或修改一个物品（写时复制，读取方不加锁）"""
+        ref = (kind, item_id)
+        with self._lock:
+            keys, refs = self._without(ref)
+            for key in _keys(name):
+                position = bisect.bisect_left(keys, key)
+                keys.insert(position, key)
+                refs.insert(position, ref)
+            old_name = self._names.get(ref)
+            self._names[ref] = name
+            self._weights[ref] = weight or 0
+            self._keys, self._refs = keys, refs
+            self._forget(name, old_name)
+
+    def remove(self, kind, item_id):
+        """删除一个物品"""
+        ref = (kind, item_id)
+        with self._lock:
+            if ref not in self._names:
+                return
+            self._keys, self._refs = self._without(ref)
+            name = self._names.pop(ref)
+            self._weights.pop(ref, None)
+            self._forget(name)
+
+    def adjust_weight(self, kind, item_id, delta):
+        """点赞数变化"""
+        ref = (kind, item_id)
+        with self._lock:
+            if ref in self._names:
+                self._weights[ref] = max(self._weights.get(ref, 0) + delta, 0)
+                self._forget(self._names[ref])
+
+    def _forget(self, *names):
+        """丢弃能匹配到这些名称的前缀的缓存结果（替换 _memo，需持有 self._lock）"""
+        keys = [key for name in names if name is not None for key in _keys(name)]
+        self._memo = {
+            memo_key: result for memo_key, result in self._memo.items()
+            if not any(key.startswith(memo_key[0]) for key in keys)
+        }
+
+    def _without(self, ref):
+        """返回去掉某个物品后的键列表副本"""
+        name = self._names.get(ref)
+        keys, refs = list(self._keys), list(self._refs)
+        if name is not None:
+            for key in _keys(name):
+                position = bisect.bisect_left(keys, key)
+                while keys[position] == key and refs[position] != ref:
+                    position += 1
+                del keys[position]
+                del refs[position]
+        return keys, refs
+
+
+class Suggester(ResyncingIndex):
+    """每个应用一个前缀索引，首次使用时构建，定期在后台重建"""
+
+    def _load(self):
+        items = []
+        for kind, model in SUGGEST_MODELS.items():
+            rows = db.session.execute(
+                select(model.id, model.name, model.likes_count)
+            )
+            items.extend((kind, item_id, name, likes_count)
+                         for item_id, name, likes_count in rows)
+        return SuggestIndex.build(items)
+
+    def suggest(self, prefix, limit=8):
+        return self.index().suggest(prefix, limit)
+
+
+def get_suggester():
+    """返回当前应用的输入提示索引"""
+    return current_app.extensions['suggest']
+
+
+def _on_like_changed(app, kind, item_id, liked, **extra):
+    delta = 1 if liked else -1
+    app.extensions['suggest'].update(
+        lambda index: index.adjust_weight(kind, item_id, delta)
+    )
+
+
+def _on_catalog_changed(app, kind, item_id, **extra):
+    model = SUGGEST_MODELS[kind]
+    row = db.session.execute(
+        select(model.name, model.likes_count).where(model.id == item_id)
+    ).first()
+    if row is None:
+        app.extensions['suggest'].update(
+            lambda index: index.remove(kind, item_id)
+        )
+    else:
+        app.extensions['suggest'].update(
+            lambda index: index.upsert(kind, item_id, row.name, row.likes_count)
+        )
+
+
+def _on_like_counts_reset(app, **extra):
+    app.extensions['suggest'].expire()
+
+
+def init_suggest(app):
+    """创建输入提示索引并订阅会影响它的事件"""
+    app.extensions['suggest'] = Suggester(app)
+    like_changed.connect(_on_like_changed, sender=app, weak=False)
+    catalog_changed.connect(_on_catalog_changed, sender=app, weak=False)
+    like_counts_reset.connect(_on_like_counts_reset, sender=app, weak=False)
+    if app.config['SUGGEST_PRELOAD']:
+        # 不在创建应用时构建：flask db upgrade 等命令运行时表可能还不存在
+        app.before_request(app.extensions['suggest'].preload)
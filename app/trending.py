@@ -0,0 +1,264 @@
+"""
+趋势排行榜
+
+按时间桶（默认 1 小时）在内存中维护 24h / 7d / 30d 的滑动窗口点赞数，
+以及按半衰期指数衰减的 "hot" 热度分。点赞变化通过 like_changed 信号
+增量写入；时间推移时只需减去滑出窗口的整桶计数，无需扫描点赞表。
+只有首次使用时从点赞表加载一次，之后定期从点赞事件日志中合并
+上次位置之后的新事件（其他进程写入的点赞）。
+"""
+import heapq
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import like_events
+from app.resync import ResyncingIndex
+from app.signals import like_changed
+
+# 窗口名称 -> 时长
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+HOT = 'hot'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _timestamp(value):
+    """把数据库中的 UTC naive datetime 转为时间戳"""
+    if isinstance(value, datetime):
+        return (value - _EPOCH).total_seconds()
+    return value
+
+
+class TrendingBoard:
+    """单一物品类型的滑动窗口计数与热度分"""
+
+    def __init__(self, bucket_seconds=3600, half_life=12 * 3600, now=None):
+        self.bucket_seconds = bucket_seconds
+        self.half_life = half_life
+        self._window_buckets = {
+            name: max(1, math.ceil(span.total_seconds() / bucket_seconds))
+            for name, span in WINDOWS.items()
+        }
+        self._retain = max(self._window_buckets.values())
+
+        now = time.time() if now is None else now
+        self._head = self._bucket(now)
+        self._buckets = {}  # 桶序号 -> Counter(item_id -> 净点赞数)
+        self._totals = {name: Counter() for name in WINDOWS}
+
+        # 热度分以 _hot_epoch 为基准，乘以 2^((t - epoch) / half_life)
+        self._hot = Counter()
+        self._hot_epoch = now
+
+        self._top_cache = {}
+        self._lock = threading.RLock()
+
+    def _bucket(self, ts):
+        return int(ts // self.bucket_seconds)
+
+    def record(self, item_id, ts, delta, now=None):
+        """记录一次点赞（delta=1）或取消点赞（delta=-1）
+
+        :param ts: 该点赞的时间（取消点赞时为原点赞时间）
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            bucket = min(self._bucket(ts), self._head)
+            age = self._head - bucket
+            if age < self._retain:
+                counts = self._buckets.setdefault(bucket, Counter())
+                counts[item_id] += delta
+                for name, size in self._window_buckets.items():
+                    if age < size:
+                        self._add(self._totals[name], item_id, delta)
+
+            self._hot[item_id] += delta * 2 ** ((ts - self._hot_epoch)
+                                                / self.half_life)
+            self._top_cache.clear()
+
+    @staticmethod
+    def _add(counter, item_id, delta):
+        counter[item_id] += delta
+        if not counter[item_id]:
+            del counter[item_id]
+
+    def _advance(self, now):
+        """时间推进：减去滑出各窗口的整桶计数，丢弃过期的桶"""
+        head = self._bucket(now)
+        if head <= self._head:
+            return
+        for name, size in self._window_buckets.items():
+            old_start = self._head - size + 1
+            new_start = head - size + 1
+            totals = self._totals[name]
+            for bucket in [b for b in self._buckets
+                           if old_start <= b < new_start]:
+                for item_id, count in self._buckets[bucket].items():
+                    self._add(totals, item_id, -count)
+        for bucket in [b for b in self._buckets if b <= head - self._retain]:
+            del self._buckets[bucket]
+        self._head = head
+        self._renormalize(now)
+        self._top_cache.clear()
+
+    def _renormalize(self, now):
+        """基准时间过旧时整体缩放热度分，避免指数溢出"""
+        elapsed = now - self._hot_epoch
+        if elapsed < 32 * self.half_life:
+            return
+        factor = 2 ** (-elapsed / self.half_life)
+        self._hot = Counter({
+            item_id: score * factor
+            for item_id, score in self._hot.items()
+            if score * factor > 1e-9
+        })
+        self._hot_epoch = now
+
+    def top(self, window, limit=10, now=None):
+        """返回 [(item_id, 分数), ...]，窗口内为点赞数，hot 为当前热度分"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            key = (window, limit)
+            if key not in self._top_cache:
+                if window == HOT:
+                    scale = 2 ** (-(now - self._hot_epoch) / self.half_life)
+                    ranked = [
+                        (item_id, score * scale) for item_id, score in
+                        heapq.nlargest(limit, self._hot.items(),
+                                       key=lambda entry: entry[1])
+                        if score > 0
+                    ]
+                else:
+                    ranked = [
+                        entry for entry in
+                        heapq.nlargest(limit, self._totals[window].items(),
+                                       key=lambda entry: entry[1])
+                        if entry[1] > 0
+                    ]
+                self._top_cache[key] = ranked
+            return self._top_cache[key]
+
+
+class TrendingIndex:
+    """各类型的排行榜，以及已经合并到的点赞事件位置"""
+
+    def __init__(self, boards, last_event_id):
+        self.boards = boards
+        self.last_event_id = last_event_id
+        # (类型, id) -> 本进程已通过信号记录、尚未在事件日志中见到的净点赞变化
+        self._unmerged = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, kind, item_id, ts, delta):
+        """记录本进程的一次点赞变化（来自信号）"""
+        with self._lock:
+            TrendingBoard._add(self._unmerged, (kind, item_id), delta)
+        self.boards[kind].record(item_id, ts, delta)
+
+    def merge(self, events):
+        """按 id 顺序合并事件日志中的新事件 [(id, 类型, 物品 id, delta, 时间), ...]
+
+        与本进程已记录的变化方向相同的事件视为同一变化，不重复计数。
+        事件日志没有保存原点赞时间，取消点赞按事件时间扣减。
+        """
+        for event_id, kind, item_id, delta, created_at in events:
+            key = (kind, item_id)
+            with self._lock:
+                self.last_event_id = event_id
+                own = self._unmerged.get(key, 0) * delta > 0
+                if own:
+                    TrendingBoard._add(self._unmerged, key, -delta)
+            if not own and kind in self.boards:
+                self.boards[kind].record(item_id, _timestamp(created_at), delta)
+
+
+class Trending(ResyncingIndex):
+    """各物品类型的趋势排行榜，首次使用时从数据库加载最近的点赞
+
+    超过 INDEX_RESYNC_SECONDS 后在后台从点赞事件日志增量合并其他进程写入的点赞，
+    请求不会同步等待查询数据库；滑出窗口的桶在内存中随时间丢弃。
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.bucket_seconds = app.config['TRENDING_BUCKET_SECONDS']
+        self.half_life = app.config['TRENDING_HOT_HALF_LIFE']
+
+    def _load(self):
+        """从点赞表加载最长窗口内的点赞（仅扫描 liked_at 范围内的行）
+
+        在同一事务中先读取事件日志的当前位置，之后的事件由 _resync() 合并。
+        """
+        from app.likes import LIKE_TARGETS
+
+        now = time.time()
+        cutoff = datetime.utcnow() - max(WINDOWS.values())
+        last_event_id = db.session.execute(
+            select(func.max(like_events.c.id))
+        ).scalar() or 0
+        boards = {}
+        for kind, (model, table, item_col) in LIKE_TARGETS.items():
+            board = TrendingBoard(self.bucket_seconds, self.half_life, now)
+            rows = db.session.execute(
+                select(item_col, table.c.liked_at)
+                .where(table.c.liked_at >= cutoff)
+            )
+            for item_id, liked_at in rows:
+                board.record(item_id, _timestamp(liked_at), 1, now)
+            boards[kind] = board
+        return TrendingIndex(boards, last_event_id)
+
+    def _resync(self):
+        """合并上次位置之后的点赞事件（走主键范围查询，不再扫描点赞表）"""
+        index = self._index
+        if index is None:
+            return
+        index.merge(db.session.execute(
+            select(like_events.c.id, like_events.c.item_type,
+                   like_events.c.item_id, like_events.c.delta,
+                   like_events.c.created_at)
+            .where(like_events.c.id > index.last_event_id)
+            .order_by(like_events.c.id)
+        ))
+        self._loaded_at = time.time()
+
+    def boards(self):
+        """返回各类型的排行榜"""
+        return self.index().boards
+
+    def top(self, kind, window, limit=10):
+        return self.boards()[kind].top(window, limit)
+
+    def record(self, kind, item_id, liked_at, liked):
+        ts, delta = _timestamp(liked_at), 1 if liked else -1
+        self.update(lambda index: index.record(kind, item_id, ts, delta))
+
+
+def get_trending():
+    """返回当前应用的趋势排行榜"""
+    return current_app.extensions['trending']
+
+
+def _on_like_changed(app, kind, item_id, liked, liked_at, **extra):
+    trending = app.extensions.get('trending')
+    if trending is not None:
+        trending.record(kind, item_id, liked_at, liked)
+
+
+def init_trending(app):
+    """创建趋势排行榜并订阅点赞变化"""
+    app.extensions['trending'] = Trending(app)
+    like_changed.connect(_on_like_changed, sender=app, weak=False)
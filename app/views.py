@@ -1,12 +1,28 @@
 """
 主视图路由
 """
-from flask import Blueprint, render_template, request, jsonify
-from app import db
-from app.models import Crop, Meal, User
+from flask import (
+    Blueprint, render_template, request, jsonify, abort, current_app, url_for,
+    redirect, make_response
+)
+from app import db, likes, rankings as rankings_data
+from app.models import Crop, Meal, meal_ingredients
 from app.forms import SearchForm
+from app.fuzzy import get_fuzzy
+from app.engine import is_retryable, run_with_retries
+from app.like_buffer import LikeBufferFull
+from app.listing import keyset_page
+from app.recipes import get_recipe_book
+from app.recommend import also_liked
+from app.rollups import like_history
+from app.search import cached_search_page, normalize_keyword
+from app.snapshot import get_snapshot
+from app.suggest import get_suggester
+from app.trending import HOT, WINDOWS as TRENDING_WINDOWS
+from app.utils import log_action
 from flask_login import login_required, current_user
-from sqlalchemy import func, or_
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,299 +30,415 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route('/')
 def index():
     """首页：展示模组简介和最受欢迎的3个菜品"""
-    # 使用聚合查询获取最受欢迎的3个菜品（按点赞数）
-    top_meals = (
-        db.session.query(
-            Meal,
-            func.count(User.id).label('likes_count')
+    return render_template('index.html', top_meals=rankings_data.top_meals())
+
+
+def _list_page(kind):
+    """按请求参数读取一页列表（after/before 为游标，page 兼容旧链接）"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    try:
+        return keyset_page(
+            kind,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            offset=(page - 1) * current_app.config['ITEMS_PER_PAGE']
         )
-        .join(Meal.liked_by_users)
-        .group_by(Meal.id)
-        .order_by(func.count(User.id).desc())
-        .limit(3)
-        .all()
-    )
+    except ValueError:
+        abort(400)
 
-    # 如果没有点赞数据，则按创建时间降序获取3个菜品
-    if not top_meals:
-        top_meals = [
-            (meal, 0) for meal in
-            Meal.query.order_by(Meal.created_at.desc()).limit(3).all()
-        ]
 
-    return render_template('index.html', top_meals=top_meals)
+def _cards_fragment(template, pagination, **context):
+    """下一页卡片的 HTML 片段，下一页游标放在响应头中"""
+    response = make_response(render_template(template, **context))
+    if pagination.next_cursor:
+        response.headers['X-Next-Cursor'] = pagination.next_cursor
+    return response
 
 
 @main_bp.route('/crops')
 def crops():
-    """作物列表页面（分页）"""
-    page = request.args.get('page', 1, type=int)
-    pagination = Crop.query.order_by(Crop.name.asc()).paginate(
-        page=page, per_page=12, error_out=False
-    )
-    crops = pagination.items
-    return render_template('crops.html', crops=crops, pagination=pagination)
+    """作物列表页面（游标分页）"""
+    pagination = _list_page('crop')
+    return render_template('crops.html', crops=pagination.items,
+                           pagination=pagination)
+
+
+@main_bp.route('/crops/more')
+def crops_more():
+    """下一页作物卡片（无限滚动）"""
+    pagination = _list_page('crop')
+    return _cards_fragment('_crop_cards.html', pagination,
+                           crops=pagination.items)
 
 
 @main_bp.route('/meals')
 def meals():
-    """菜品列表页面（分页）"""
-    page = request.args.get('page', 1, type=int)
-    pagination = Meal.query.order_by(Meal.name.asc()).paginate(
-        page=page, per_page=12, error_out=False
-    )
-    meals = pagination.items
-    return render_template('meals.html', meals=meals, pagination=pagination)
+    """菜品列表页面（游标分页）"""
+    pagination = _list_page('meal')
+    return render_template('meals.html', meals=pagination.items,
+                           pagination=pagination)
+
+
+@main_bp.route('/meals/more')
+def meals_more():
+    """下一页菜品卡片（无限滚动）"""
+    pagination = _list_page('meal')
+    return _cards_fragment('_meal_cards.html', pagination,
+                           meals=pagination.items)
+
+
+def _load_detail(kind, model, id, snapshot=None):
+    """读取物品、当前用户的点赞状态与点赞数（一条查询），不存在时返回 404
+
+    开启目录快照时物品从快照读取，只查询点赞状态与点赞数。
+    """
+    user_id = current_user.id if current_user.is_authenticated else None
+    if snapshot is not None:
+        item = snapshot.get(kind, id)
+        state = likes.get_like_states(user_id, kind, [id]).get(id) \
+            if item is not None else None
+        if state is None:
+            abort(404)
+        return item, state['is_liked'], state['likes_count']
+
+    row = db.session.execute(
+        select(model, likes.liked_column(user_id, kind)).where(model.id == id)
+    ).first()
+    if row is None:
+        abort(404)
+    item, is_liked = row
+    is_liked, likes_count = likes.apply_pending(
+        user_id, kind, item.id, bool(is_liked), item.likes_count)
+    return item, is_liked, likes_count
 
 
 @main_bp.route('/crop/<int:id>')
 def crop_detail(id):
-    """作物详情页面"""
-    crop = Crop.query.get_or_404(id)
+    """作物详情页面（查询数量固定，与相关菜品和点赞数量无关）"""
+    snapshot = get_snapshot()
+    crop, is_liked, likes_count = _load_detail('crop', Crop, id, snapshot)
     # 获取使用此作物的菜品
-    related_meals = crop.meals.all()
-    is_liked = False
-    if current_user.is_authenticated:
-        is_liked = crop in current_user.liked_crops.all()
+    if snapshot is not None:
+        related_meals = snapshot.related_meals(crop.id)
+    else:
+        related_meals = db.session.execute(
+            select(Meal.id, Meal.name, Meal.image_url)
+            .join(meal_ingredients, meal_ingredients.c.meal_id == Meal.id)
+            .where(meal_ingredients.c.crop_id == crop.id)
+            .order_by(Meal.name)
+        ).all()
     return render_template(
         'detail_crop.html',
         crop=crop,
         related_meals=related_meals,
-        is_liked=is_liked
+        is_liked=is_liked,
+        likes_count=likes_count,
+        pairs_with=get_recipe_book().index().pairs_with(
+            crop.id, current_app.config['PAIRINGS_SIZE']),
+        also_liked=also_liked('crop', crop.id)
     )
 
 
 @main_bp.route('/meal/<int:id>')
 def meal_detail(id):
-    """菜品详情页面"""
-    meal = Meal.query.get_or_404(id)
-    # 获取菜品所需的食材
-    ingredients = meal.ingredients.all()
-    is_liked = False
-    if current_user.is_authenticated:
-        is_liked = meal in current_user.liked_meals.all()
+    """菜品详情页面（查询数量固定，与食材和点赞数量无关）"""
+    snapshot = get_snapshot()
+    meal, is_liked, likes_count = _load_detail('meal', Meal, id, snapshot)
+    # 获取菜品所需的食材及数量
+    if snapshot is not None:
+        ingredients = snapshot.ingredients(meal.id)
+    else:
+        ingredients = db.session.execute(
+            select(Crop.id, Crop.name, meal_ingredients.c.quantity)
+            .join(meal_ingredients, meal_ingredients.c.crop_id == Crop.id)
+            .where(meal_ingredients.c.meal_id == meal.id)
+            .order_by(Crop.name)
+        ).all()
     return render_template(
         'detail_meal.html',
         meal=meal,
         ingredients=ingredients,
-        is_liked=is_liked
+        is_liked=is_liked,
+        likes_count=likes_count,
+        also_liked=also_liked('meal', meal.id)
     )
 
 
+def _search_args(keyword, search_type='all', sort_by='name', page=1,
+                 fuzzy=False):
+    """规范的搜索参数：顺序固定，省略默认的页码与模糊开关"""
+    args = {
+        'keyword': normalize_keyword(keyword),
+        'search_type': search_type,
+        'sort_by': sort_by,
+    }
+    if page > 1:
+        args['page'] = str(page)
+    if fuzzy:
+        args['fuzzy'] = 'y'
+    return args
+
+
+def search_url(*args, **kwargs):
+    """搜索结果的规范 URL"""
+    return url_for('main.search', **_search_args(*args, **kwargs))
+
+
 @main_bp.route('/search', methods=['GET', 'POST'])
 def search():
-    """搜索功能"""
-    form = SearchForm()
-    results = []
-
-    if form.validate_on_submit():
-        keyword = form.keyword.data
-        search_type = form.search_type.data
-        sort_by = form.sort_by.data
-
-        # 构建查询
-        if search_type == 'crops':
-            query = Crop.query.filter(
-                or_(
-                    Crop.name.contains(keyword),
-                    Crop.description.contains(keyword)
-                )
-            )
-        elif search_type == 'meals':
-            query = Meal.query.filter(
-                or_(
-                    Meal.name.contains(keyword),
-                    Meal.description.contains(keyword)
-                )
-            )
-        else:  # all
-            # 搜索作物和菜品
-            crops = Crop.query.filter(
-                or_(
-                    Crop.name.contains(keyword),
-                    Crop.description.contains(keyword)
-                )
-            ).all()
-            meals = Meal.query.filter(
-                or_(
-                    Meal.name.contains(keyword),
-                    Meal.description.contains(keyword)
-                )
-            ).all()
-            results = list(crops) + list(meals)
-
-            # 排序
-            if sort_by == 'name':
-                results.sort(key=lambda x: x.name)
-            elif sort_by == 'hunger':
-                def get_hunger(item):
-                    return getattr(
-                        item, 'hunger_points',
-                        getattr(item, 'hunger_restored', 0)
-                    )
-                results.sort(key=get_hunger, reverse=True)
-            elif sort_by == 'likes':
-                results.sort(
-                    key=lambda x: x.get_likes_count(),
-                    reverse=True
-                )
-
-            return render_template(
-                'search.html',
-                form=form,
-                results=results,
-                keyword=keyword
-            )
-
-        # 对单一类型进行排序
-        if sort_by == 'name':
-            query = query.order_by(
-                Crop.name.asc() if search_type == 'crops' else Meal.name.asc()
-            )
-        elif sort_by == 'hunger':
-            if search_type == 'crops':
-                query = query.order_by(Crop.hunger_points.desc())
-            else:
-                query = query.order_by(Meal.hunger_restored.desc())
-        elif sort_by == 'likes':
-            # 需要聚合查询
-            if search_type == 'crops':
-                query = (
-                    db.session.query(
-                        Crop,
-                        func.count(User.id).label('likes_count')
-                    )
-                    .join(Crop.liked_by_users, isouter=True)
-                    .filter(
-                        or_(
-                            Crop.name.contains(keyword),
-                            Crop.description.contains(keyword)
-                        )
-                    )
-                    .group_by(Crop.id)
-                    .order_by(func.count(User.id).desc())
-                )
-                results = [row[0] for row in query.all()]
-            else:
-                query = (
-                    db.session.query(
-                        Meal,
-                        func.count(User.id).label('likes_count')
-                    )
-                    .join(Meal.liked_by_users, isouter=True)
-                    .filter(
-                        or_(
-                            Meal.name.contains(keyword),
-                            Meal.description.contains(keyword)
-                        )
-                    )
-                    .group_by(Meal.id)
-                    .order_by(func.count(User.id).desc())
-                )
-                results = [row[0] for row in query.all()]
-            return render_template(
-                'search.html',
-                form=form,
-                results=results,
-                keyword=keyword
-            )
-
-        results = query.all()
-
-    return render_template('search.html', form=form, results=results)
+    """搜索功能（GET 参数可被浏览器缓存和收藏，POST 表单重定向到 GET）"""
+    if request.method == 'POST':
+        form = SearchForm()
+        if form.validate_on_submit():
+            return redirect(search_url(
+                form.keyword.data, form.search_type.data, form.sort_by.data,
+                fuzzy=form.fuzzy.data
+            ), code=303)
+        return render_template('search.html', form=form, results=[],
+                               pagination=None, search_url=search_url)
+
+    form = SearchForm(request.args, meta={'csrf': False})
+    if 'keyword' not in request.args or not form.validate():
+        return render_template('search.html', form=form, results=[],
+                               pagination=None, search_url=search_url)
+
+    page = form.page.data or 1
+    canonical = _search_args(form.keyword.data, form.search_type.data,
+                             form.sort_by.data, page, form.fuzzy.data)
+    if list(request.args.items(multi=True)) != list(canonical.items()):
+        return redirect(url_for('main.search', **canonical), code=301)
+
+    pagination = cached_search_page(
+        form.search_type.data, form.keyword.data, form.sort_by.data,
+        page=page, per_page=current_app.config['SEARCH_PER_PAGE'],
+        fuzzy=form.fuzzy.data
+    )
+    did_you_mean = None
+    if not pagination.total:
+        did_you_mean = get_fuzzy().did_you_mean(form.keyword.data)
+
+    response = make_response(render_template(
+        'search.html', form=form, results=pagination.items,
+        pagination=pagination, did_you_mean=did_you_mean,
+        search_url=search_url
+    ))
+    # 页面包含登录状态和 CSRF 令牌，只允许浏览器私有缓存
+    response.headers['Cache-Control'] = \
+        f"private, max-age={current_app.config['SEARCH_CACHE_MAX_AGE']}"
+    response.vary.add('Cookie')
+    return response
 
 
 @main_bp.route('/rankings')
 def rankings():
-    """排行榜页面"""
-    # 作物排行榜（按点赞数降序）
-    crop_rankings = (
-        db.session.query(
-            Crop,
-            func.count(User.id).label('likes_count')
-        )
-        .join(Crop.liked_by_users, isouter=True)
-        .group_by(Crop.id)
-        .order_by(func.count(User.id).desc())
-        .limit(10)
-        .all()
-    )
-
-    # 菜品排行榜（按点赞数降序）
-    meal_rankings = (
-        db.session.query(
-            Meal,
-            func.count(User.id).label('likes_count')
-        )
-        .join(Meal.liked_by_users, isouter=True)
-        .group_by(Meal.id)
-        .order_by(func.count(User.id).desc())
-        .limit(10)
-        .all()
-    )
+    """排行榜页面（总榜 / 24h / 7d / 30d / 热度）"""
+    window = request.args.get('window', 'all')
+    if window not in TRENDING_WINDOWS and window != HOT:
+        window = 'all'
+
+    if window == 'all':
+        crop_rankings = rankings_data.all_time_rankings('crop')
+        meal_rankings = rankings_data.all_time_rankings('meal')
+    else:
+        crop_rankings = rankings_data.trending_rankings('crop', window)
+        meal_rankings = rankings_data.trending_rankings('meal', window)
 
     return render_template(
         'rankings.html',
         crop_rankings=crop_rankings,
-        meal_rankings=meal_rankings
+        meal_rankings=meal_rankings,
+        window=window,
+        windows=['all'] + list(TRENDING_WINDOWS) + [HOT]
     )
 
 
-@main_bp.route('/api/like/crop/<int:id>', methods=['POST'])
-@login_required
-def like_crop(id):
-    """AJAX 点赞作物"""
-    crop = Crop.query.get_or_404(id)
-
-    if crop in current_user.liked_crops.all():
-        # 取消点赞
-        current_user.liked_crops.remove(crop)
-        is_liked = False
-    else:
-        # 添加点赞
-        current_user.liked_crops.append(crop)
-        is_liked = True
+@main_bp.route('/api/analytics/<any(crop, meal):kind>/<int:id>/likes')
+def like_analytics(kind, id):
+    """物品每日点赞变化时间序列（读取每日汇总表）"""
+    model = likes.LIKE_TARGETS[kind][0]
+    name = db.session.execute(
+        select(model.name).where(model.id == id)
+    ).scalar()
+    if name is None:
+        abort(404)
+    days = min(max(request.args.get('days', 365, type=int), 1), 3650)
+    return jsonify({
+        'success': True,
+        'item': {'type': kind, 'id': id, 'name': name},
+        'series': like_history(kind, id, days)
+    })
 
-    db.session.commit()
 
-    # 记录日志
-    from app.utils import log_action
-    action = "liked" if is_liked else "unliked"
-    message = f"User {current_user.username} {action} crop {crop.name}"
-    log_action(message)
+def _parse_ids(value):
+    """解析逗号分隔的 ID 列表，格式错误时返回 None"""
+    if not value:
+        return []
+    try:
+        return sorted({int(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        return None
+
+
+def _parse_inventory(value):
+    """解析库存参数 "1:2,5:1,7"，格式错误时返回 None
+
+    每项为 作物 id[:数量]，省略数量表示不限数量。
+    """
+    inventory = {}
+    if not value:
+        return inventory
+    try:
+        for part in value.split(','):
+            if not part.strip():
+                continue
+            crop_id, _, quantity = part.partition(':')
+            quantity = int(quantity) if quantity.strip() else None
+            if quantity is not None and quantity < 0:
+                return None
+            inventory[int(crop_id)] = quantity
+    except ValueError:
+        return None
+    return inventory
+
+
+@main_bp.route('/api/cook')
+def what_can_i_cook():
+    """按库存匹配菜品：/api/cook?have=1:2,5:1,7&max_missing=2"""
+    inventory = _parse_inventory(request.args.get('have'))
+    if inventory is None:
+        return jsonify({'success': False, 'error': 'Invalid inventory'}), 400
+    if len(inventory) > current_app.config['COOK_MAX_ITEMS']:
+        return jsonify({'success': False, 'error': 'Too many crops'}), 400
+    max_missing = request.args.get('max_missing', 2, type=int)
+    max_missing = max(0, min(max_missing, 2))
+
+    index = get_recipe_book().index()
+    cookable, almost = index.match(inventory, max_missing)
+
+    def serialize(recipe, missing):
+        return {
+            'id': recipe.meal_id,
+            'name': recipe.name,
+            'url': url_for('main.meal_detail', id=recipe.meal_id),
+            'missing': [
+                {'crop_id': crop_id, 'name': index.crop_names[crop_id],
+                 'need': need, 'have': held}
+                for crop_id, need, held in missing
+            ],
+        }
 
     return jsonify({
         'success': True,
-        'likes_count': crop.get_likes_count(),
-        'is_liked': is_liked
+        'cookable': [serialize(*pair) for pair in cookable],
+        'almost': [serialize(*pair) for pair in almost],
     })
 
 
-@main_bp.route('/api/like/meal/<int:id>', methods=['POST'])
-@login_required
-def like_meal(id):
-    """AJAX 点赞菜品"""
-    meal = Meal.query.get_or_404(id)
-
-    if meal in current_user.liked_meals.all():
-        # 取消点赞
-        current_user.liked_meals.remove(meal)
-        is_liked = False
-    else:
-        # 添加点赞
-        current_user.liked_meals.append(meal)
-        is_liked = True
+@main_bp.route('/api/likes/state')
+def likes_state():
+    """批量查询点赞状态：/api/likes/state?crops=1,2,3&meals=4,5"""
+    ids = {
+        'crop': _parse_ids(request.args.get('crops')),
+        'meal': _parse_ids(request.args.get('meals')),
+    }
+    if any(value is None for value in ids.values()):
+        return jsonify({'success': False, 'error': 'Invalid id list'}), 400
+    if sum(len(value) for value in ids.values()) > \
+            current_app.config['LIKES_STATE_MAX_IDS']:
+        return jsonify({'success': False, 'error': 'Too many ids'}), 400
+
+    user_id = current_user.id if current_user.is_authenticated else None
+    return jsonify({
+        'success': True,
+        'crops': likes.get_like_states(user_id, 'crop', ids['crop']),
+        'meals': likes.get_like_states(user_id, 'meal', ids['meal']),
+    })
 
-    db.session.commit()
 
-    # 记录日志
-    from app.utils import log_action
-    action = "liked" if is_liked else "unliked"
-    message = f"User {current_user.username} {action} meal {meal.name}"
-    log_action(message)
+@main_bp.route('/api/suggest')
+def suggest():
+    """搜索框输入提示：/api/suggest?q=tom&limit=8（只读内存索引）"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', current_app.config['SUGGEST_LIMIT'],
+                             type=int)
+    limit = max(0, min(limit, current_app.config['SUGGEST_MAX_LIMIT']))
+
+    endpoints = {'crop': 'main.crop_detail', 'meal': 'main.meal_detail'}
+    suggestions = [
+        {
+            'type': kind,
+            'id': item_id,
+            'name': name,
+            'likes_count': likes_count,
+            'url': url_for(endpoints[kind], id=item_id),
+        }
+        for kind, item_id, name, likes_count
+        in get_suggester().suggest(query, limit)
+    ]
+    return jsonify({'success': True, 'query': query,
+                    'suggestions': suggestions})
+
+
+def _set_like(kind, id, liked):
+    """设置点赞状态并返回 JSON 响应（每次请求的 SQL 数量固定）"""
+    model = likes.LIKE_TARGETS[kind][0]
+    name = db.session.execute(
+        select(model.name).where(model.id == id)
+    ).scalar()
+    if name is None:
+        abort(404)
+
+    try:
+        changed = run_with_retries(likes.set_like, current_user.id, kind, id,
+                                   liked)
+    except LikeBufferFull:
+        return jsonify({
+            'success': False,
+            'error': 'Too many pending likes, please retry shortly'
+        }), 503
+    except OperationalError as error:
+        if not is_retryable(error):
+            raise
+        return jsonify({
+            'success': False,
+            'error': 'The database is busy, please retry shortly'
+        }), 503
+
+    if changed:
+        # 记录日志
+        action = "liked" if liked else "unliked"
+        log_action(f"User {current_user.username} {action} {kind} {name}")
 
     return jsonify({
         'success': True,
-        'likes_count': meal.get_likes_count(),
-        'is_liked': is_liked
+        'likes_count': likes.get_likes_count(kind, id),
+        'is_liked': liked
     })
+
+
+@main_bp.route('/api/like/crop/<int:id>', methods=['PUT', 'DELETE'])
+@login_required
+def set_crop_like(id):
+    """幂等点赞作物：PUT 点赞，DELETE 取消点赞"""
+    return _set_like('crop', id, request.method == 'PUT')
+
+
+@main_bp.route('/api/like/meal/<int:id>', methods=['PUT', 'DELETE'])
+@login_required
+def set_meal_like(id):
+    """幂等点赞菜品：PUT 点赞，DELETE 取消点赞"""
+    return _set_like('meal', id, request.method == 'PUT')
+
+
+@main_bp.route('/api/like/crop/<int:id>', methods=['POST'])
+@login_required
+def like_crop(id):
+    """AJAX 点赞作物（切换点赞状态）"""
+    return _set_like('crop', id, not likes.is_liked(current_user.id, 'crop', id))
+
+
+@main_bp.route('/api/like/meal/<int:id>', methods=['POST'])
+@login_required
+def like_meal(id):
+    """AJAX 点赞菜品（切换点赞状态）"""
+    return _set_like('meal', id, not likes.is_liked(current_user.id, 'meal', id))
@@ -0,0 +1,109 @@
+"""
+点赞写入基准：逐条提交 vs 写后缓冲批量提交
+
+用法: python benchmarks/bench_like_buffer.py [--events 5000] [--threads 8]
+
+在临时 SQLite 文件上模拟多个线程并发点赞/取消点赞，
+统计每秒处理的事件数与每秒提交的事务数。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DEV_DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'bench.db')
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, db, likes  # noqa: E402
+from app.like_buffer import LikeWriteBuffer  # noqa: E402
+from app.models import User, Crop  # noqa: E402
+
+USERS = 200
+CROPS = 50
+
+
+def setup(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(
+            User(username=f'u{i}', email=f'u{i}@example.com', password_hash='x')
+            for i in range(USERS)
+        )
+        db.session.add_all(Crop(name=f'crop{i}') for i in range(CROPS))
+        db.session.commit()
+
+
+def run(app, events, threads, buffered):
+    setup(app)
+    commits = [0]
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'commit')
+        def count_commit(conn):
+            commits[0] += 1
+
+    buffer = None
+    if buffered:
+        buffer = LikeWriteBuffer(app, max_batch=500, flush_interval=0.05)
+        app.extensions['like_buffer'] = buffer
+        buffer.start()
+
+    per_thread = events // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            for _ in range(per_thread):
+                user_id = rng.randint(1, USERS)
+                crop_id = rng.randint(1, CROPS)
+                liked = rng.random() < 0.7
+                for attempt in range(50):
+                    try:
+                        likes.set_like(user_id, 'crop', crop_id, liked)
+                        break
+                    except Exception:
+                        # database is locked：等待后重试
+                        db.session.rollback()
+                        time.sleep(0.01 * (attempt + 1))
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if buffer is not None:
+        buffer.stop()
+        del app.extensions['like_buffer']
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        event.remove(db.engine, 'commit', count_commit)
+        drift = likes.reconcile_like_counts()
+
+    label = 'write-behind' if buffered else 'direct'
+    print(f'{label:>12}: {per_thread * threads / elapsed:10.0f} events/s  '
+          f'{commits[0] / elapsed:8.1f} commits/s  '
+          f'({commits[0]} commits, {elapsed:.2f}s, drift={drift})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_app('development')
+    run(app, args.events, args.threads, buffered=False)
+    run(app, args.events, args.threads, buffered=True)
+
+
+if __name__ == '__main__':
+    main()
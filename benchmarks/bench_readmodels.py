@@ -0,0 +1,115 @@
+"""
+读模型基准：完整 ORM 实例 vs 只选卡片列的 Card
+
+用法: python benchmarks/bench_readmodels.py [--items 20000] [--rows 200] [--repeat 200]
+
+在临时 SQLite 文件上生成带长描述的作物和菜品，对同一组卡片
+（按名称排序的前 --rows 行）分别用两种方式读取：
+  orm   — select(Crop)，加载全部列并放入会话的标识映射
+  card  — select(*card_columns('crop'))，转换为 Card 命名元组
+统计每次读取的耗时（timeit）以及分配的内存块数和峰值（tracemalloc）。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DEV_DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'bench.db')
+
+from sqlalchemy import select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Crop, Meal, summarize  # noqa: E402
+from app.readmodels import card_columns, to_cards  # noqa: E402
+
+WORDS = ('tomato cabbage onion rice pumpkin carrot potato wheat honey stew '
+         'soup salad pie roast grilled fresh juicy hearty savory golden').split()
+
+
+def setup(app, items):
+    rng = random.Random(42)
+    half = items // 2
+
+    def description():
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(80, 300)))
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        crops = [description() for _ in range(half)]
+        meals = [description() for _ in range(items - half)]
+        db.session.execute(Crop.__table__.insert(), [
+            {'name': f'crop {i:06d}', 'description': text,
+             'summary': summarize(text), 'hunger_points': rng.randint(1, 10)}
+            for i, text in enumerate(crops)
+        ])
+        db.session.execute(Meal.__table__.insert(), [
+            {'name': f'meal {i:06d}', 'description': text,
+             'summary': summarize(text), 'hunger_restored': rng.randint(1, 20)}
+            for i, text in enumerate(meals)
+        ])
+        db.session.commit()
+
+
+def load_orm(rows):
+    crops = db.session.execute(
+        select(Crop).order_by(Crop.name).limit(rows)).scalars().all()
+    # 模拟模板读取卡片字段
+    cards = [(c.id, c.name, c.image_url, c.hunger_points, c.description[:100])
+             for c in crops]
+    db.session.remove()
+    return cards
+
+
+def load_cards(rows):
+    cards = to_cards(db.session.execute(
+        select(*card_columns('crop')).order_by(Crop.name).limit(rows)))
+    cards = [(c.id, c.name, c.image_url, c.hunger, c.summary) for c in cards]
+    db.session.remove()
+    return cards
+
+
+def measure(label, func, rows, repeat):
+    func(rows)
+    seconds = min(timeit.repeat(lambda: func(rows), number=repeat, repeat=3))
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(max(stat.count_diff, 0) for stat in stats)
+
+    print(f'{label:>6}: {seconds / repeat * 1000:8.3f} ms/call  '
+          f'peak {peak / 1024:8.1f} KiB  retained blocks {blocks:6d}')
+    return seconds / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app('development')
+    setup(app, args.items)
+    with app.app_context():
+        orm_time, orm_peak = measure('orm', load_orm, args.rows, args.repeat)
+        card_time, card_peak = measure('card', load_cards, args.rows,
+                                       args.repeat)
+    print(f'card vs orm: {orm_time / card_time:.1f}x faster, '
+          f'{orm_peak / max(card_peak, 1):.1f}x lower peak memory')
+
+
+if __name__ == '__main__':
+    main()
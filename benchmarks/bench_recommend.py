@@ -0,0 +1,114 @@
+"""
+推荐基准：物品相似度的离线计算
+
+用法: python benchmarks/bench_recommend.py [--users 50000] [--items 2000] [--likes 1000000]
+
+在临时 SQLite 文件上生成指定数量的用户、物品（作物和菜品各占一半）和点赞，
+物品热度近似长尾分布。统计一次全量计算的耗时，
+以及 "也喜欢" 和 "为你推荐" 查询的延迟。
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DEV_DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'bench.db')
+
+from app import create_app, db  # noqa: E402
+from app.models import (Crop, Meal, User, user_likes_crops,  # noqa: E402
+                        user_likes_meals)
+from app.recommend import also_liked, build_neighbors, for_user  # noqa: E402
+
+
+def _likes(rng, users, items, count):
+    """按长尾分布为用户生成不重复的点赞 {(类型, 用户, 物品), ...}"""
+    half = items // 2
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(items)]
+    pairs = set()
+    while len(pairs) < count:
+        user_id = rng.randint(1, users)
+        for index in rng.choices(range(items), weights, k=20):
+            if index < half:
+                pairs.add(('crop', user_id, index + 1))
+            else:
+                pairs.add(('meal', user_id, index - half + 1))
+    return pairs
+
+
+def setup(app, users, items, count):
+    rng = random.Random(42)
+    liked_at = datetime.utcnow() - timedelta(days=1)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        half = items // 2
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com',
+             'password_hash': '-'} for i in range(users)
+        ])
+        db.session.execute(Crop.__table__.insert(), [
+            {'name': f'crop {i}'} for i in range(half)])
+        db.session.execute(Meal.__table__.insert(), [
+            {'name': f'meal {i}'} for i in range(items - half)])
+        pairs = _likes(rng, users, items, count)
+        for kind, table, column in (('crop', user_likes_crops, 'crop_id'),
+                                    ('meal', user_likes_meals, 'meal_id')):
+            db.session.execute(table.insert(), [
+                {'user_id': u, column: i, 'liked_at': liked_at}
+                for k, u, i in pairs if k == kind
+            ])
+        db.session.commit()
+        return len(pairs)
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f'{label:>24}: {time.perf_counter() - start:8.2f} s  ({result} items)')
+    return result
+
+
+def query_latency(label, func, args_list):
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f'{label:>24}: p50 {statistics.median(timings):8.2f} ms  '
+          f'p95 {p95:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--likes', type=int, default=1000000)
+    args = parser.parse_args()
+
+    app = create_app('development')
+    start = time.perf_counter()
+    total = setup(app, args.users, args.items, args.likes)
+    print(f'loaded {total} likes in {time.perf_counter() - start:.1f}s')
+
+    rng = random.Random(7)
+    with app.app_context():
+        timed('build', build_neighbors)
+
+        query_latency('also liked', also_liked,
+                      [('crop', rng.randint(1, args.items // 2))
+                       for _ in range(200)])
+        query_latency('for user', for_user,
+                      [(rng.randint(1, args.users),) for _ in range(200)])
+
+
+if __name__ == '__main__':
+    main()
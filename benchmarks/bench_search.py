@@ -0,0 +1,110 @@
+"""
+搜索基准：LIKE '%关键词%' vs FTS5 全文索引
+
+用法: python benchmarks/bench_search.py [--items 100000] [--repeat 20]
+
+在临时 SQLite 文件上生成指定数量的作物和菜品（各占一半），
+分别用两种后端执行同一组关键词，统计每个查询的 p50/p95 延迟。
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DEV_DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'bench.db')
+
+from app import create_app, db  # noqa: E402
+from app.models import Crop, Meal  # noqa: E402
+from app.search import fts_enabled, search_page  # noqa: E402
+
+WORDS = (
+    'tomato cabbage onion rice pumpkin carrot potato wheat beetroot melon '
+    'sweet berry apple honey stew soup salad pie roast grilled fried baked '
+    'fresh juicy crunchy hearty savory spicy mild golden leafy wild farm '
+    'village nether ocean forest desert harvest winter summer autumn'
+).split()
+
+SYLLABLES = 'ka lo mi ru ta ne so pa vi do ze gu ri ma be'.split()
+
+KEYWORDS = ['tomato', 'pum', 'honey stew', 'golden apple', 'zzz', 'kalo']
+
+
+def _vocabulary(rng, size=5000):
+    """真实词汇之外加入随机合成词，使关键词的命中率接近真实数据"""
+    words = set(WORDS)
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES)
+                          for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _sentence(rng, vocabulary, length):
+    return ' '.join(rng.choice(vocabulary) for _ in range(length))
+
+
+def setup(app, items):
+    rng = random.Random(42)
+    vocabulary = _vocabulary(rng)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        half = items // 2
+        db.session.execute(Crop.__table__.insert(), [
+            {'name': f'{_sentence(rng, vocabulary, 2)} {i}',
+             'description': _sentence(rng, vocabulary, 20),
+             'hunger_points': rng.randint(1, 10)}
+            for i in range(half)
+        ])
+        db.session.execute(Meal.__table__.insert(), [
+            {'name': f'{_sentence(rng, vocabulary, 3)} {i}',
+             'description': _sentence(rng, vocabulary, 30),
+             'hunger_restored': rng.randint(1, 20)}
+            for i in range(items - half)
+        ])
+        db.session.commit()
+
+
+def run(app, use_fts, repeat, sort_by):
+    app.config['SEARCH_BACKEND'] = 'auto' if use_fts else 'like'
+    app.extensions.pop('search_fts', None)
+    label = 'fts5' if use_fts else 'like'
+    with app.app_context():
+        if use_fts and not fts_enabled():
+            print(f'{label:>6}: FTS5 not available in this SQLite build')
+            return
+        for keyword in KEYWORDS:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                page = search_page(['crop', 'meal'], keyword, sort_by)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f'{label:>6} {keyword!r:>16}: {page.total:7d} hits  '
+                  f'p50 {statistics.median(timings):8.2f} ms  p95 {p95:8.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sort', default='name',
+                        choices=['name', 'hunger', 'likes', 'relevance'])
+    args = parser.parse_args()
+
+    app = create_app('development')
+    start = time.perf_counter()
+    setup(app, args.items)
+    print(f'loaded {args.items} items in {time.perf_counter() - start:.1f}s')
+    run(app, False, args.repeat, args.sort)
+    run(app, True, args.repeat, args.sort)
+
+
+if __name__ == '__main__':
+    main()
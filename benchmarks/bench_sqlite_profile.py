@@ -0,0 +1,130 @@
+"""
+SQLite 引擎配置基准：默认设置 vs WAL + PRAGMA + 写入重试
+
+用法: python benchmarks/bench_sqlite_profile.py [--seconds 5] [--readers 8] [--writers 4]
+
+每种配置在单独的子进程中运行（SQLITE_TUNING=0/1），使用各自的临时 SQLite 文件。
+读线程反复读取按点赞数排序的卡片列表，写线程反复点赞/取消点赞，
+统计读吞吐量与 p50/p95 延迟、写吞吐量以及写入最终失败（database is locked）的次数。
+默认设置下写线程直接调用 set_like；调优后与视图一样通过 run_with_retries 调用。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USERS = 500
+CROPS = 200
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(seconds, readers, writers):
+    import random
+    import threading
+    import time
+
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+
+    from app import create_app, db, likes
+    from app.engine import run_with_retries
+    from app.models import Crop, User
+    from app.readmodels import card_columns, to_cards
+
+    app = create_app('development')
+    tuned = app.config['SQLITE_TUNING']
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(
+            User(username=f'u{i}', email=f'u{i}@example.com', password_hash='x')
+            for i in range(USERS)
+        )
+        db.session.add_all(Crop(name=f'crop{i}', description='x' * 200)
+                           for i in range(CROPS))
+        db.session.commit()
+
+    stop = threading.Event()
+    read_latencies = [[] for _ in range(readers)]
+    writes = [0] * writers
+    failures = [0] * writers
+
+    def reader(index):
+        latencies = read_latencies[index]
+        with app.app_context():
+            query = (select(*card_columns('crop'))
+                     .order_by(Crop.likes_count.desc(), Crop.id).limit(20))
+            while not stop.is_set():
+                start = time.perf_counter()
+                to_cards(db.session.execute(query))
+                db.session.rollback()
+                latencies.append(time.perf_counter() - start)
+
+    def writer(index):
+        rng = random.Random(index)
+        with app.app_context():
+            while not stop.is_set():
+                args = (rng.randint(1, USERS), 'crop', rng.randint(1, CROPS),
+                        rng.random() < 0.6)
+                try:
+                    if tuned:
+                        run_with_retries(likes.set_like, *args)
+                    else:
+                        likes.set_like(*args)
+                    writes[index] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    failures[index] += 1
+
+    threads = ([threading.Thread(target=reader, args=(i,)) for i in range(readers)] +
+               [threading.Thread(target=writer, args=(i,)) for i in range(writers)])
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies = [value for rows in read_latencies for value in rows]
+    label = 'tuned' if tuned else 'default'
+    print(f'{label:>8}: reads {len(latencies) / seconds:8.0f}/s  '
+          f'p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  '
+          f'p95 {percentile(latencies, 0.95) * 1000:7.2f} ms  |  '
+          f'writes {sum(writes) / seconds:6.0f}/s  '
+          f'locked failures {sum(failures)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run(args.seconds, args.readers, args.writers)
+        return
+
+    for tuning in ('0', '1'):
+        tmpdir = tempfile.mkdtemp()
+        env = dict(os.environ, SQLITE_TUNING=tuning,
+                   DEV_DATABASE_URL='sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                        '--seconds', str(args.seconds),
+                        '--readers', str(args.readers),
+                        '--writers', str(args.writers)],
+                       env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,10 +12,116 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
+
+    # 按请求统计 SQL（app/instrumentation.py），结果写入 Server-Timing 头和日志
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
+    SQL_SLOW_STATEMENTS = 3           # 报告最慢的语句条数
+    SQL_REPEAT_THRESHOLD = 3          # 同一形状的语句执行多少次视为 N+1
+    SQL_LOG_REQUEST_MS = 100          # 数据库耗时超过该值的请求写入日志
+
+    # 采样慢查询日志（app/slowlog.py，后台 "慢查询" 页面）
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', '1') == '1'
+    SLOW_QUERY_SAMPLE_RATE = 0.05       # 计时的语句比例，可在后台页面调整
+    SLOW_QUERY_THRESHOLD_MS = 100       # 超过该耗时的 SELECT 记录执行计划
+    SLOW_QUERY_MAX_FINGERPRINTS = 500   # 最多保留的指纹数
+    SLOW_QUERY_SAMPLES = 200            # 每个指纹保留最近多少次耗时（计算 p50/p95）
+    SLOW_QUERY_FILE = os.path.join(basedir, 'logs', 'slow_queries.json')
+    SLOW_QUERY_PERSIST_SECONDS = 300    # 持久化间隔（秒）
     
+    # SQLite 连接 PRAGMA（app/engine.py 在每个新连接上执行），SQLITE_TUNING=0 时不设置
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',        # 读写互不阻塞
+        'synchronous': 'NORMAL',      # WAL 下只在检查点时 fsync
+        'busy_timeout': 5000,         # 锁被占用时最多等待的毫秒数
+        'cache_size': -16000,         # 页缓存（负数表示 KiB）
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+    # MySQL 连接池
+    DB_POOL_SIZE = 10
+    DB_MAX_OVERFLOW = 20
+    DB_POOL_TIMEOUT = 10              # 等待空闲连接的秒数
+    DB_POOL_RECYCLE = 280             # 小于服务器的 wait_timeout，避免使用已断开的连接
+
+    # 写入遇到锁冲突时的重试（带随机抖动的指数退避）
+    DB_WRITE_RETRIES = 3
+    DB_RETRY_BASE_DELAY = 0.05        # 秒
+    DB_RETRY_MAX_DELAY = 1.0          # 秒
+
+    # 只读副本（app/replica.py）：设置后只读页面的查询发往副本，默认关闭
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = 10       # 写入后该浏览器读主库的秒数（应大于副本延迟）
+    REPLICA_CHECK_SECONDS = 5         # 探测副本是否可用的间隔（秒）
+    REPLICA_ENDPOINTS = (
+        'main.index', 'main.crops', 'main.crops_more', 'main.meals',
+        'main.meals_more', 'main.crop_detail', 'main.meal_detail', 'main.search',
+        'main.rankings', 'main.like_analytics', 'main.what_can_i_cook',
+        'main.likes_state', 'main.suggest',
+    )
+
     # 分页配置
     ITEMS_PER_PAGE = 12
     
+    # 批量点赞状态接口单次最多查询的 ID 数
+    LIKES_STATE_MAX_IDS = 300
+
+    # 点赞写后缓冲（write-behind）：事件合并后批量落库，默认关闭
+    LIKE_WRITE_BEHIND = os.environ.get('LIKE_WRITE_BEHIND') == '1'
+    LIKE_BUFFER_MAX_BATCH = 500        # 达到该数量立即刷新
+    LIKE_BUFFER_FLUSH_INTERVAL = 1.0   # 最长刷新间隔（秒）
+    LIKE_BUFFER_MAX_PENDING = 10000    # 队列上限，超过后阻塞请求（背压）
+    LIKE_BUFFER_BLOCK_TIMEOUT = 2.0    # 队列满时最长等待时间（秒）
+    LIKE_BUFFER_MAX_RETRIES = 5        # 同一事件连续写入失败的次数上限，超过后丢弃
+    LIKE_BUFFER_FLUSH_ON_EXIT = True   # 进程退出时写入剩余事件
+
+    # 首页/排行榜结果缓存的有效期（秒），点赞或后台修改影响排序时提前失效
+    RESULT_CACHE_TTL = 60
+
+    # 进程内索引（输入提示、模糊搜索、菜谱、趋势排行榜）在后台同步的周期（秒），
+    # 用于合并其他进程的修改；趋势排行榜只合并新的点赞事件，其他索引整体重建
+    INDEX_RESYNC_SECONDS = 900
+
+    # 趋势排行榜
+    TRENDING_BUCKET_SECONDS = 3600       # 滑动窗口的时间桶粒度
+    TRENDING_HOT_HALF_LIFE = 12 * 3600   # 热度分半衰期（秒）
+
+    # 点赞事件日志保留天数（汇总后清理），None 表示不清理
+    LIKE_EVENT_RETENTION_DAYS = None
+
+    # 搜索后端：'auto' 在 SQLite 支持 FTS5 时使用全文索引，'like' 强制使用 LIKE 查询
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    SEARCH_PER_PAGE = 12
+    SEARCH_CACHE_MAX_ENTRIES = 2048     # 搜索结果缓存的最大条目数
+    SEARCH_CACHE_MAX_IDS = 50000        # 所有条目缓存的 id 总数上限（限制内存）
+    SEARCH_CACHE_TTL = 300              # 搜索结果缓存有效期（秒）
+    SEARCH_CACHE_MAX_AGE = 60           # 搜索页 Cache-Control 的 max-age（秒）
+
+    # 搜索输入提示
+    SUGGEST_LIMIT = 8                # 默认返回条数
+    SUGGEST_MAX_LIMIT = 20           # limit 参数上限
+    SUGGEST_PRELOAD = True           # 收到第一个请求时在后台构建索引
+
+    # "我能做什么菜"
+    COOK_MAX_ITEMS = 200               # 库存参数中作物数量上限
+    PAIRINGS_SIZE = 6                  # 作物详情页 "常搭配的作物" 展示数量
+
+    # 协同过滤推荐（flask recommend build 离线计算）
+    RECOMMEND_TOP_K = 20               # 每个物品保存的相似物品数
+    RECOMMEND_MIN_SUPPORT = 2          # 至少有几位玩家同时点赞才计算相似度
+    RECOMMEND_MAX_USER_LIKES = 500     # 每位玩家最多使用最近的多少个点赞
+    RECOMMEND_PANEL_SIZE = 6           # 详情页 "也喜欢" 展示数量
+    RECOMMEND_FOR_YOU_SIZE = 8         # 个人页 "为你推荐" 展示数量
+
+    # 目录快照：每个进程在内存中保存只读的作物/菜品目录，默认关闭
+    CATALOG_SNAPSHOT = os.environ.get('CATALOG_SNAPSHOT') == '1'
+    CATALOG_VERSION_CHECK_SECONDS = 1.0   # 最多每隔多少秒检查一次目录版本号
+
+    # 模糊搜索（三元组相似度）
+    FUZZY_THRESHOLD = 0.3                # 最低相似度
+    FUZZY_INCLUDE_DESCRIPTIONS = False   # 是否索引描述中的单词
+
     # 日志配置
     LOG_DIR = os.path.join(basedir, 'logs')
     LOG_FILE = 'app.log'
@@ -46,4 +152,6 @@ class TestingConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SLOW_QUERY_FILE = None
+    SUGGEST_PRELOAD = False     # 内存数据库的连接在线程间共享，由测试按需构建
 
@@ -0,0 +1,29 @@
+"""Add catalog_version counter for in-process catalog snapshots
+
+Revision ID: 2f9c6b41d8e3
+Revises: e7a3d1c90f26
+Create Date: 2026-02-09 16:22:47.915302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f9c6b41d8e3'
+down_revision = 'e7a3d1c90f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,46 @@
+"""Add denormalized likes_count to crop and meal
+
+Revision ID: 3b7c1f9a2d41
+Revises: 80553661b32e
+Create Date: 2026-01-05 10:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1f9a2d41'
+down_revision = '80553661b32e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('crop', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_crop_likes_count'), ['likes_count'], unique=False)
+
+    with op.batch_alter_table('meal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_meal_likes_count'), ['likes_count'], unique=False)
+
+    # 回填已有点赞数据
+    op.execute(
+        'UPDATE crop SET likes_count = '
+        '(SELECT COUNT(*) FROM user_likes_crops WHERE user_likes_crops.crop_id = crop.id)'
+    )
+    op.execute(
+        'UPDATE meal SET likes_count = '
+        '(SELECT COUNT(*) FROM user_likes_meals WHERE user_likes_meals.meal_id = meal.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('meal', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_meal_likes_count'))
+        batch_op.drop_column('likes_count')
+
+    with op.batch_alter_table('crop', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_crop_likes_count'))
+        batch_op.drop_column('likes_count')
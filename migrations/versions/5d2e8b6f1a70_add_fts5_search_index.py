@@ -0,0 +1,68 @@
+"""Add SQLite FTS5 full-text index for crops and meals
+
+Revision ID: 5d2e8b6f1a70
+Revises: 9e4a0c7d5b13
+Create Date: 2026-01-19 10:12:47.903115
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8b6f1a70'
+down_revision = '9e4a0c7d5b13'
+branch_labels = None
+depends_on = None
+
+
+def _has_fts5(bind):
+    if bind.dialect.name != 'sqlite':
+        return False
+    options = bind.exec_driver_sql('PRAGMA compile_options').scalars()
+    return 'ENABLE_FTS5' in set(options)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # 只有 SQLite 且编译了 FTS5 时才创建，其他情况应用使用 LIKE 查询
+    if not _has_fts5(bind):
+        return
+
+    for table in ('crop', 'meal'):
+        fts = f'{table}_fts'
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"name, description, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, name, description) "
+            f"VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name, description "
+            f"ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); "
+            f"INSERT INTO {fts}(rowid, name, description) "
+            f"VALUES (new.id, new.name, new.description); END"
+        )
+        # 为已有数据建立索引
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table in ('crop', 'meal'):
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
@@ -0,0 +1,63 @@
+"""Add like event journal and daily like rollup tables
+
+Revision ID: 9e4a0c7d5b13
+Revises: 3b7c1f9a2d41
+Create Date: 2026-01-12 16:40:02.518330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a0c7d5b13'
+down_revision = '3b7c1f9a2d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('like_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('item_type', sa.String(length=10), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.SmallInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('like_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_like_events_created_at'), ['created_at'], unique=False)
+
+    op.create_table('crop_like_daily',
+    sa.Column('crop_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('likes_gained', sa.Integer(), nullable=False),
+    sa.Column('likes_lost', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('crop_id', 'day')
+    )
+    op.create_table('meal_like_daily',
+    sa.Column('meal_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('likes_gained', sa.Integer(), nullable=False),
+    sa.Column('likes_lost', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('meal_id', 'day')
+    )
+
+    # 以现有点赞作为初始事件，使汇总包含历史数据
+    op.execute(
+        "INSERT INTO like_events (item_type, item_id, delta, created_at) "
+        "SELECT 'crop', crop_id, 1, liked_at FROM user_likes_crops"
+    )
+    op.execute(
+        "INSERT INTO like_events (item_type, item_id, delta, created_at) "
+        "SELECT 'meal', meal_id, 1, liked_at FROM user_likes_meals"
+    )
+
+
+def downgrade():
+    op.drop_table('meal_like_daily')
+    op.drop_table('crop_like_daily')
+    with op.batch_alter_table('like_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_like_events_created_at'))
+
+    op.drop_table('like_events')
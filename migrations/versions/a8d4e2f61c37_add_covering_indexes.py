@@ -0,0 +1,38 @@
+"""Add item-leading and liked_at covering indexes on association tables
+
+Revision ID: a8d4e2f61c37
+Revises: 2f9c6b41d8e3
+Create Date: 2026-02-16 10:41:09.553218
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4e2f61c37'
+down_revision = '2f9c6b41d8e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_likes_crops_crop_id', 'user_likes_crops',
+                    ['crop_id', 'user_id'], unique=False)
+    op.create_index('ix_user_likes_crops_liked_at', 'user_likes_crops',
+                    ['liked_at', 'crop_id'], unique=False)
+    op.create_index('ix_user_likes_meals_meal_id', 'user_likes_meals',
+                    ['meal_id', 'user_id'], unique=False)
+    op.create_index('ix_user_likes_meals_liked_at', 'user_likes_meals',
+                    ['liked_at', 'meal_id'], unique=False)
+    op.create_index('ix_meal_ingredients_crop_id', 'meal_ingredients',
+                    ['crop_id', 'meal_id', 'quantity'], unique=False)
+    op.create_index(op.f('ix_meal_created_at'), 'meal', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_meal_created_at'), table_name='meal')
+    op.drop_index('ix_meal_ingredients_crop_id', table_name='meal_ingredients')
+    op.drop_index('ix_user_likes_meals_liked_at', table_name='user_likes_meals')
+    op.drop_index('ix_user_likes_meals_meal_id', table_name='user_likes_meals')
+    op.drop_index('ix_user_likes_crops_liked_at', table_name='user_likes_crops')
+    op.drop_index('ix_user_likes_crops_crop_id', table_name='user_likes_crops')
@@ -0,0 +1,69 @@
+"""Rebuild crop and meal FTS5 indexes with the trigram tokenizer
+
+Revision ID: b7e1c4d9f358
+Revises: a8d4e2f61c37
+Create Date: 2026-03-02 15:27:41.318604
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1c4d9f358'
+down_revision = 'a8d4e2f61c37'
+branch_labels = None
+depends_on = None
+
+
+def _has_trigram(bind):
+    if bind.dialect.name != 'sqlite':
+        return False
+    if (bind.dialect.server_version_info or ()) < (3, 34):
+        return False
+    options = bind.exec_driver_sql('PRAGMA compile_options').scalars()
+    return 'ENABLE_FTS5' in set(options)
+
+
+def _recreate(tokenize):
+    for table in ('crop', 'meal'):
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"name, description, content='{table}', content_rowid='id', "
+            f"tokenize={tokenize})"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, name, description) "
+            f"VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF name, description "
+            f"ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); "
+            f"INSERT INTO {fts}(rowid, name, description) "
+            f"VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    # trigram 分词器需要 SQLite 3.34；更早的版本保留原索引，应用使用 LIKE 查询
+    if not _has_trigram(op.get_bind()):
+        return
+    _recreate("'trigram'")
+
+
+def downgrade():
+    if not _has_trigram(op.get_bind()):
+        return
+    _recreate("'unicode61 remove_diacritics 2', prefix='2 3'")
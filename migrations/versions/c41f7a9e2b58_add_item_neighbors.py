@@ -0,0 +1,37 @@
+"""Add item_neighbors table for collaborative-filtering recommendations
+
+Revision ID: c41f7a9e2b58
+Revises: 5d2e8b6f1a70
+Create Date: 2026-01-26 14:05:31.227604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7a9e2b58'
+down_revision = '5d2e8b6f1a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('item_neighbors',
+    sa.Column('item_type', sa.String(length=10), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('neighbor_type', sa.String(length=10), nullable=False),
+    sa.Column('neighbor_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('item_type', 'item_id', 'neighbor_type', 'neighbor_id')
+    )
+    with op.batch_alter_table('item_neighbors', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_item_neighbors_computed_at'), ['computed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('item_neighbors', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_item_neighbors_computed_at'))
+
+    op.drop_table('item_neighbors')
@@ -0,0 +1,61 @@
+"""Add stored description summary to crop and meal
+
+Revision ID: e7a3d1c90f26
+Revises: c41f7a9e2b58
+Create Date: 2026-02-02 09:41:18.530274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3d1c90f26'
+down_revision = 'c41f7a9e2b58'
+branch_labels = None
+depends_on = None
+
+# 与 app.models.SUMMARY_LENGTH 保持一致（迁移中不导入应用代码）
+SUMMARY_LENGTH = 100
+
+
+def _backfill(table_name):
+    """按与模型相同的规则回填已有数据的摘要"""
+    table = sa.table(table_name, sa.column('id', sa.Integer),
+                     sa.column('description', sa.Text),
+                     sa.column('summary', sa.String))
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(table.c.id, table.c.description)
+        .where(table.c.description.isnot(None))
+    ).all()
+    updates = [
+        {'row_id': row_id,
+         'value': description[:SUMMARY_LENGTH] + '...'
+         if len(description) > SUMMARY_LENGTH else description}
+        for row_id, description in rows if description
+    ]
+    if updates:
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam('row_id'))
+            .values(summary=sa.bindparam('value')),
+            updates
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('crop', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.String(length=SUMMARY_LENGTH + 3), nullable=True))
+
+    with op.batch_alter_table('meal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.String(length=SUMMARY_LENGTH + 3), nullable=True))
+
+    _backfill('crop')
+    _backfill('meal')
+
+
+def downgrade():
+    # 不使用 batch 模式：SQLite 重建表会丢失全文索引的触发器（需要 SQLite 3.35+）
+    op.drop_column('meal', 'summary')
+    op.drop_column('crop', 'summary')
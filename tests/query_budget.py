@@ -0,0 +1,43 @@
+"""
+测试辅助：检查一次请求的 SQL 数量（查询预算）与 N+1
+
+用法（unittest 或 pytest 中都可以使用）：
+    response = assert_query_budget(app, client, '/crops', 3)
+    response = assert_query_budget(app, client, '/api/like/crop/1', 6, method='put')
+"""
+from app.signals import queries_recorded
+
+
+def _report(stats):
+    lines = [f'{stats.count} queries in {stats.duration * 1000:.1f} ms']
+    for shape, times, location in stats.repeated:
+        lines.append(f'  repeated {times}x at {location}: {shape}')
+    for duration, statement, location in stats.slowest:
+        lines.append(f'  {duration * 1000:.1f} ms at {location}: '
+                     f'{" ".join(statement.split())}')
+    return '\n'.join(lines)
+
+
+def record_request(app, client, url, method='get', **kwargs):
+    """发送请求并返回 (响应, QueryStats)"""
+    recorded = []
+
+    def on_recorded(sender, stats, **extra):
+        recorded.append(stats)
+
+    with queries_recorded.connected_to(on_recorded, app):
+        response = getattr(client, method)(url, **kwargs)
+    assert recorded, 'SQL instrumentation is disabled (SQL_INSTRUMENTATION)'
+    return response, recorded[-1]
+
+
+def assert_query_budget(app, client, url, budget, method='get',
+                        allow_repeats=False, **kwargs):
+    """请求的 SQL 数量超过 budget 或出现重复形状的语句时失败，返回响应"""
+    response, stats = record_request(app, client, url, method, **kwargs)
+    assert stats.count <= budget, \
+        f'{method.upper()} {url} exceeded its query budget of {budget}: ' \
+        f'{_report(stats)}'
+    assert allow_repeats or not stats.repeated, \
+        f'{method.upper()} {url} repeats statements (N+1): {_report(stats)}'
+    return response
@@ -0,0 +1,135 @@
+"""
+结果缓存与榜单失效测试
+"""
+import threading
+import time
+import unittest
+from app import create_app, db
+from app.cache import LRUCache, ResultCache
+from app.models import User, Meal
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    """结果缓存测试用例"""
+
+    def test_single_flight(self):
+        """测试并发未命中时只计算一次"""
+        cache = ResultCache(default_ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return ['value']
+
+        threads = [
+            threading.Thread(target=cache.get_or_compute, args=('k', compute))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_invalidate_during_compute_discards_result(self):
+        """测试计算期间被失效的结果不会写入缓存"""
+        cache = ResultCache(default_ttl=60)
+
+        def compute():
+            cache.invalidate('k')
+            return ['stale']
+
+        self.assertEqual(cache.get_or_compute('k', compute), ['stale'])
+        self.assertIsNone(cache.peek('k'))
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    """LRU 缓存测试用例"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超过条目数时淘汰最久未使用的条目"""
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_weight_bound(self):
+        """测试按总权重限制内存"""
+        cache = LRUCache(max_entries=10, max_weight=5)
+        cache.put('a', 'x', weight=3)
+        cache.put('b', 'y', weight=3)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['weight'], 3)
+        cache.put('c', 'z', weight=6)
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache.get('b'), 'y')
+
+    def test_ttl(self):
+        """测试过期条目不再返回"""
+        cache = LRUCache(ttl=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class RankingCacheTestCase(unittest.TestCase):
+    """榜单缓存失效测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.cache = self.app.extensions['result_cache']
+
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        self.meals = [Meal(name=f'Meal {i}', hunger_restored=1)
+                      for i in range(5)]
+        db.session.add(user)
+        db.session.add_all(self.meals)
+        db.session.commit()
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_index_invalidated_only_when_ordering_changes(self):
+        """测试首页缓存只在排序可能变化时失效"""
+        for meal in self.meals[:3]:
+            self.client.put(f'/api/like/meal/{meal.id}')
+        self.client.get('/')
+        self.assertIsNotNone(self.cache.peek('index:top_meals'))
+
+        # 取消点赞一个不在榜单中的菜品：缓存保留
+        self.client.delete(f'/api/like/meal/{self.meals[4].id}')
+        self.assertIsNotNone(self.cache.peek('index:top_meals'))
+
+        # 点赞后达到榜单门槛：缓存失效
+        self.client.put(f'/api/like/meal/{self.meals[4].id}')
+        self.assertIsNone(self.cache.peek('index:top_meals'))
+
+        # 榜单中的菜品取消点赞：缓存失效，重新计算后出现新菜品
+        self.client.get('/')
+        self.client.delete(f'/api/like/meal/{self.meals[0].id}')
+        self.assertIsNone(self.cache.peek('index:top_meals'))
+        response = self.client.get('/')
+        self.assertIn(b'Meal 4', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
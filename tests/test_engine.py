@@ -0,0 +1,129 @@
+"""
+数据库引擎配置测试
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.engine import (apply_sqlite_pragmas, engine_options, is_retryable,
+                        run_with_retries, sqlite_pragmas)
+
+
+def _locked_error():
+    return OperationalError('UPDATE', {},
+                            sqlite3.OperationalError('database is locked'))
+
+
+class EngineOptionsTestCase(unittest.TestCase):
+    """引擎选项测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+
+    def test_mysql_pool_options(self):
+        """测试 MySQL 使用连接池配置，配置中显式给出的选项优先"""
+        config = dict(self.app.config,
+                      SQLALCHEMY_DATABASE_URI='mysql://u:p@localhost/wiki',
+                      SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 3})
+        options = engine_options(config)
+        self.assertEqual(options['pool_size'], 3)
+        self.assertEqual(options['pool_recycle'], 280)
+        self.assertTrue(options['pool_pre_ping'])
+
+        config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+        self.assertEqual(engine_options(config), {})
+
+    def test_pragmas_on_app_engine(self):
+        """测试应用的内存数据库连接上已执行 PRAGMA（跳过不支持的 WAL）"""
+        with self.app.app_context():
+            pragmas = sqlite_pragmas(db.engine, ['busy_timeout', 'temp_store',
+                                                 'journal_mode'])
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['temp_store'], 2)
+        self.assertEqual(pragmas['journal_mode'], 'memory')
+
+    def test_is_retryable(self):
+        """测试只把锁冲突视为可重试"""
+        self.assertTrue(is_retryable(_locked_error()))
+        self.assertFalse(is_retryable(OperationalError(
+            'SELECT', {}, sqlite3.OperationalError('no such table: x'))))
+        self.assertFalse(is_retryable(ValueError('database is locked')))
+
+
+class SqliteLockingTestCase(unittest.TestCase):
+    """SQLite 文件数据库的锁与重试测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.url = 'sqlite:///' + os.path.join(self.tmpdir, 'lock.db')
+        self.app = create_app('testing')
+        self.app.config.update(DB_RETRY_BASE_DELAY=0.2, DB_RETRY_MAX_DELAY=0.2)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.engine = create_engine(self.url)
+        apply_sqlite_pragmas(self.engine, dict(
+            self.app.config['SQLITE_PRAGMAS'], busy_timeout=20))
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE counter (n INTEGER)'))
+            conn.execute(text('INSERT INTO counter VALUES (0)'))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def _hold_write_lock(self, seconds):
+        """另一个连接持有写锁一段时间"""
+        holder = sqlite3.connect(self.url[len('sqlite:///'):],
+                                 isolation_level=None, check_same_thread=False)
+        holder.execute('BEGIN IMMEDIATE')
+        holder.execute('UPDATE counter SET n = n + 100')
+
+        def release():
+            time.sleep(seconds)
+            holder.execute('COMMIT')
+            holder.close()
+
+        thread = threading.Thread(target=release)
+        thread.start()
+        return thread
+
+    def _increment(self):
+        with self.engine.begin() as conn:
+            conn.execute(text('UPDATE counter SET n = n + 1'))
+
+    def test_wal_allows_reads_during_write(self):
+        """测试 WAL 模式下写锁被占用时仍然可以读取"""
+        self.assertEqual(
+            sqlite_pragmas(self.engine, ['journal_mode'])['journal_mode'], 'wal')
+        thread = self._hold_write_lock(0.3)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT n FROM counter')).scalar(), 0)
+        thread.join()
+
+    def test_write_retries(self):
+        """测试锁冲突时重试写入，不重试时报错"""
+        self.app.config['DB_WRITE_RETRIES'] = 0
+        thread = self._hold_write_lock(0.3)
+        with self.assertRaises(OperationalError):
+            run_with_retries(self._increment)
+        thread.join()
+
+        self.app.config['DB_WRITE_RETRIES'] = 20
+        thread = self._hold_write_lock(0.3)
+        run_with_retries(self._increment)
+        thread.join()
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT n FROM counter')).scalar(), 201)
+
+
+if __name__ == '__main__':
+    unittest.main()
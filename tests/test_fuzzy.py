@@ -0,0 +1,119 @@
+"""
+模糊搜索测试
+"""
+import unittest
+from app import create_app, db
+from app.fuzzy import TrigramIndex, trigrams
+from app.models import Crop, Meal
+from app.search import search_page
+from app.signals import catalog_changed
+
+
+class TrigramIndexTestCase(unittest.TestCase):
+    """三元组索引测试用例"""
+
+    def setUp(self):
+        self.index = TrigramIndex.build([
+            ('crop', 1, 'Tomato', None),
+            ('crop', 2, 'Cabbage', None),
+            ('crop', 3, 'Onion', None),
+            ('meal', 1, 'Tomato Sauce', None),
+        ])
+
+    def names(self, query, kind=None):
+        return [name for _, _, name, _ in self.index.search(query, kind)]
+
+    def test_trigrams(self):
+        """测试三元组拆分"""
+        self.assertEqual(trigrams('Cab'), {'  c', ' ca', 'cab', 'ab '})
+        self.assertEqual(trigrams(''), frozenset())
+
+    def test_typo_tolerance(self):
+        """测试拼写错误仍能匹配"""
+        self.assertEqual(self.names('tomatoe'), ['Tomato', 'Tomato Sauce'])
+        self.assertEqual(self.names('cabage'), ['Cabbage'])
+        self.assertEqual(self.names('tomatoe', kind='meal'), ['Tomato Sauce'])
+        self.assertEqual(self.names('xyz'), [])
+
+    def test_did_you_mean(self):
+        """测试给出最相近的其他名称"""
+        self.assertEqual(self.index.did_you_mean('oniom'), 'Onion')
+        self.assertEqual(self.index.did_you_mean('cabage'), 'Cabbage')
+        self.assertIsNone(self.index.did_you_mean('xyz'))
+
+    def test_incremental_updates(self):
+        """测试增删改后索引立即更新"""
+        self.index.upsert('crop', 3, 'Pumpkin')
+        self.assertEqual(self.names('oniom'), [])
+        self.assertEqual(self.names('pumkin'), ['Pumpkin'])
+
+        self.index.remove('crop', 1)
+        self.assertEqual(self.names('tomatoe'), ['Tomato Sauce'])
+        self.assertEqual(len(self.index), 3)
+
+        # 共享词条的物品删除后，其他物品仍可匹配该词条
+        self.index.remove('meal', 1)
+        self.assertEqual(self.names('tomatoe'), [])
+        self.index.upsert('crop', 1, 'Tomato')
+        self.assertEqual(self.names('tomatoe'), ['Tomato'])
+
+
+class FuzzySearchViewTestCase(unittest.TestCase):
+    """模糊搜索页面测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all([
+            Crop(name='Tomato', description='Red', hunger_points=3),
+            Crop(name='Cabbage', description='Green', hunger_points=2),
+            Meal(name='Tomato Sauce', description='Sauce', hunger_restored=4),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_fuzzy_search_page(self):
+        """测试模糊搜索按相似度在数据库中排序"""
+        page = search_page(['crop', 'meal'], 'tomatoe', 'relevance',
+                           fuzzy=True)
+        self.assertEqual([row.name for row in page.items],
+                         ['Tomato', 'Tomato Sauce'])
+        self.assertEqual(page.total, 2)
+
+        page = search_page(['crop'], 'zzz', fuzzy=True)
+        self.assertEqual(page.total, 0)
+
+    def test_did_you_mean_on_empty_results(self):
+        """测试无结果时给出拼写建议"""
+        response = self.client.get(
+            '/search?keyword=cabage&search_type=all&sort_by=name')
+        html = response.data.decode()
+        self.assertIn('Did you mean', html)
+        self.assertIn('keyword=Cabbage&amp;search_type=all', html)
+
+        response = self.client.get(
+            '/search?keyword=cabage&search_type=all&sort_by=name&fuzzy=y')
+        html = response.data.decode()
+        self.assertNotIn('Did you mean', html)
+        self.assertIn('Cabbage', html)
+
+    def test_catalog_changes_update_index(self):
+        """测试后台修改后模糊索引同步更新"""
+        self.assertEqual(search_page(['crop'], 'pumkin', fuzzy=True).total, 0)
+        db.session.add(Crop(name='Pumpkin'))
+        db.session.commit()
+        catalog_changed.send(self.app, kind='crop', item_id=3)
+        page = search_page(['crop'], 'pumkin', fuzzy=True)
+        self.assertEqual([row.name for row in page.items], ['Pumpkin'])
+
+
+if __name__ == '__main__':
+    unittest.main()
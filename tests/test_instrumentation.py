@@ -0,0 +1,135 @@
+"""
+按请求 SQL 统计测试
+"""
+import unittest
+from app import create_app, db, likes
+from app.instrumentation import statement_shape, summarize_queries
+from app.models import Crop, Meal, User, meal_ingredients
+from tests.query_budget import assert_query_budget, record_request
+
+# 每个路由的查询预算（按顺序请求，包括首次请求时填充缓存的查询）
+ROUTE_BUDGETS = [
+    ('/', 2),
+    ('/crops', 2),
+    ('/crops?page=2', 1),
+    ('/meals', 2),
+    ('/crop/1', 6),
+    ('/meal/1', 3),
+    ('/search?keyword=tomato&search_type=all&sort_by=name', 4),
+    ('/search?keyword=tomatto&search_type=all&sort_by=name&fuzzy=y', 3),
+    ('/rankings', 2),
+    ('/rankings?window=7d', 4),
+    ('/api/analytics/crop/1/likes', 2),
+    ('/api/cook?have=1:2,2', 0),
+    ('/api/likes/state?crops=1,2,3&meals=1,2', 2),
+    ('/api/suggest?q=to', 2),
+]
+
+
+class FakeQuery:
+    """与 get_recorded_queries() 的记录字段相同"""
+
+    def __init__(self, statement, duration, location='app/views.py:1 (view)'):
+        self.statement = statement
+        self.duration = duration
+        self.location = location
+
+
+class SummaryTestCase(unittest.TestCase):
+    """统计汇总测试用例"""
+
+    def test_statement_shape(self):
+        """测试 IN 列表长度和空白不影响语句形状"""
+        self.assertEqual(
+            statement_shape('SELECT id FROM crop\nWHERE id IN (?, ?, ?)'),
+            'SELECT id FROM crop WHERE id IN (?)')
+        self.assertEqual(statement_shape('SELECT id FROM crop WHERE id IN (?)'),
+                         'SELECT id FROM crop WHERE id IN (?)')
+
+    def test_summarize(self):
+        """测试汇总数量、耗时、最慢语句和重复形状"""
+        queries = [FakeQuery('SELECT likes_count FROM crop WHERE id = ?', 0.001,
+                             'app/likes.py:55 (get_likes_count)')
+                   for _ in range(4)]
+        queries.append(FakeQuery('SELECT * FROM meal', 0.010))
+        stats = summarize_queries(queries, slowest=2, repeat_threshold=3)
+        self.assertEqual(stats.count, 5)
+        self.assertAlmostEqual(stats.duration, 0.014)
+        self.assertEqual(stats.slowest[0][1], 'SELECT * FROM meal')
+        self.assertEqual(len(stats.slowest), 2)
+        self.assertEqual(stats.repeated, [
+            ('SELECT likes_count FROM crop WHERE id = ?', 4,
+             'app/likes.py:55 (get_likes_count)')])
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    """请求统计测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.add_all(Crop(name=name, description=name)
+                           for name in ('Tomato', 'Onion', 'Rice'))
+        db.session.add_all(Meal(name=name, description=name)
+                           for name in ('Tomato Soup', 'Fried Rice'))
+        db.session.flush()
+        db.session.execute(meal_ingredients.insert(),
+                           [{'meal_id': 1, 'crop_id': 1, 'quantity': 2}])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_route_budgets(self):
+        """测试各路由的查询数量不超过预算且没有 N+1"""
+        for url, budget in ROUTE_BUDGETS:
+            with self.subTest(url=url):
+                response = assert_query_budget(self.app, self.client, url, budget)
+                self.assertEqual(response.status_code, 200)
+
+    def test_like_budget(self):
+        """测试点赞接口的查询预算"""
+        self.client.post('/auth/login', data={
+            'username': 'testuser', 'password': 'password123'})
+        assert_query_budget(self.app, self.client, '/api/like/crop/2', 7,
+                            method='post')
+        assert_query_budget(self.app, self.client, '/api/like/meal/2', 6,
+                            method='put')
+
+    def test_server_timing_header(self):
+        """测试 Server-Timing 头包含查询数量和耗时"""
+        response, stats = record_request(self.app, self.client,
+                                         '/api/likes/state?crops=1,2')
+        self.assertEqual(stats.count, 1)
+        timing = response.headers['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=\d+\.\d\d;desc="1 query"$')
+
+    def test_detects_n_plus_one(self):
+        """测试循环中逐个读取点赞数被识别为 N+1"""
+        @self.app.route('/_test/counts')
+        def counts():
+            return {str(i): likes.get_likes_count('crop', i) for i in (1, 2, 3)}
+
+        response, stats = record_request(self.app, self.client, '/_test/counts')
+        self.assertIn('db-repeated;desc="1 shape"',
+                      response.headers['Server-Timing'])
+        shape, times, location = stats.repeated[0]
+        self.assertEqual(times, 3)
+        self.assertIn('get_likes_count', location)
+        with self.assertRaisesRegex(AssertionError, 'N\\+1'):
+            assert_query_budget(self.app, self.client, '/_test/counts', 10)
+        with self.assertRaisesRegex(AssertionError, 'query budget of 2'):
+            assert_query_budget(self.app, self.client, '/_test/counts', 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+点赞写后缓冲测试
+"""
+import unittest
+from unittest import mock
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.like_buffer import LikeWriteBuffer, LikeBufferFull
+from app.models import User, Crop, like_events, user_likes_crops
+from app.rankings import all_time_rankings
+
+
+class LikeBufferTestCase(unittest.TestCase):
+    """写后缓冲测试用例"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        # 不启动后台线程，由测试手动刷新
+        self.buffer = LikeWriteBuffer(self.app, max_pending=2)
+        self.app.extensions['like_buffer'] = self.buffer
+
+        self.user = User(username='testuser', email='test@example.com')
+        self.user.set_password('password123')
+        self.crops = [Crop(name=f'作物{i}', hunger_points=1) for i in range(3)]
+        db.session.add(self.user)
+        db.session.add_all(self.crops)
+        db.session.commit()
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _like_rows(self):
+        return db.session.execute(db.select(user_likes_crops)).all()
+
+    def test_optimistic_count_and_flush(self):
+        """测试乐观计数与批量落库"""
+        crop = self.crops[0]
+        response = self.client.put(f'/api/like/crop/{crop.id}')
+        self.assertEqual(response.get_json()['likes_count'], 1)
+        self.assertEqual(self._like_rows(), [])
+
+        self.assertEqual(self.buffer.flush(), 1)
+        db.session.expire_all()
+        self.assertEqual(len(self._like_rows()), 1)
+        self.assertEqual(crop.likes_count, 1)
+        self.assertEqual(self.buffer.pending_delta('crop', crop.id), 0)
+
+    def test_like_then_unlike_cancels(self):
+        """测试点赞后取消点赞相互抵消"""
+        crop = self.crops[0]
+        self.client.put(f'/api/like/crop/{crop.id}')
+        response = self.client.delete(f'/api/like/crop/{crop.id}')
+        self.assertEqual(response.get_json()['likes_count'], 0)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_rankings_refreshed_after_flush(self):
+        """测试落库后缓存的排行榜使用新的点赞数"""
+        crop = self.crops[0]
+        self.client.put(f'/api/like/crop/{crop.id}')
+        # 入队时的信号已使缓存失效，此时重新填充的榜单读到的还是旧计数
+        self.assertEqual(all_time_rankings('crop')[0][1], 0)
+        self.buffer.flush()
+        card, count = all_time_rankings('crop')[0]
+        self.assertEqual((card.id, count), (crop.id, 1))
+
+    def test_journal_only_applied_changes(self):
+        """测试其他进程已经写入的变化不再记入事件日志"""
+        crop, other, fresh = self.crops
+        self.buffer.max_pending = 10
+        self.buffer.submit('crop', self.user.id, fresh.id, True, False)
+        # 入队时认为尚未点赞，落库前另一个进程已经写入了同样的点赞
+        self.buffer.submit('crop', self.user.id, crop.id, True, False)
+        self.buffer.submit('crop', self.user.id, other.id, False, True)
+        db.session.execute(user_likes_crops.insert().values(
+            user_id=self.user.id, crop_id=crop.id))
+        db.session.commit()
+
+        self.assertEqual(self.buffer.flush(), 3)
+        events = db.session.execute(
+            db.select(like_events.c.item_id, like_events.c.delta)).all()
+        self.assertEqual(events, [(fresh.id, 1)])
+        db.session.expire_all()
+        self.assertEqual(crop.likes_count, 1)
+        self.assertEqual(other.likes_count, 0)
+
+    def test_failed_flush_reconciles(self):
+        """测试落库期间取消点赞、随后落库失败时两者相互抵消，计数不残留"""
+        crop = self.crops[0]
+        self.client.put(f'/api/like/crop/{crop.id}')
+
+        def unlike_then_fail(*args):
+            self.buffer.submit('crop', self.user.id, crop.id, False, False)
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+
+        with mock.patch('app.likes.write_likes', side_effect=unlike_then_fail):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.buffer.pending_delta('crop', crop.id), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self._like_rows(), [])
+
+    def test_drop_after_max_retries(self):
+        """测试一直写入失败的事件在达到重试上限后丢弃"""
+        crop = self.crops[0]
+        self.buffer.max_retries = 2
+        self.client.put(f'/api/like/crop/{crop.id}')
+        error = OperationalError('INSERT', {}, Exception('database is locked'))
+        with mock.patch('app.likes.write_likes', side_effect=error):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+            self.assertEqual(len(self.buffer), 1)
+            self.assertEqual(self.buffer.pending_delta('crop', crop.id), 1)
+            with self.assertLogs(self.app.logger, 'ERROR'):
+                with self.assertRaises(OperationalError):
+                    self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.buffer.pending_delta('crop', crop.id), 0)
+        self.assertEqual(self.buffer.dropped_events, 1)
+
+    def test_backpressure(self):
+        """测试队列满时返回 503"""
+        for crop in self.crops[:2]:
+            self.client.put(f'/api/like/crop/{crop.id}')
+        response = self.client.put(f'/api/like/crop/{self.crops[2].id}')
+        self.assertEqual(response.status_code, 503)
+        with self.assertRaises(LikeBufferFull):
+            self.buffer.submit('crop', self.user.id, self.crops[2].id,
+                               True, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
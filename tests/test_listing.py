@@ -0,0 +1,138 @@
+"""
+列表页游标分页测试
+"""
+import re
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.listing import decode_cursor, encode_cursor, keyset_page
+from app.models import Crop, Meal
+from app.readmodels import Card
+from app.signals import catalog_changed
+
+
+class ListingTestCase(unittest.TestCase):
+    """游标分页测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all([Crop(name=f'Crop {i:02d}', hunger_points=1,
+                                 description=f'Crop {i:02d} ' + 'x' * 200)
+                            for i in range(30)])
+        db.session.add(Meal(name='Only Meal', hunger_restored=1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_cursor_roundtrip(self):
+        """测试游标编码与解析"""
+        self.assertEqual(decode_cursor(encode_cursor('番茄 1', 7)), ('番茄 1', 7))
+        for value in ('', 'x', encode_cursor('a', 1)[:-2] + '!!'):
+            with self.assertRaises(ValueError):
+                decode_cursor(value)
+
+    def test_keyset_pages(self):
+        """测试逐页向后、向前翻页结果连续且不重复"""
+        names, cursor, pages = [], None, []
+        while True:
+            page = keyset_page('crop', after=cursor)
+            pages.append(page)
+            names += [crop.name for crop in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(names, [f'Crop {i:02d}' for i in range(30)])
+        self.assertEqual([len(page.items) for page in pages], [12, 12, 6])
+        self.assertFalse(pages[0].has_prev)
+        self.assertEqual(pages[-1].total, 30)
+        # 列表项是只读的 Card，不是会话中的 ORM 实例
+        self.assertIsInstance(pages[0].items[0], Card)
+        self.assertEqual(len(db.session.identity_map), 0)
+
+        back = keyset_page('crop', before=pages[-1].prev_cursor)
+        self.assertEqual([crop.name for crop in back.items],
+                         [crop.name for crop in pages[1].items])
+        self.assertTrue(back.has_prev)
+        self.assertTrue(back.has_next)
+
+    def test_list_page_links(self):
+        """测试列表页使用游标链接，旧的 ?page= 链接仍然可用"""
+        html = self.client.get('/crops').data.decode()
+        self.assertIn('30 crops', html)
+        self.assertIn('Crop 00 ' + 'x' * 92 + '...', html)
+        after = re.search(r'rel="next" data-cursor="([^"]+)"', html).group(1)
+        self.assertEqual(decode_cursor(after), ('Crop 11', 12))
+
+        html = self.client.get(f'/crops?after={after}').data.decode()
+        self.assertIn('Crop 12', html)
+        self.assertNotIn('Crop 11<', html)
+        self.assertIn('rel="prev"', html)
+
+        html = self.client.get('/crops?page=3').data.decode()
+        self.assertIn('Crop 29', html)
+        self.assertNotIn('rel="next"', html)
+
+        self.assertEqual(self.client.get('/crops?after=bad').status_code, 400)
+        self.assertEqual(self.client.get('/meals').status_code, 200)
+
+    def test_more_fragment(self):
+        """测试无限滚动片段只包含卡片，下一页游标在响应头中"""
+        first = keyset_page('crop')
+        response = self.client.get(f'/crops/more?after={first.next_cursor}')
+        html = response.data.decode()
+        self.assertNotIn('<html', html)
+        self.assertEqual(html.count('class="crop-card"'), 12)
+        self.assertEqual(decode_cursor(response.headers['X-Next-Cursor']),
+                         ('Crop 23', 24))
+
+        response = self.client.get(
+            f"/crops/more?after={response.headers['X-Next-Cursor']}")
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_total_cached_until_catalog_change(self):
+        """测试总数在后台修改后重新统计，深翻页不执行 COUNT"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        self.client.get('/crops')
+        last = keyset_page('crop', offset=24)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/crops')
+            self.client.get(f'/crops?before={last.prev_cursor}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len(statements), 2)
+        self.assertFalse(any('count(' in s.lower() for s in statements))
+        self.assertIn('(crop.name, crop.id) < (?, ?)', statements[1])
+        # 列表只读取摘要，不读取完整描述
+        self.assertIn('crop.summary', statements[1])
+        self.assertNotIn('crop.description', statements[1])
+
+        db.session.add(Crop(name='Crop 30', hunger_points=1))
+        db.session.commit()
+        self.assertIn('30 crops', self.client.get('/crops').data.decode())
+        catalog_changed.send(self.app, kind='crop', item_id=31)
+        self.assertIn('31 crops', self.client.get('/crops').data.decode())
+
+    def test_total_expires(self):
+        """测试其他进程的修改（没有本地信号）在缓存过期后生效"""
+        self.app.extensions['catalog_counts'].ttl = 0
+        self.assertIn('30 crops', self.client.get('/crops').data.decode())
+        db.session.add(Crop(name='Crop 30', hunger_points=1))
+        db.session.commit()
+        self.assertIn('31 crops', self.client.get('/crops').data.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -54,6 +54,21 @@ class ModelTestCase(unittest.TestCase):
         self.assertIsNotNone(meal.id)
         self.assertEqual(meal.name, '测试菜品')
         self.assertEqual(meal.get_likes_count(), 0)
+
+    def test_summary_maintained(self):
+        """测试写入描述时同步维护摘要"""
+        crop = Crop(name='长描述作物', description='x' * 150)
+        meal = Meal(name='短描述菜品', description='简短')
+        db.session.add_all([crop, meal])
+        db.session.commit()
+        self.assertEqual(crop.summary, 'x' * 100 + '...')
+        self.assertEqual(meal.summary, '简短')
+
+        crop.description = 'y' * 100
+        meal.description = None
+        db.session.commit()
+        self.assertEqual(db.session.get(Crop, crop.id).summary, 'y' * 100)
+        self.assertIsNone(db.session.get(Meal, meal.id).summary)
     
     def test_user_like_crop(self):
         """测试用户点赞作物（多对多关系）"""
@@ -108,6 +123,41 @@ class ModelTestCase(unittest.TestCase):
         self.assertIn(crop1, meal.ingredients.all())
         self.assertIn(crop2, meal.ingredients.all())
 
+    def test_likes_count_maintained(self):
+        """测试点赞计数随关联表同步更新"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        crop = Crop(name='测试作物', hunger_points=2)
+        db.session.add_all([user, crop])
+        db.session.commit()
+
+        user.liked_crops.append(crop)
+        db.session.commit()
+        self.assertEqual(crop.likes_count, 1)
+
+        user.liked_crops.remove(crop)
+        db.session.commit()
+        self.assertEqual(crop.likes_count, 0)
+
+    def test_reconcile_like_counts(self):
+        """测试修复点赞计数偏差"""
+        from app.likes import reconcile_like_counts
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        meal = Meal(name='测试菜品', hunger_restored=10)
+        db.session.add_all([user, meal])
+        db.session.commit()
+        user.liked_meals.append(meal)
+        db.session.commit()
+
+        meal.likes_count = 5
+        db.session.commit()
+        repaired = reconcile_like_counts()
+
+        self.assertEqual(repaired, {'crop': 0, 'meal': 1})
+        db.session.refresh(meal)
+        self.assertEqual(meal.likes_count, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
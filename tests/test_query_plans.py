@@ -0,0 +1,167 @@
+"""
+查询计划回归测试：视图中的查询不能退化为全表扫描
+"""
+import re
+import unittest
+from datetime import datetime
+from sqlalchemy import event, select
+from app import create_app, db
+from app.fuzzy import get_fuzzy
+from app.likes import LIKE_TARGETS, count_subquery
+from app.models import Crop, Meal, User, meal_ingredients
+from app.recipes import get_recipe_book
+from app.suggest import get_suggester
+
+# 视图访问的所有只读地址（搜索参数使用规范顺序，避免被重定向）
+VIEW_URLS = [
+    '/', '/crops', '/crops?page=2', '/meals', '/meals/more?page=2',
+    '/crop/1', '/meal/1',
+    '/search?keyword=tomato&search_type=all&sort_by=name',
+    '/search?keyword=tomato&search_type=crops&sort_by=likes',
+    '/search?keyword=soup&search_type=meals&sort_by=hunger',
+    '/search?keyword=soup&search_type=all&sort_by=relevance',
+    '/search?keyword=tomatto&search_type=all&sort_by=name&fuzzy=y',
+    '/rankings', '/rankings?window=7d', '/rankings?window=hot',
+    '/api/analytics/crop/1/likes', '/api/analytics/meal/1/likes',
+    '/api/cook?have=1:2,2', '/api/likes/state?crops=1,2,3&meals=1,2',
+    '/api/suggest?q=to',
+]
+
+# 点赞接口（切换、PUT/DELETE）
+LIKE_REQUESTS = [
+    ('post', '/api/like/crop/2'), ('post', '/api/like/crop/2'),
+    ('put', '/api/like/meal/2'), ('delete', '/api/like/meal/2'),
+]
+
+# 允许遍历整个索引的查询：列表页总数（结果缓存在 CatalogCounts 中）
+WHOLE_INDEX_ALLOWED = {
+    'SELECT count(*) AS count_1 FROM crop',
+    'SELECT count(*) AS count_1 FROM meal',
+}
+
+
+def _normalize(statement):
+    return ' '.join(statement.split())
+
+
+def full_scans(conn, statement, params):
+    """返回 EXPLAIN QUERY PLAN 中的全表扫描步骤
+
+    以下步骤视为全表扫描：不使用索引的 SCAN 表、自动创建的临时索引，
+    以及没有 LIMIT 的整个索引遍历（WHOLE_INDEX_ALLOWED 除外）。
+    子查询、CTE 和 FTS 虚拟表的扫描不计算在内。
+    """
+    tables = set(db.metadata.tables)
+    bounded = ' LIMIT ' in statement or _normalize(statement) in WHOLE_INDEX_ALLOWED
+    scans = []
+    for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, params):
+        detail = row[-1]
+        if 'AUTOMATIC' in detail:
+            scans.append(detail)
+            continue
+        match = re.match(r'SCAN (\w+)', detail)
+        if match is None or match.group(1) not in tables:
+            continue
+        if ' USING ' not in detail or not bounded:
+            scans.append(detail)
+    return scans
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """视图查询计划测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        crops = [Crop(name=name, description=f'{name} crop', hunger_points=2)
+                 for name in ('Tomato', 'Onion', 'Rice', 'Cabbage')]
+        meals = [Meal(name=name, description=f'{name} dish', hunger_restored=6)
+                 for name in ('Tomato Soup', 'Fried Rice', 'Salad')]
+        db.session.add_all([user] + crops + meals)
+        db.session.flush()
+        db.session.execute(meal_ingredients.insert(), [
+            {'meal_id': 1, 'crop_id': 1, 'quantity': 2},
+            {'meal_id': 1, 'crop_id': 2, 'quantity': 1},
+            {'meal_id': 2, 'crop_id': 3, 'quantity': 1},
+        ])
+        user.liked_crops.append(crops[0])
+        user.liked_meals.append(meals[0])
+        db.session.commit()
+
+        # 进程内索引（菜谱、输入提示、模糊搜索）启动时整表加载一次，不属于每个请求的查询
+        get_recipe_book().index()
+        get_suggester().index()
+        get_fuzzy().index()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _capture(self, requests):
+        statements = {}
+
+        def capture(conn, cursor, statement, params, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(
+                    ('SELECT', 'WITH', 'UPDATE', 'DELETE')):
+                statements.setdefault(statement, params)
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            for method, url in requests:
+                response = getattr(self.client, method)(url)
+                self.assertLess(response.status_code, 300, url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+        return statements
+
+    def _assert_no_full_scans(self, statements):
+        self.assertTrue(statements)
+        failures = []
+        with db.engine.connect() as conn:
+            for statement, params in statements.items():
+                for detail in full_scans(conn, statement, params):
+                    failures.append(f'{detail}\n    {_normalize(statement)}')
+        self.assertEqual(failures, [], '\n'.join(failures))
+
+    def test_view_queries(self):
+        """测试所有只读视图和点赞接口的查询都使用索引"""
+        self.client.post('/auth/login', data={
+            'username': 'testuser', 'password': 'password123'})
+        statements = self._capture(
+            [('get', url) for url in VIEW_URLS] + LIKE_REQUESTS)
+        self._assert_no_full_scans(statements)
+
+    def test_anonymous_view_queries(self):
+        """测试匿名用户的查询同样使用索引"""
+        statements = self._capture([('get', url) for url in VIEW_URLS])
+        self._assert_no_full_scans(statements)
+
+    def test_per_item_aggregations(self):
+        """测试按物品统计点赞、反向查找点赞用户和按时间窗口加载点赞使用覆盖索引"""
+        for kind, (model, table, item_col) in LIKE_TARGETS.items():
+            statements = [
+                select(model.id, count_subquery(kind)).where(model.id == 1),
+                select(table.c.user_id).where(item_col == 1),
+                select(item_col, table.c.liked_at)
+                .where(table.c.liked_at >= datetime(2026, 1, 1)),
+            ]
+            with db.engine.connect() as conn:
+                for stmt in statements:
+                    compiled = stmt.compile(db.engine)
+                    plan = ' | '.join(row[-1] for row in conn.exec_driver_sql(
+                        'EXPLAIN QUERY PLAN ' + str(compiled),
+                        tuple(compiled.params.values())))
+                    self.assertIn('COVERING INDEX ix_user_likes', plan)
+        crop = db.session.get(Crop, 2)
+        self.assertEqual([meal.name for meal in crop.meals], ['Tomato Soup'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+菜谱索引与 "我能做什么菜" 测试
+"""
+import unittest
+from app import create_app, db
+from app.models import Crop, Meal, meal_ingredients
+from app.recipes import RecipeIndex
+from app.signals import catalog_changed
+
+
+class RecipeIndexTestCase(unittest.TestCase):
+    """菜谱索引测试用例"""
+
+    def setUp(self):
+        crops = {1: 'Tomato', 2: 'Onion', 3: 'Rice', 4: 'Cabbage'}
+        meals = {10: 'Tomato Sauce', 11: 'Fried Rice', 12: 'Salad', 13: 'Air'}
+        edges = [
+            (10, 1, 2),
+            (11, 3, 1), (11, 2, 1),
+            (12, 4, 1), (12, 1, 1), (12, 2, 1),
+        ]
+        self.index = RecipeIndex(crops, meals, edges)
+
+    def names(self, pairs):
+        return [recipe.name for recipe, _ in pairs]
+
+    def test_cookable_and_almost(self):
+        """测试可以做的菜品和差一两种食材的菜品"""
+        cookable, almost = self.index.match({1: 2, 2: 1})
+        self.assertEqual(self.names(cookable), ['Tomato Sauce'])
+        self.assertEqual(self.names(almost), ['Fried Rice', 'Salad'])
+        self.assertEqual(almost[0][1], [(3, 1, 0)])
+
+    def test_quantities(self):
+        """测试数量不足视为缺少，省略数量视为不限"""
+        cookable, almost = self.index.match({1: 1}, max_missing=1)
+        self.assertEqual(self.names(cookable), [])
+        self.assertEqual(almost[0][1], [(1, 2, 1)])
+
+        cookable, _ = self.index.match({1: None})
+        self.assertEqual(self.names(cookable), ['Tomato Sauce'])
+
+    def test_max_missing(self):
+        """测试缺少食材数量上限，没有食材的菜品不参与匹配"""
+        cookable, almost = self.index.match({}, max_missing=0)
+        self.assertEqual((cookable, almost), ([], []))
+        _, almost = self.index.match({4: 1}, max_missing=1)
+        self.assertEqual(self.names(almost), ['Tomato Sauce'])
+
+    def test_pairs_with(self):
+        """测试共现作物按名称排序，单一食材的菜品不产生共现"""
+        self.assertEqual(
+            [name for _, name, _ in self.index.pairs_with(2)],
+            ['Cabbage', 'Rice', 'Tomato'])
+        self.assertEqual(self.index.pairs_with(2, limit=1), [(4, 'Cabbage', 1)])
+        self.assertEqual(self.index.pairs_with(99), [])
+
+    def test_pairs_weighted_by_quantity(self):
+        """测试共现权重为两种食材数量之积"""
+        index = RecipeIndex(
+            {1: 'Tomato', 2: 'Onion', 3: 'Rice'}, {1: 'A', 2: 'B', 3: 'C'},
+            [(1, 1, 1), (1, 2, 3), (2, 1, 1), (2, 3, 1), (3, 1, 1), (3, 3, 1)]
+        )
+        self.assertEqual(index.pairs_with(1), [(2, 'Onion', 3), (3, 'Rice', 2)])
+        self.assertEqual(index.pairs_with(2), [(1, 'Tomato', 3)])
+
+
+class CookViewTestCase(unittest.TestCase):
+    """/api/cook 接口测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all([
+            Crop(name='Tomato'), Crop(name='Onion'),
+            Meal(name='Tomato Sauce', hunger_restored=4),
+        ])
+        db.session.flush()
+        db.session.execute(meal_ingredients.insert(), [
+            {'meal_id': 1, 'crop_id': 1, 'quantity': 2},
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_cook(self):
+        """测试按库存返回菜品及缺少的食材"""
+        data = self.client.get('/api/cook?have=1:2').get_json()
+        self.assertEqual([meal['name'] for meal in data['cookable']],
+                         ['Tomato Sauce'])
+
+        data = self.client.get('/api/cook?have=1:1,2').get_json()
+        self.assertEqual(data['cookable'], [])
+        self.assertEqual(data['almost'][0]['missing'], [
+            {'crop_id': 1, 'name': 'Tomato', 'need': 2, 'have': 1}
+        ])
+
+    def test_invalid_inventory(self):
+        """测试格式错误的库存参数"""
+        for value in ('x', '1:a', '1:-1'):
+            response = self.client.get(f'/api/cook?have={value}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_refreshed_on_catalog_change(self):
+        """测试后台修改菜谱后索引重建"""
+        self.client.get('/api/cook?have=2')
+        db.session.execute(meal_ingredients.insert(), [
+            {'meal_id': 1, 'crop_id': 2, 'quantity': 1},
+        ])
+        db.session.commit()
+        catalog_changed.send(self.app, kind='meal', item_id=1)
+
+        data = self.client.get('/api/cook?have=1:2').get_json()
+        self.assertEqual(data['cookable'], [])
+        self.assertEqual(data['almost'][0]['missing'][0]['name'], 'Onion')
+
+        html = self.client.get('/crop/1').data.decode()
+        self.assertIn('Commonly combined with', html)
+        self.assertIn('Onion', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+协同过滤推荐测试
+"""
+import unittest
+from app import create_app, db, likes
+from app.models import User, Crop, Meal
+from app.recommend import also_liked, build_neighbors, for_user
+
+
+class RecommendTestCase(unittest.TestCase):
+    """推荐测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.users = [User(username=f'user{i}', email=f'user{i}@example.com')
+                      for i in range(1, 5)]
+        for user in self.users:
+            user.set_password('password123')
+        db.session.add_all(self.users)
+        db.session.add_all([Crop(name='Tomato'), Crop(name='Onion'),
+                            Crop(name='Rice'), Meal(name='Tomato Sauce')])
+        db.session.commit()
+
+        # 用户 1-3 都喜欢番茄和番茄酱，用户 1-2 还喜欢洋葱
+        for user_id in (1, 2, 3):
+            likes.set_like(user_id, 'crop', 1, True)
+            likes.set_like(user_id, 'meal', 1, True)
+        for user_id in (1, 2):
+            likes.set_like(user_id, 'crop', 2, True)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_also_liked(self):
+        """测试 "也喜欢" 按余弦相似度排序，跨类型，低于支持度的不计入"""
+        self.assertEqual(build_neighbors(), 3)
+        rows = also_liked('crop', 1)
+        self.assertEqual([(row.kind, row.name) for row in rows],
+                         [('meal', 'Tomato Sauce'), ('crop', 'Onion')])
+        self.assertAlmostEqual(rows[0].score, 1.0)
+        self.assertEqual(also_liked('crop', 3), [])
+
+    def test_for_user(self):
+        """测试 "为你推荐" 排除已点赞的物品"""
+        build_neighbors()
+        rows = for_user(3)
+        self.assertEqual([row.name for row in rows], ['Onion'])
+        self.assertEqual(for_user(1), [])
+
+    def test_rebuild_updates_untouched_items(self):
+        """测试重新计算后，没有新点赞的物品也得到新的相似物品"""
+        build_neighbors()
+        self.assertEqual(also_liked('crop', 3), [])
+        # 用户 1-2 点赞大米，番茄本身没有点赞变化，但与大米的共现增加了
+        for user_id in (1, 2):
+            likes.set_like(user_id, 'crop', 3, True)
+        self.assertEqual(build_neighbors(), 4)
+        self.assertIn('Rice', [row.name for row in also_liked('crop', 1)])
+        self.assertIn('Tomato', [row.name for row in also_liked('crop', 3)])
+
+    def test_panels_rendered(self):
+        """测试详情页与个人页显示推荐"""
+        build_neighbors()
+        html = self.client.get('/crop/1').data.decode()
+        self.assertIn('Players who liked this also liked', html)
+        self.assertIn('Tomato Sauce', html)
+
+        self.client.post('/auth/login', data={
+            'username': 'user3', 'password': 'password123'
+        })
+        html = self.client.get('/auth/profile').data.decode()
+        self.assertIn('For you', html)
+        self.assertIn('Onion', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+只读副本路由测试（两个 SQLite 文件，用复制任务同步）
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import insert, select
+from app import create_app, db
+from app.models import Crop, User
+from app.replica import REPLICA_BIND, sync_sqlite_replica
+
+
+class ReplicaTestCase(unittest.TestCase):
+    """副本路由测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app('testing', {
+            'SQLALCHEMY_DATABASE_URI':
+                'sqlite:///' + os.path.join(self.tmpdir, 'primary.db'),
+            'REPLICA_DATABASE_URL':
+                'sqlite:///' + os.path.join(self.tmpdir, 'replica.db'),
+            'REPLICA_CHECK_SECONDS': 0,
+        })
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add_all([user, Crop(name='Onion', hunger_points=1)])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def _crops_page(self):
+        response = self.client.get('/crops')
+        self.assertEqual(response.status_code, 200)
+        return response.data.decode()
+
+    def _add_tomato(self):
+        db.session.add(Crop(name='Tomato', hunger_points=3))
+        db.session.commit()
+
+    def test_reads_from_replica(self):
+        """测试只读页面读取副本，复制后看到主库的修改"""
+        sync_sqlite_replica(self.app)
+        self._add_tomato()
+        html = self._crops_page()
+        self.assertIn('Onion', html)
+        self.assertNotIn('Tomato', html)
+
+        result = self.app.test_cli_runner().invoke(args=['replica', 'sync'])
+        self.assertIn('replica synced', result.output)
+        self.assertIn('Tomato', self._crops_page())
+
+    def test_read_your_writes(self):
+        """测试写请求之后同一浏览器读主库，过期后恢复读副本"""
+        sync_sqlite_replica(self.app)
+        self._add_tomato()
+        self.client.post('/auth/login', data={
+            'username': 'testuser', 'password': 'password123'})
+        self.assertIn('Tomato', self._crops_page())
+
+        self.app.config['REPLICA_STICKY_SECONDS'] = -1
+        self.client.get('/auth/logout')
+        self.client.post('/auth/login', data={
+            'username': 'testuser', 'password': 'password123'})
+        self.assertNotIn('Tomato', self._crops_page())
+
+    def test_fallback_to_primary(self):
+        """测试副本不可用（尚未复制）时读主库，复制后重新使用副本"""
+        self._add_tomato()
+        self.assertIn('Tomato', self._crops_page())
+
+        sync_sqlite_replica(self.app)
+        db.session.add(Crop(name='Rice', hunger_points=2))
+        db.session.commit()
+        html = self._crops_page()
+        self.assertIn('Tomato', html)
+        self.assertNotIn('Rice', html)
+
+    def test_failover_on_query_error(self):
+        """测试副本上的查询出错时本次请求改读主库，而不是返回 500"""
+        sync_sqlite_replica(self.app)
+        self._add_tomato()
+        replica = sqlite3.connect(os.path.join(self.tmpdir, 'replica.db'))
+        replica.execute('DROP TABLE crop')
+        replica.commit()
+        replica.close()
+        # 探测查询仍然成功，副本被选中后查询 crop 表出错
+        self.assertIn('Tomato', self._crops_page())
+        self.assertIn('Tomato', self._crops_page())
+
+    def test_writes_use_primary(self):
+        """测试路由到副本时 flush 和 DML 仍然使用主库"""
+        session = db.session()
+        session.info[REPLICA_BIND] = True
+        try:
+            self.assertIs(session.get_bind(clause=select(Crop)),
+                          db.engines[REPLICA_BIND])
+            self.assertIs(session.get_bind(clause=insert(Crop)), db.engines[None])
+            self.assertIs(session.get_bind(mapper=Crop), db.engines[None])
+        finally:
+            session.info.pop(REPLICA_BIND)
+
+
+if __name__ == '__main__':
+    unittest.main()
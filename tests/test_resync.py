@@ -0,0 +1,114 @@
+"""
+进程内索引定期重建测试
+"""
+import threading
+import time
+import unittest
+from app import create_app
+from app.resync import ResyncingIndex
+
+
+class CountingIndex(ResyncingIndex):
+    """每次构建返回以递增序号开头的列表"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.loads = 0
+        self.broken = False
+        self.loading = threading.Event()
+        self.gate = None
+
+    def _load(self):
+        if self.broken:
+            raise RuntimeError('database is locked')
+        self.loads += 1
+        loads = self.loads
+        self.loading.set()
+        if self.gate is not None:
+            self.gate.wait()
+        return [loads]
+
+
+class ResyncingIndexTestCase(unittest.TestCase):
+    """索引重建测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.holder = CountingIndex(self.app)
+
+    def _wait_for_rebuild(self):
+        while self.holder._rebuilding:
+            time.sleep(0.01)
+
+    def test_built_once(self):
+        """测试首次使用时构建，未过期时不重建"""
+        self.assertEqual(self.holder.index(), [1])
+        self.assertEqual(self.holder.index(), [1])
+        self.holder.invalidate()
+        self.assertEqual(self.holder.index(), [2])
+
+    def test_expired_rebuilds_in_background(self):
+        """测试过期后在后台重建，完成后替换索引"""
+        self.holder.index()
+        self.holder.expire()
+        self.holder.index()
+        self._wait_for_rebuild()
+        self.assertEqual(self.holder.index(), [2])
+        self.assertEqual(self.holder.loads, 2)
+
+    def _start_blocked_rebuild(self):
+        """开始一次后台重建，并让它停在加载完成之前"""
+        self.holder.index()
+        self.holder.expire()
+        self.holder.gate = threading.Event()
+        self.holder.loading.clear()
+        self.holder.index()
+        self.holder.loading.wait()
+
+    def test_updates_during_rebuild_replayed(self):
+        """测试重建期间的增量修改同时作用于旧索引并重放到新索引"""
+        self._start_blocked_rebuild()
+        self.holder.update(lambda index: index.append('x'))
+        self.assertEqual(self.holder.index(), [1, 'x'])
+        self.holder.gate.set()
+        self._wait_for_rebuild()
+        self.assertEqual(self.holder.index(), [2, 'x'])
+        self.holder.update(lambda index: index.append('y'))
+        self.assertEqual(self.holder.index(), [2, 'x', 'y'])
+
+    def test_invalidate_during_rebuild_discards_result(self):
+        """测试重建期间调用 invalidate() 时丢弃过时的构建结果"""
+        self._start_blocked_rebuild()
+        self.holder.invalidate()
+        self.holder.gate.set()
+        self._wait_for_rebuild()
+        self.assertIsNone(self.holder._index)
+        self.assertEqual(self.holder.index(), [3])
+
+    def test_update_before_build_ignored(self):
+        """测试尚未构建时的增量修改被忽略"""
+        self.holder.update(lambda index: index.append('x'))
+        self.assertEqual(self.holder.index(), [1])
+
+    def test_preload(self):
+        """测试预先在后台构建，之后使用时不再构建"""
+        self.holder.preload()
+        self._wait_for_rebuild()
+        self.assertEqual(self.holder.loads, 1)
+        self.assertEqual(self.holder.index(), [1])
+        self.holder.preload()
+        self.assertEqual(self.holder.loads, 1)
+
+    def test_rebuild_failure_logged(self):
+        """测试后台重建失败时记录日志并保留旧索引"""
+        self.holder.index()
+        self.holder.expire()
+        self.holder.broken = True
+        with self.assertLogs(self.app.logger, 'ERROR'):
+            self.holder.index()
+            self._wait_for_rebuild()
+        self.assertEqual(self.holder.index(), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+每日点赞汇总测试
+"""
+import unittest
+from datetime import date, datetime
+from app import create_app, db
+from app.models import User, Meal, like_events, meal_like_daily
+from app.rollups import rollup_likes, like_history
+
+
+class RollupTestCase(unittest.TestCase):
+    """每日汇总测试用例"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.meal = Meal(name='Fried Rice', hunger_restored=10)
+        db.session.add(self.meal)
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _event(self, delta, created_at):
+        db.session.execute(like_events.insert().values(
+            item_type='meal', item_id=self.meal.id, delta=delta,
+            created_at=created_at))
+
+    def test_rollup_is_incremental(self):
+        """测试汇总只处理尚未汇总的完整日期"""
+        self._event(1, datetime(2026, 3, 1, 8))
+        self._event(1, datetime(2026, 3, 1, 9))
+        self._event(-1, datetime(2026, 3, 1, 10))
+        self._event(1, datetime(2026, 3, 2, 8))
+        db.session.commit()
+
+        self.assertEqual(rollup_likes(today=date(2026, 3, 2))['meal'], 1)
+        self.assertEqual(rollup_likes(today=date(2026, 3, 2))['meal'], 0)
+        self.assertEqual(rollup_likes(today=date(2026, 3, 3))['meal'], 1)
+
+        rows = db.session.execute(
+            db.select(meal_like_daily).order_by(meal_like_daily.c.day)
+        ).all()
+        self.assertEqual(
+            [tuple(row)[1:] for row in rows],
+            [(date(2026, 3, 1), 2, 1), (date(2026, 3, 2), 1, 0)])
+
+        history = like_history('meal', self.meal.id, days=30,
+                               today=date(2026, 3, 3))
+        self.assertEqual(history[0], {'day': '2026-03-01', 'gained': 2,
+                                      'lost': 1, 'net': 1})
+
+    def test_like_api_writes_events(self):
+        """测试点赞接口写入事件日志"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+        self.client.put(f'/api/like/meal/{self.meal.id}')
+        self.client.delete(f'/api/like/meal/{self.meal.id}')
+
+        deltas = db.session.execute(
+            db.select(like_events.c.delta).order_by(like_events.c.id)
+        ).scalars().all()
+        self.assertEqual(deltas, [1, -1])
+
+    def test_analytics_endpoint(self):
+        """测试时间序列接口"""
+        response = self.client.get(f'/api/analytics/meal/{self.meal.id}/likes')
+        self.assertEqual(response.get_json()['series'], [])
+        response = self.client.get('/api/analytics/meal/999/likes')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+全文搜索测试
+"""
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Crop, Meal
+from app.search import fts_enabled, match_expression, search_page
+from app.signals import catalog_changed
+
+
+class SearchTestCase(unittest.TestCase):
+    """搜索后端测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all([
+            Crop(name='Tomato', description='A juicy red fruit', hunger_points=3),
+            Crop(name='Cabbage', description='Leafy and great with tomato sauce',
+                 hunger_points=2),
+            Crop(name='Onion', description='Makes you cry', hunger_points=1),
+            Meal(name='Tomato Sauce', description='Cooked tomatoes',
+                 hunger_restored=4),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def names(self, kind, keyword, sort_by='name'):
+        page = search_page([kind], keyword, sort_by, per_page=50)
+        return [row.name for row in page.items]
+
+    def test_match_expression(self):
+        """测试用户输入被转为带引号的子串查询，短词不使用全文索引"""
+        self.assertEqual(match_expression('tom sau'), '"tom" "sau"')
+        self.assertEqual(match_expression('"AND" -'), '"AND"')
+        self.assertEqual(match_expression('  '), '')
+        self.assertEqual(match_expression('tom 番茄'), '')
+
+    def test_prefix_match(self):
+        """测试前缀匹配名称和描述"""
+        self.assertTrue(fts_enabled())
+        self.assertEqual(self.names('crop', 'tom'), ['Cabbage', 'Tomato'])
+        self.assertEqual(self.names('crop', 'ONI'), ['Onion'])
+        self.assertEqual(self.names('crop', 'banana'), [])
+
+    def test_substring_match(self):
+        """测试词中间的片段和中文关键词"""
+        db.session.add_all([
+            Crop(name='樱桃番茄', description='小而甜的番茄'),
+            Crop(name='白菜', description='常见的叶类蔬菜'),
+        ])
+        db.session.commit()
+        self.assertEqual(self.names('crop', 'mato'), ['Cabbage', 'Tomato'])
+        self.assertEqual(self.names('crop', '番茄'), ['樱桃番茄'])
+        self.assertEqual(self.names('crop', '樱桃番'), ['樱桃番茄'])
+        self.assertEqual(self.names('crop', '蔬菜'), ['白菜'])
+        self.assertEqual(self.names('crop', '叶类蔬菜'), ['白菜'])
+        self.assertEqual(self.names('crop', 'red 番茄'), [])
+
+    def test_relevance_prefers_name(self):
+        """测试相关度排序时名称命中排在描述命中之前"""
+        self.assertEqual(self.names('crop', 'tomato', 'relevance'),
+                         ['Tomato', 'Cabbage'])
+
+    def test_index_follows_writes(self):
+        """测试触发器在增删改时同步索引"""
+        onion = Crop.query.filter_by(name='Onion').first()
+        onion.name = 'Shallot'
+        db.session.commit()
+        self.assertEqual(self.names('crop', 'onion'), [])
+        self.assertEqual(self.names('crop', 'shal'), ['Shallot'])
+
+        db.session.delete(onion)
+        db.session.commit()
+        self.assertEqual(self.names('crop', 'shal'), [])
+
+        db.session.add(Crop(name='Rice', description='Grows in water'))
+        db.session.commit()
+        self.assertEqual(self.names('crop', 'wat'), ['Rice'])
+
+    def test_like_fallback(self):
+        """测试强制 LIKE 后端时仍可搜索"""
+        self.app.config['SEARCH_BACKEND'] = 'like'
+        self.app.extensions.pop('search_fts', None)
+        self.assertFalse(fts_enabled())
+        self.assertEqual(self.names('crop', 'tomato'), ['Cabbage', 'Tomato'])
+        self.assertEqual(self.names('meal', 'sauce'), ['Tomato Sauce'])
+        self.assertEqual(self.names('crop', 'leafy tomato'), ['Cabbage'])
+
+    def test_all_types_single_query(self):
+        """测试全部类型用一条查询在数据库中排序并分页"""
+        db.session.get(Crop, 2).likes_count = 5
+        db.session.get(Meal, 1).likes_count = 3
+        db.session.commit()
+        fts_enabled()  # 首次调用会检查数据库
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(args))
+        page = search_page(['crop', 'meal'], 'tomato', 'likes', per_page=2)
+        self.assertEqual(len(statements), 1)
+
+        self.assertEqual([(row.kind, row.name) for row in page.items],
+                         [('crop', 'Cabbage'), ('meal', 'Tomato Sauce')])
+        self.assertEqual(page.total, 3)
+        self.assertEqual(page.pages, 2)
+        self.assertTrue(page.has_next)
+
+        page = search_page(['crop', 'meal'], 'tomato', 'likes',
+                           page=2, per_page=2)
+        self.assertEqual([row.name for row in page.items], ['Tomato'])
+        self.assertFalse(page.has_next)
+
+        page = search_page(['crop', 'meal'], 'tomato', 'hunger', per_page=2)
+        self.assertEqual([row.hunger for row in page.items], [4, 3])
+
+        page = search_page(['crop', 'meal'], 'tomato', page=5, per_page=2)
+        self.assertEqual(page.items, [])
+        self.assertEqual(page.total, 3)
+
+    def test_search_view_relevance(self):
+        """测试搜索页面按相关度排序"""
+        response = self.client.get(
+            '/search?keyword=tomato&search_type=all&sort_by=relevance')
+        self.assertEqual(response.status_code, 200)
+        html = response.data.decode()
+        self.assertIn('Tomato Sauce', html)
+        self.assertIn('Cabbage', html)
+        self.assertNotIn('Onion', html)
+        self.assertEqual(response.headers['Cache-Control'],
+                         'private, max-age=60')
+
+    def test_post_redirects_to_canonical_get(self):
+        """测试 POST 表单和非规范参数重定向到规范的 GET 地址"""
+        response = self.client.post('/search', data={
+            'keyword': '  tomato   sauce ',
+            'search_type': 'meals',
+            'sort_by': 'likes',
+        })
+        self.assertEqual(response.status_code, 303)
+        self.assertTrue(response.location.endswith(
+            '/search?keyword=tomato+sauce&search_type=meals&sort_by=likes'))
+
+        response = self.client.get(
+            '/search?sort_by=name&keyword=tomato&search_type=all&page=1')
+        self.assertEqual(response.status_code, 301)
+        self.assertTrue(response.location.endswith(
+            '/search?keyword=tomato&search_type=all&sort_by=name'))
+
+    def test_result_cache(self):
+        """测试相同查询命中缓存，后台修改后失效"""
+        cache = self.app.extensions['search_cache']
+        url = '/search?keyword=tomato&search_type=crops&sort_by=name'
+        self.client.get(url)
+        response = self.client.get('/search?keyword=TOMATO&search_type=crops'
+                                   '&sort_by=name')
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertIn('Cabbage', response.data.decode())
+
+        cabbage = db.session.get(Crop, 2)
+        cabbage.description = 'Leafy'
+        db.session.commit()
+        catalog_changed.send(self.app, kind='crop', item_id=2)
+        self.assertEqual(len(cache), 0)
+
+        response = self.client.get(url)
+        self.assertEqual(cache.misses, 2)
+        self.assertNotIn('Cabbage', response.data.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+采样慢查询日志测试
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.models import Crop, User
+from app.slowlog import SlowQueryLog, fingerprint
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    """统计存储测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_engine('sqlite://')
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE crop (id INTEGER PRIMARY KEY, name TEXT)'))
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_fingerprint(self):
+        """测试字面量、IN 列表和空白不影响指纹"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM crop\nWHERE name = 'it''s' AND id IN (1, 2, 3)"),
+            fingerprint("SELECT * FROM crop WHERE name = 'x' AND id IN (?, ?)"))
+        self.assertEqual(fingerprint('SELECT count_1 FROM t LIMIT 10'),
+                         'SELECT count_1 FROM t LIMIT ?')
+
+    def test_aggregate_and_explain(self):
+        """测试汇总耗时与百分位数，慢 SELECT 记录执行计划"""
+        log = SlowQueryLog(threshold=0.05, samples=10)
+        statement = 'SELECT name FROM crop WHERE id = ?'
+        for ms in range(1, 21):
+            log.record(self.engine, statement, (ms,), ms / 1000)
+        log.record(self.engine, statement, (7,), 0.08)
+        log.record(self.engine, 'UPDATE crop SET name = ? WHERE id = ?',
+                   ('x', 1), 0.09)
+
+        select_stat, update_stat = log.entries(order_by='total')
+        self.assertEqual(select_stat.count, 21)
+        self.assertAlmostEqual(select_stat.total, 0.29)
+        self.assertEqual(select_stat.max, 0.08)
+        self.assertEqual(select_stat.slow, 1)
+        # 只保留最近 10 次耗时：12..20 ms 和 80 ms
+        self.assertEqual(select_stat.percentile(0.5), 0.017)
+        self.assertEqual(select_stat.percentile(0.95), 0.08)
+
+        log.explain_pending()
+        self.assertIn('SEARCH crop USING INTEGER PRIMARY KEY', select_stat.plan)
+        self.assertIsNone(update_stat.plan)
+
+    def test_bounded(self):
+        """测试超过指纹上限时淘汰总耗时最少的指纹"""
+        log = SlowQueryLog(max_entries=2)
+        log.record(self.engine, 'SELECT 1 FROM a', (), 0.010)
+        log.record(self.engine, 'SELECT 1 FROM b', (), 0.001)
+        log.record(self.engine, 'SELECT 1 FROM c', (), 0.005)
+        self.assertEqual([stat.fingerprint for stat in log.entries()],
+                         ['SELECT ? FROM a', 'SELECT ? FROM c'])
+        with self.assertRaises(ValueError):
+            log.set_sample_rate('1.5')
+        log.reset()
+        self.assertEqual(log.entries(), [])
+
+    def test_persist_and_load(self):
+        """测试统计写入文件后可以读回，参数不写入文件"""
+        path = os.path.join(self.tmpdir, 'slow.json')
+        log = SlowQueryLog(sample_rate=0.2, threshold=0.01, path=path)
+        log.record(self.engine, 'SELECT name FROM crop WHERE name = ?',
+                   ('secret-value',), 0.02)
+        log.persist()
+        with open(path, encoding='utf-8') as f:
+            self.assertNotIn('secret-value', f.read())
+
+        restored = SlowQueryLog(path=path)
+        restored.load()
+        stat, = restored.entries()
+        self.assertEqual(restored.sample_rate, 0.2)
+        self.assertEqual((stat.count, stat.slow), (1, 1))
+        self.assertIn('SCAN crop', stat.plan)
+
+    def test_persist_failure_logged(self):
+        """测试后台写入失败时记录日志而不是静默丢弃"""
+        path = os.path.join(self.tmpdir, 'missing', 'slow.json')
+        open(os.path.join(self.tmpdir, 'missing'), 'w').close()
+        log = SlowQueryLog(path=path)
+        log.record(self.engine, 'SELECT 1', (), 0.2)
+        with self.assertLogs('app.slowlog', 'ERROR') as logs:
+            log._persist_safely()
+        self.assertIn('persist failed', logs.output[0])
+        self.assertFalse(log._persisting)
+
+
+class SlowQueryAdminTestCase(unittest.TestCase):
+    """后台慢查询页面测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing', {'SLOW_QUERY_SAMPLE_RATE': 1.0})
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.log = self.app.extensions['slow_queries']
+        for name in ('admin', 'player'):
+            user = User(username=name, email=f'{name}@example.com')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.add(Crop(name='Tomato', hunger_points=1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self, username):
+        self.client.post('/auth/login', data={
+            'username': username, 'password': 'password123'})
+
+    def test_requires_admin(self):
+        """测试只有管理员可以访问"""
+        self._login('player')
+        response = self.client.get('/admin/admin_slow_queries/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/auth/login', response.location)
+        response = self.client.post('/admin/admin_slow_queries/reset')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.log.entries())
+
+    def test_dashboard(self):
+        """测试页面列出指纹，并可以调整采样率和清空统计"""
+        self._login('admin')
+        self.client.get('/crop/1')
+        html = self.client.get('/admin/admin_slow_queries/').data.decode()
+        self.assertIn('FROM crop', html)
+
+        self.client.post('/admin/admin_slow_queries/sampling',
+                         data={'sample_rate': '0.01'})
+        self.assertEqual(self.log.sample_rate, 0.01)
+        self.client.post('/admin/admin_slow_queries/sampling',
+                         data={'sample_rate': 'abc'})
+        self.assertEqual(self.log.sample_rate, 0.01)
+
+        self.log.set_sample_rate(0)
+        self.client.post('/admin/admin_slow_queries/reset')
+        html = self.client.get('/admin/admin_slow_queries/').data.decode()
+        self.assertIn('暂无数据', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+目录快照测试
+"""
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Crop, Meal, meal_ingredients
+from app.recipes import get_recipe_book
+from app.snapshot import (CatalogCrop, CatalogMeal, CatalogSnapshot,
+                          bump_catalog_version, read_catalog_version)
+
+
+class CatalogSnapshotTestCase(unittest.TestCase):
+    """快照数据结构测试用例"""
+
+    def setUp(self):
+        crops = [CatalogCrop(i, name, None, None, None, 1)
+                 for i, name in ((1, 'Tomato'), (2, 'Onion'), (3, 'Rice'))]
+        meals = [CatalogMeal(1, 'Soup', None, None, None, 4, 1.0),
+                 CatalogMeal(2, 'Fried Rice', None, None, None, 6, 2.0)]
+        edges = [(1, 1, 2), (1, 2, 1), (2, 3, 1), (2, 2, 1), (2, 99, 1)]
+        self.snapshot = CatalogSnapshot(3, crops, meals, edges)
+
+    def names(self, cards):
+        return [card.name for card in cards]
+
+    def test_slice(self):
+        """测试按 (name, id) 顺序取段，与数据库查询的方向一致"""
+        self.assertEqual(self.names(self.snapshot.slice('crop', limit=2)),
+                         ['Onion', 'Rice'])
+        self.assertEqual(
+            self.names(self.snapshot.slice('crop', after=('Onion', 2), limit=5)),
+            ['Rice', 'Tomato'])
+        self.assertEqual(
+            self.names(self.snapshot.slice('crop', before=('Tomato', 1), limit=5)),
+            ['Rice', 'Onion'])
+        self.assertEqual(self.names(self.snapshot.slice('crop', offset=2, limit=5)),
+                         ['Tomato'])
+        self.assertEqual(self.snapshot.count('meal'), 2)
+
+    def test_graph(self):
+        """测试食材关系图按名称排序，忽略不存在的作物"""
+        self.assertEqual([i.name for i in self.snapshot.ingredients(2)],
+                         ['Onion', 'Rice'])
+        self.assertEqual(self.snapshot.ingredients(1)[1].quantity, 2)
+        self.assertEqual(self.names(self.snapshot.related_meals(2)),
+                         ['Fried Rice', 'Soup'])
+        self.assertEqual(self.snapshot.related_meals(99), ())
+        self.assertEqual(
+            self.names(self.snapshot.cards([('meal', 2), ('crop', 9), ('crop', 3)])),
+            ['Fried Rice', 'Rice'])
+
+
+class SnapshotViewTestCase(unittest.TestCase):
+    """开启快照后的页面测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['CATALOG_SNAPSHOT'] = True
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.store = self.app.extensions['catalog_snapshot']
+        self.store.check_seconds = 3600
+
+        db.session.add_all([
+            Crop(name='Tomato', description='Red', hunger_points=3),
+            Crop(name='Onion', description='Sharp', hunger_points=2),
+            Meal(name='Tomato Soup', description='Warm', hunger_restored=6),
+        ])
+        db.session.flush()
+        db.session.execute(meal_ingredients.insert(), [
+            {'meal_id': 1, 'crop_id': 1, 'quantity': 2},
+            {'meal_id': 1, 'crop_id': 2, 'quantity': 1},
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_queries(self, url):
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_catalog_served_from_memory(self):
+        """测试列表页不查询数据库，详情页只查询点赞状态和推荐"""
+        self.client.get('/crops')
+        get_recipe_book().index()
+        self.assertEqual(self._count_queries('/crops'), 0)
+        self.assertEqual(self._count_queries('/meals'), 0)
+        # 点赞状态与点赞数、"也喜欢" 各一条
+        self.assertEqual(self._count_queries('/crop/1'), 2)
+        self.assertEqual(self._count_queries('/meal/1'), 2)
+
+        html = self.client.get('/meal/1').data.decode()
+        self.assertIn('Tomato', html)
+        self.assertIn('× 2', html)
+        self.assertEqual(self.client.get('/crop/99').status_code, 404)
+
+        url = '/search?keyword=tomato&search_type=all&sort_by=name'
+        self.client.get(url)
+        self.assertEqual(self._count_queries(url), 0)
+
+    def test_reload_on_version_change(self):
+        """测试版本号变化后重新加载，未变化时继续使用旧快照"""
+        self.assertIn('Onion', self.client.get('/crops').data.decode())
+        self.store.check_seconds = 0
+
+        db.session.get(Crop, 2).name = 'Shallot'
+        db.session.commit()
+        html = self.client.get('/crops').data.decode()
+        self.assertIn('Onion', html)
+
+        bump_catalog_version()
+        db.session.commit()
+        self.assertEqual(read_catalog_version(), 1)
+        html = self.client.get('/crops').data.decode()
+        self.assertIn('Shallot', html)
+        self.assertNotIn('Onion', html)
+        self.assertIn('Shallot', self.client.get('/meal/1').data.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
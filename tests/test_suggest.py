@@ -0,0 +1,136 @@
+"""
+搜索输入提示测试
+"""
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Crop, Meal
+from app.signals import catalog_changed
+from app.suggest import SuggestIndex
+
+
+class SuggestIndexTestCase(unittest.TestCase):
+    """前缀索引测试用例"""
+
+    def setUp(self):
+        self.index = SuggestIndex.build([
+            ('crop', 1, 'Tomato', 2),
+            ('crop', 2, 'Onion', 0),
+            ('meal', 1, 'Tomato Sauce', 5),
+            ('meal', 2, 'Baked Cod', 1),
+        ])
+
+    def names(self, prefix, limit=8):
+        return [name for _, _, name, _ in self.index.suggest(prefix, limit)]
+
+    def test_prefix_weighted_by_likes(self):
+        """测试前缀匹配并按点赞数排序"""
+        self.assertEqual(self.names('tom'), ['Tomato Sauce', 'Tomato'])
+        self.assertEqual(self.names('TOM', limit=1), ['Tomato Sauce'])
+        self.assertEqual(self.names('x'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_word_start_match(self):
+        """测试匹配名称中任意单词的开头"""
+        self.assertEqual(self.names('sau'), ['Tomato Sauce'])
+        self.assertEqual(self.names('cod'), ['Baked Cod'])
+        self.assertEqual(self.names('ato'), [])
+
+    def test_incremental_updates(self):
+        """测试增量修改后结果立即更新"""
+        self.assertEqual(self.names('tom'), ['Tomato Sauce', 'Tomato'])
+        self.index.adjust_weight('crop', 1, 10)
+        self.assertEqual(self.names('tom'), ['Tomato', 'Tomato Sauce'])
+
+        self.index.upsert('crop', 2, 'Tomatillo', 0)
+        self.assertEqual(self.names('oni'), [])
+        self.assertEqual(self.names('tomati'), ['Tomatillo'])
+
+        self.index.remove('meal', 1)
+        self.assertEqual(self.names('sau'), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_like_keeps_unrelated_memo(self):
+        """测试点赞只丢弃能匹配到该物品的前缀的缓存结果"""
+        for prefix in ('t', 'tom', 'sau', 'oni'):
+            self.names(prefix)
+        self.index.adjust_weight('crop', 1, 10)
+        self.assertEqual(sorted(prefix for prefix, _ in self.index._memo),
+                         ['oni', 'sau'])
+        self.assertEqual(self.names('t'), ['Tomato', 'Tomato Sauce'])
+
+
+class SuggestViewTestCase(unittest.TestCase):
+    """输入提示接口测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.add_all([
+            Crop(name='Tomato', description='Red'),
+            Meal(name='Tomato Sauce', description='Sauce', hunger_restored=4),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def suggest(self, q):
+        response = self.client.get(f'/api/suggest?q={q}')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.get_json()['suggestions']]
+
+    def test_no_queries_after_build(self):
+        """测试索引建立后请求不再访问数据库"""
+        self.assertEqual(self.suggest('tom'), ['Tomato', 'Tomato Sauce'])
+
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            self.suggest('tomato')
+            self.suggest('sau')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.assertEqual(statements, [])
+
+    def test_likes_and_catalog_changes(self):
+        """测试点赞与后台修改会更新索引"""
+        self.assertEqual(self.suggest('tom'), ['Tomato', 'Tomato Sauce'])
+
+        self.client.post('/auth/login', data={
+            'username': 'testuser', 'password': 'password123'
+        })
+        self.client.put('/api/like/meal/1')
+        self.assertEqual(self.suggest('tom'), ['Tomato Sauce', 'Tomato'])
+
+        crop = db.session.get(Crop, 1)
+        crop.name = 'Cherry Tomato'
+        db.session.add(Crop(name='Tomatillo'))
+        db.session.commit()
+        catalog_changed.send(self.app, kind='crop', item_id=1)
+        catalog_changed.send(self.app, kind='crop', item_id=2)
+        self.assertEqual(self.suggest('tom'),
+                         ['Tomato Sauce', 'Cherry Tomato', 'Tomatillo'])
+        self.assertEqual(self.suggest('cher'), ['Cherry Tomato'])
+
+        db.session.delete(crop)
+        db.session.commit()
+        catalog_changed.send(self.app, kind='crop', item_id=1)
+        self.assertEqual(self.suggest('cher'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
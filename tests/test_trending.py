@@ -0,0 +1,156 @@
+"""
+趋势排行榜测试
+"""
+import time
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.likes import set_like
+from app.models import User, Meal, like_events, user_likes_meals
+from app.trending import TrendingBoard, HOT
+
+HOUR = 3600
+NOW = 1_000_000 * HOUR
+
+
+class TrendingBoardTestCase(unittest.TestCase):
+    """滑动窗口计数测试用例"""
+
+    def setUp(self):
+        self.board = TrendingBoard(bucket_seconds=HOUR, half_life=HOUR,
+                                   now=NOW)
+
+    def test_windows_expire_incrementally(self):
+        """测试点赞随时间滑出各个窗口"""
+        self.board.record(1, NOW, 1, now=NOW)
+        self.board.record(2, NOW - 3 * 24 * HOUR, 1, now=NOW)
+
+        self.assertEqual(self.board.top('24h', now=NOW), [(1, 1)])
+        self.assertEqual(dict(self.board.top('7d', now=NOW)), {1: 1, 2: 1})
+
+        later = NOW + 25 * HOUR
+        self.assertEqual(self.board.top('24h', now=later), [])
+        self.assertEqual(dict(self.board.top('7d', now=later)), {1: 1, 2: 1})
+        self.assertEqual(self.board.top('7d', now=NOW + 5 * 24 * HOUR),
+                         [(1, 1)])
+
+    def test_unlike_uses_original_bucket(self):
+        """测试取消点赞扣减原点赞所在的桶，滑出窗口时不会重复扣减"""
+        self.board.record(1, NOW - 2 * HOUR, 1, now=NOW)
+        self.board.record(1, NOW - HOUR, 1, now=NOW)
+        self.board.record(1, NOW - 2 * HOUR, -1, now=NOW)
+        self.assertEqual(self.board.top('24h', now=NOW), [(1, 1)])
+        self.assertEqual(self.board.top('24h', now=NOW + 23 * HOUR), [])
+
+    def test_hot_score_decays(self):
+        """测试热度分按半衰期衰减"""
+        self.board.record(1, NOW - HOUR, 1, now=NOW)
+        self.board.record(2, NOW, 1, now=NOW)
+        ranked = self.board.top(HOT, now=NOW)
+        self.assertEqual([item_id for item_id, _ in ranked], [2, 1])
+        self.assertAlmostEqual(ranked[1][1], 0.5)
+
+
+class TrendingViewTestCase(unittest.TestCase):
+    """趋势排行榜页面测试用例"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_trending_rankings(self):
+        """测试趋势榜只统计窗口内的点赞，并接收新的点赞"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        old = Meal(name='Old Meal', hunger_restored=1)
+        new = Meal(name='New Meal', hunger_restored=1)
+        db.session.add_all([user, old, new])
+        db.session.commit()
+        db.session.execute(user_likes_meals.insert().values(
+            user_id=user.id, meal_id=old.id,
+            liked_at=datetime.utcnow() - timedelta(days=3)))
+        db.session.commit()
+
+        response = self.client.get('/rankings?window=24h')
+        self.assertNotIn(b'Old Meal', response.data)
+        response = self.client.get('/rankings?window=7d')
+        self.assertIn(b'Old Meal', response.data)
+
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+        self.client.put(f'/api/like/meal/{new.id}')
+        response = self.client.get('/rankings?window=24h')
+        self.assertIn(b'New Meal', response.data)
+
+    def _resync(self, trending):
+        trending.expire()
+        trending.top('meal', '24h')
+        while trending._rebuilding:
+            time.sleep(0.01)
+
+    def test_resync_in_background(self):
+        """测试过期后在后台合并其他进程写入（没有信号）的点赞事件，不重新加载"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        meal = Meal(name='Soup', hunger_restored=1)
+        db.session.add_all([user, meal])
+        db.session.commit()
+        trending = self.app.extensions['trending']
+        self.assertEqual(trending.top('meal', '24h'), [])
+        board = trending.boards()['meal']
+
+        now = datetime.utcnow()
+        db.session.execute(user_likes_meals.insert().values(
+            user_id=user.id, meal_id=meal.id, liked_at=now))
+        db.session.execute(like_events.insert().values(
+            item_type='meal', item_id=meal.id, delta=1, created_at=now))
+        db.session.commit()
+        self._resync(trending)
+        self.assertEqual(trending.top('meal', '24h'), [(meal.id, 1)])
+        self.assertIs(trending.boards()['meal'], board)
+
+        db.session.execute(like_events.insert().values(
+            item_type='meal', item_id=meal.id, delta=-1, created_at=now))
+        db.session.commit()
+        self._resync(trending)
+        self.assertEqual(trending.top('meal', '24h'), [])
+
+    def test_resync_skips_own_events(self):
+        """测试本进程已通过信号记录的点赞在合并事件日志时不重复计数"""
+        users = [User(username=f'user{i}', email=f'user{i}@example.com')
+                 for i in range(2)]
+        for user in users:
+            user.set_password('password123')
+        meal = Meal(name='Soup', hunger_restored=1)
+        db.session.add_all(users + [meal])
+        db.session.commit()
+        trending = self.app.extensions['trending']
+        trending.boards()
+
+        set_like(users[0].id, 'meal', meal.id, True)
+        self.assertEqual(trending.top('meal', '24h'), [(meal.id, 1)])
+        # 另一个进程的点赞（没有信号）
+        db.session.execute(like_events.insert().values(
+            item_type='meal', item_id=meal.id, delta=1,
+            created_at=datetime.utcnow()))
+        db.session.commit()
+        self._resync(trending)
+        self.assertEqual(trending.top('meal', '24h'), [(meal.id, 2)])
+
+        set_like(users[0].id, 'meal', meal.id, False)
+        self._resync(trending)
+        self.assertEqual(trending.top('meal', '24h'), [(meal.id, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,10 @@
 视图路由测试
 """
 import unittest
+from sqlalchemy import event
 from app import create_app, db
-from app.models import User, Crop, Meal
+from app.models import User, Crop, Meal, meal_ingredients
+from app.recipes import get_recipe_book
 
 
 class ViewTestCase(unittest.TestCase):
@@ -79,6 +81,162 @@ class ViewTestCase(unittest.TestCase):
         # 应该重定向到登录页或返回 401
         self.assertIn(response.status_code, [302, 401])
 
+    def test_like_crop_updates_count(self):
+        """测试点赞接口返回冗余计数"""
+        crop = Crop(name='测试作物', hunger_points=2)
+        db.session.add(crop)
+        db.session.commit()
+        self._login()
+
+        response = self.client.post(f'/api/like/crop/{crop.id}')
+        self.assertEqual(response.get_json()['likes_count'], 1)
+        self.assertTrue(response.get_json()['is_liked'])
+
+        response = self.client.post(f'/api/like/crop/{crop.id}')
+        self.assertEqual(response.get_json()['likes_count'], 0)
+        self.assertFalse(response.get_json()['is_liked'])
+
+    def test_like_meal_put_delete_idempotent(self):
+        """测试 PUT/DELETE 点赞接口幂等"""
+        meal = Meal(name='测试菜品', hunger_restored=10)
+        db.session.add(meal)
+        db.session.commit()
+        self._login()
+
+        for _ in range(2):
+            response = self.client.put(f'/api/like/meal/{meal.id}')
+            self.assertEqual(response.get_json()['likes_count'], 1)
+            self.assertTrue(response.get_json()['is_liked'])
+
+        for _ in range(2):
+            response = self.client.delete(f'/api/like/meal/{meal.id}')
+            self.assertEqual(response.get_json()['likes_count'], 0)
+            self.assertFalse(response.get_json()['is_liked'])
+
+    def test_like_missing_item(self):
+        """测试点赞不存在的物品返回 404"""
+        self._login()
+        response = self.client.put('/api/like/crop/999')
+        self.assertEqual(response.status_code, 404)
+
+    def test_likes_state_batch(self):
+        """测试批量点赞状态接口"""
+        crops = [Crop(name=f'作物{i}', hunger_points=1) for i in range(3)]
+        meal = Meal(name='测试菜品', hunger_restored=10)
+        db.session.add_all(crops + [meal])
+        db.session.commit()
+        user = self._login()
+        user.liked_crops.append(crops[1])
+        db.session.commit()
+
+        ids = ','.join(str(crop.id) for crop in crops)
+        response = self.client.get(
+            f'/api/likes/state?crops={ids}&meals={meal.id}')
+        data = response.get_json()
+        self.assertEqual(data['crops'][str(crops[1].id)],
+                         {'likes_count': 1, 'is_liked': True})
+        self.assertEqual(data['crops'][str(crops[0].id)],
+                         {'likes_count': 0, 'is_liked': False})
+        self.assertEqual(data['meals'][str(meal.id)]['likes_count'], 0)
+
+    def test_likes_state_rejects_bad_ids(self):
+        """测试批量点赞状态接口的参数校验"""
+        response = self.client.get('/api/likes/state?crops=1,x')
+        self.assertEqual(response.status_code, 400)
+        ids = ','.join(str(i) for i in range(1000))
+        response = self.client.get(f'/api/likes/state?crops={ids}')
+        self.assertEqual(response.status_code, 400)
+
+    def _count_queries(self, url):
+        """请求页面并返回执行的 SQL 数量"""
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def _populate_detail(self, size):
+        """一个作物和一个菜品，各带 size 个关联物品与点赞"""
+        crop = Crop(name='Hub Crop', hunger_points=1)
+        meal = Meal(name='Hub Meal', hunger_restored=1)
+        db.session.add_all([crop, meal])
+        db.session.flush()
+        meals = [Meal(name=f'Meal {i}', hunger_restored=1) for i in range(size)]
+        crops = [Crop(name=f'Crop {i}', hunger_points=1) for i in range(size)]
+        users = [User(username=f'user{i}', email=f'user{i}@example.com',
+                      password_hash='x') for i in range(size)]
+        db.session.add_all(meals + crops + users)
+        db.session.flush()
+        db.session.execute(meal_ingredients.insert(), [
+            {'meal_id': other.id, 'crop_id': crop.id, 'quantity': 1}
+            for other in meals
+        ] + [
+            {'meal_id': meal.id, 'crop_id': other.id, 'quantity': 2}
+            for other in crops
+        ])
+        for user in users:
+            user.liked_crops.append(crop)
+            user.liked_meals.append(meal)
+        db.session.commit()
+        return crop.id, meal.id
+
+    def _warm_recipes(self):
+        """预先构建菜谱索引（常驻内存，不计入页面的查询数量）"""
+        book = get_recipe_book()
+        book.invalidate()
+        book.index()
+
+    def test_detail_query_budget(self):
+        """测试详情页的查询数量与关联物品和点赞数量无关"""
+        crop_id, meal_id = self._populate_detail(2)
+        self._warm_recipes()
+        small = (self._count_queries(f'/crop/{crop_id}'),
+                 self._count_queries(f'/meal/{meal_id}'))
+        # 物品与点赞状态、关联物品、"也喜欢" 各一条
+        self.assertEqual(small, (3, 3))
+
+        db.drop_all()
+        db.create_all()
+        crop_id, meal_id = self._populate_detail(30)
+        self._warm_recipes()
+        self._login()
+        # 测试共用应用上下文，当前用户已在会话中，这里只统计页面本身的查询
+        self.assertEqual(self._count_queries(f'/crop/{crop_id}'), 3)
+        self.assertEqual(self._count_queries(f'/meal/{meal_id}'), 3)
+
+    def test_meal_detail_ingredient_quantity(self):
+        """测试菜品详情显示食材数量和点赞状态"""
+        crop_id, meal_id = self._populate_detail(1)
+        user = self._login()
+        db.session.get(User, user.id).liked_meals.append(
+            db.session.get(Meal, meal_id))
+        db.session.commit()
+
+        html = self.client.get(f'/meal/{meal_id}').data.decode()
+        self.assertIn('× 2', html)
+        self.assertIn('data-liked="true"', html)
+        self.assertIn('<span class="like-count">2</span>', html)
+        self.assertEqual(self.client.get('/meal/999').status_code, 404)
+
+    def _login(self):
+        """创建并登录测试用户"""
+        user = User(username='testuser', email='test@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        self.client.post('/auth/login', data={
+            'username': 'testuser',
+            'password': 'password123'
+        })
+        return user
+
 
 if __name__ == '__main__':
     unittest.main()